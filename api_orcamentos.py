@@ -0,0 +1,241 @@
+"""API HTTP (JSON, asyncio) de preços e orçamentos, ao lado da interface Streamlit.
+
+Usa as mesmas funções do app: calcular_valores_* (regras vigentes) para os
+preços, o escritor do banco para salvar (pedidos simultâneos são gravados na
+mesma transação) e o armazenamento de PDFs do app (gerados num pool de processos
+na primeira vez e servidos do disco depois). Cálculos
+rodam direto no event loop (microssegundos); leituras do SQLite vão para o pool
+de threads e gravações esperam o Future do escritor sem bloquear o loop.
+
+Endpoints:
+    POST /precos                  calcula os valores de uma lista de itens (não grava)
+    POST /orcamentos              calcula e salva um orçamento; retorna o id e os valores gravados
+    GET  /orcamentos/{id}/pdf     PDF de um orçamento salvo
+    GET  /saude                   verificação simples (versão das regras vigentes)
+
+Corpo de /precos e /orcamentos:
+    {"cliente": {"nome", "cnpj", "tipo_cliente", "estado", "frete", "tipo_pedido"},
+     "vendedor": {"nome", "tel", "email"}, "observacao": "...", "preco_m2": 12.5,
+     "itens_confeccionados": [{"produto", "comprimento", "largura", "quantidade", "cor"}],
+     "itens_bobinas": [{"produto", "comprimento", "largura", "quantidade", "cor", "espessura", "preco_unitario"}]}
+Com ORC_API_TOKEN definido, POST /orcamentos e o PDF exigem "Authorization: Bearer <token>".
+
+Uso (na raiz do repositório):
+    python -m api_orcamentos [--host 127.0.0.1] [--porta 8502] [--db orcamentos.db] [--pdfs pdfs]
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import math
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, JSONResponse
+from starlette.routing import Route
+
+import banco
+from armazenamento_pdf import PDF_DIR, GeradorPdfs
+from banco import (
+    ESCRITOR_TIMEOUT, carregar_orcamento_por_id, enviar_orcamento, init_db, resumos_salvos, silenciar_avisos_sem_servidor
+)
+from calculos import calcular_valores_bobinas, calcular_valores_confeccionados, regras_vigentes
+from exportacao import ZIP_WORKERS, criar_pool_pdf
+from validacao import ErroValidacao, validar_item, validar_orcamento
+
+API_TOKEN_ENV = "ORC_API_TOKEN"
+API_CORPO_MAX_BYTES = 1024 * 1024
+API_ITENS_MAX = 2000
+API_PDF_WORKERS = ZIP_WORKERS
+class ErroRequisicao(ErroValidacao):
+    """Corpo inválido; vira resposta 400 com a mensagem."""
+
+def _numero(dados, campo, contexto, padrao=None, inteiro=False):
+    """Número do JSON (sem conversão de texto); `padrao` se ausente ou nulo."""
+    valor = dados.get(campo, padrao)
+    if valor is None:
+        return None
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        raise ErroRequisicao(f"{contexto}.{campo} deve ser um número")
+    if inteiro and valor != int(valor):
+        raise ErroRequisicao(f"{contexto}.{campo} deve ser inteiro")
+    return int(valor) if inteiro else float(valor)
+
+def _texto(dados, campo, padrao=""):
+    valor = dados.get(campo, padrao)
+    return padrao if valor is None else str(valor)
+
+def _item(dados, contexto, bobina):
+    if not isinstance(dados, dict):
+        raise ErroRequisicao(f"{contexto} deve ser um objeto")
+    return validar_item(
+        contexto, _texto(dados, "produto"), _numero(dados, "comprimento", contexto),
+        _numero(dados, "largura", contexto), _numero(dados, "quantidade", contexto, padrao=1, inteiro=True),
+        _texto(dados, "cor"), bobina=bobina, espessura=_numero(dados, "espessura", contexto),
+        preco_unitario=_numero(dados, "preco_unitario", contexto),
+    )
+
+def ler_pedido(dados):
+    """(cliente, vendedor, itens_confeccionados, itens_bobinas, observacao, preco_m2) do corpo JSON."""
+    if not isinstance(dados, dict):
+        raise ErroRequisicao("o corpo deve ser um objeto JSON")
+    cliente = dados.get("cliente") or {}
+    vendedor = dados.get("vendedor") or {}
+    if not isinstance(cliente, dict) or not isinstance(vendedor, dict):
+        raise ErroRequisicao("cliente e vendedor devem ser objetos")
+    conf, bob = dados.get("itens_confeccionados") or [], dados.get("itens_bobinas") or []
+    if not isinstance(conf, list) or not isinstance(bob, list):
+        raise ErroRequisicao("itens_confeccionados e itens_bobinas devem ser listas")
+    if len(conf) + len(bob) > API_ITENS_MAX:
+        raise ErroRequisicao(f"no máximo {API_ITENS_MAX} itens por requisição")
+    cliente = {
+        "nome": _texto(cliente, "nome"), "cnpj": _texto(cliente, "cnpj"),
+        "tipo_cliente": _texto(cliente, "tipo_cliente", " ") or " ", "estado": _texto(cliente, "estado", "SP"),
+        "frete": _texto(cliente, "frete", "CIF"), "tipo_pedido": _texto(cliente, "tipo_pedido", "Direta"),
+    }
+    vendedor = {"nome": _texto(vendedor, "nome"), "tel": _texto(vendedor, "tel"), "email": _texto(vendedor, "email")}
+    preco_m2 = _numero(dados, "preco_m2", "pedido", padrao=0.0)
+    itens_conf = [_item(i, f"itens_confeccionados[{n}]", bobina=False) for n, i in enumerate(conf)]
+    itens_bob = [_item(i, f"itens_bobinas[{n}]", bobina=True) for n, i in enumerate(bob)]
+    validar_orcamento("pedido", cliente, itens_bob, preco_m2)
+    return cliente, vendedor, itens_conf, itens_bob, _texto(dados, "observacao"), preco_m2
+
+def valores_json(resumo_conf, resumo_bob, regras):
+    """Resumos no formato de calcular_valores_* como JSON."""
+    m2, bruto, ipi, final, valor_st, aliquota_st = resumo_conf
+    metros, bruto_bob, ipi_bob, final_bob, aliquota_ipi_bob = resumo_bob
+    return {
+        "confeccionados": {"m2": m2, "valor_bruto": bruto, "ipi": ipi, "st": valor_st, "aliquota_st": aliquota_st, "valor_final": final},
+        "bobinas": {"metros": metros, "valor_bruto": bruto_bob, "ipi": ipi_bob, "aliquota_ipi": aliquota_ipi_bob, "valor_final": final_bob},
+        "valor_final_total": final + final_bob,
+        "regras_versao": regras.versao,
+    }
+
+def _erro(status, mensagem):
+    return JSONResponse({"erro": mensagem}, status_code=status)
+
+async def _corpo_json(request):
+    corpo = await request.body()
+    if len(corpo) > API_CORPO_MAX_BYTES:
+        raise ErroRequisicao(f"corpo maior que {API_CORPO_MAX_BYTES} bytes")
+    try:
+        return json.loads(corpo)
+    except ValueError:
+        raise ErroRequisicao("corpo não é JSON válido") from None
+
+def _autorizado(request):
+    token = os.environ.get(API_TOKEN_ENV)
+    if not token:
+        return True
+    enviado = request.headers.get("authorization", "")
+    return hmac.compare_digest(enviado.encode(), f"Bearer {token}".encode())
+
+async def precos(request):
+    try:
+        cliente, _, itens_conf, itens_bob, _, preco_m2 = ler_pedido(await _corpo_json(request))
+    except ErroValidacao as e:
+        return _erro(400, str(e))
+    regras = regras_vigentes()
+    resumo_conf = calcular_valores_confeccionados(
+        itens_conf, preco_m2, cliente["tipo_cliente"], cliente["estado"], cliente["tipo_pedido"], regras=regras
+    )
+    resumo_bob = calcular_valores_bobinas(itens_bob, preco_m2, cliente["tipo_pedido"], regras=regras)
+    return JSONResponse(valores_json(resumo_conf, resumo_bob, regras))
+
+async def criar_orcamento(request):
+    if not _autorizado(request):
+        return _erro(401, "token inválido ou ausente")
+    try:
+        cliente, vendedor, itens_conf, itens_bob, observacao, preco_m2 = ler_pedido(await _corpo_json(request))
+    except ErroValidacao as e:
+        return _erro(400, str(e))
+    if not itens_conf and not itens_bob:
+        return _erro(400, "o orçamento precisa de pelo menos um item")
+    regras = regras_vigentes()
+    futuro = enviar_orcamento(cliente, vendedor, itens_conf, itens_bob, observacao, preco_m2)
+    try:
+        # shield: no tempo esgotado o pedido continua na fila do escritor, que ainda resolve o Future
+        orcamento_id = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), ESCRITOR_TIMEOUT)
+    except asyncio.TimeoutError:
+        return _erro(503, "o banco não confirmou a gravação a tempo; consulte o histórico antes de reenviar")
+    except sqlite3.OperationalError as e:  # ex.: banco bloqueado por outro processo
+        return _erro(503, f"banco indisponível: {e}")
+    except sqlite3.Error as e:
+        return _erro(500, f"erro ao salvar o orçamento: {e}")
+    # Valores como ficaram gravados pelo escritor, sem recalcular
+    orc, _, _ = await run_in_threadpool(carregar_orcamento_por_id, orcamento_id)
+    resumo_conf, resumo_bob, _ = resumos_salvos(orc)
+    return JSONResponse({"id": orcamento_id, **valores_json(resumo_conf, resumo_bob, regras)}, status_code=201)
+
+async def pdf_orcamento(request):
+    if not _autorizado(request):
+        return _erro(401, "token inválido ou ausente")
+    orcamento_id = request.path_params["orcamento_id"]
+    gerador = request.app.state.gerador_pdfs
+    caminho = await run_in_threadpool(gerador.localizar, orcamento_id)
+    if caminho is None:
+        try:
+            # shield: se o cliente desconectar, a geração continua e o PDF fica armazenado
+            caminho = await asyncio.shield(asyncio.wrap_future(gerador.enviar(orcamento_id)))
+        except LookupError:
+            return _erro(404, "orçamento não encontrado")
+    # Enviado do disco em blocos, sem carregar o PDF inteiro em memória
+    return FileResponse(
+        caminho, media_type="application/pdf",
+        filename=f"orcamento_{orcamento_id}.pdf", content_disposition_type="inline"
+    )
+
+async def saude(request):
+    regras = regras_vigentes()
+    return JSONResponse({"ok": True, "regras_versao": regras.versao, "regras_vigencia": regras.vigencia.isoformat()})
+
+def criar_app(db_path=None, workers_pdf=API_PDF_WORKERS, diretorio_pdfs=PDF_DIR):
+    """App Starlette sobre o banco `db_path` e os PDFs em `diretorio_pdfs` (padrão: os do app Streamlit)."""
+    db_path = os.path.abspath(db_path or banco.DB_NAME)
+    diretorio_pdfs = os.path.abspath(diretorio_pdfs)
+
+    @asynccontextmanager
+    async def ciclo_de_vida(app):
+        banco.DB_NAME = db_path
+        init_db(db_path)
+
+        def renovar_pool(quebrado):
+            quebrado.shutdown(wait=False, cancel_futures=True)
+            return criar_pool_pdf(workers_pdf)
+
+        gerador = app.state.gerador_pdfs = GeradorPdfs(
+            diretorio_pdfs, criar_pool_pdf(workers_pdf), renovar_pool=renovar_pool
+        )
+        try:
+            yield
+        finally:
+            gerador.encerrar()
+            gerador.pool_processos.shutdown()
+
+    return Starlette(
+        routes=[
+            Route("/precos", precos, methods=["POST"]),
+            Route("/orcamentos", criar_orcamento, methods=["POST"]),
+            Route("/orcamentos/{orcamento_id:int}/pdf", pdf_orcamento, methods=["GET"]),
+            Route("/saude", saude, methods=["GET"]),
+        ],
+        lifespan=ciclo_de_vida,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8502)
+    parser.add_argument("--db", default=banco.DB_NAME, help="banco SQLite (padrão: o do app)")
+    parser.add_argument("--processos-pdf", type=int, default=API_PDF_WORKERS)
+    parser.add_argument("--pdfs", default=PDF_DIR, help="diretório do armazenamento de PDFs (padrão: o do app)")
+    args = parser.parse_args()
+    silenciar_avisos_sem_servidor()
+    uvicorn.run(criar_app(args.db, max(1, args.processos_pdf), args.pdfs), host=args.host, port=args.porta, access_log=False)
+
+if __name__ == "__main__":
+    main()
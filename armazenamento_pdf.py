@@ -0,0 +1,186 @@
+"""PDFs de orçamentos salvos: geração em segundo plano e armazenamento por conteúdo.
+
+Ao salvar, o app só enfileira o id no GeradorPdfs e segue. Uma thread do
+gerador carrega o orçamento do banco, renderiza o PDF no pool de processos
+(exportacao.get_pool_pdf) e grava o arquivo em PDF_DIR de forma atômica
+(arquivo temporário + os.replace), então um PDF pela metade nunca é lido.
+
+Os arquivos são nomeados pela chave do conteúdo (hash do orçamento salvo +
+VERSAO_MODELO_PDF) e distribuídos em subdiretórios pelos primeiros caracteres
+da chave (ab/cd/abcd....pdf). A tabela pdfs_orcamentos liga cada orçamento à
+sua chave; um PDF só é gerado de novo se o orçamento ou o modelo mudar, e
+conteúdo igual reaproveita o mesmo arquivo.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+
+from banco import buscar_pdf_orcamento, buscar_pdfs_orcamentos, carregar_orcamento_por_id, registrar_pdf_orcamento
+from exportacao import argumentos_pdf_orcamento, get_pool_pdf, hash_conteudo_orcamento, renovar_pool_pdf
+from pdf_orcamento import VERSAO_MODELO_PDF, gerar_pdf_de_argumentos
+
+# ============================
+# Configuração
+# ============================
+PDF_DIR = os.environ.get("ORC_PDF_DIR", "pdfs")
+PDF_GERADORES = 2  # threads que coordenam carregar -> renderizar (processo) -> gravar
+PDF_NIVEIS_SUBDIRETORIO = 2  # ab/cd/<chave>.pdf: até 65.536 diretórios, poucos arquivos em cada
+
+def chave_pdf(orc, confecc, bob):
+    """Chave do PDF de um orçamento salvo: muda com o conteúdo ou com VERSAO_MODELO_PDF."""
+    conteudo = f"{VERSAO_MODELO_PDF}:{hash_conteudo_orcamento(orc, confecc, bob)}"
+    return hashlib.sha256(conteudo.encode("ascii")).hexdigest()
+
+def caminho_no_armazenamento(diretorio, chave):
+    """Caminho do arquivo `chave` no armazenamento em `diretorio` (subdiretórios pela chave)."""
+    partes = [chave[2 * i:2 * i + 2] for i in range(PDF_NIVEIS_SUBDIRETORIO)]
+    return os.path.join(diretorio, *partes, f"{chave}.pdf")
+
+def gravar_atomico(caminho, dados):
+    """Grava `dados` em `caminho` via arquivo temporário no mesmo diretório + os.replace."""
+    diretorio = os.path.dirname(caminho)
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=".tmp-", suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+def ler_pdf(caminho):
+    """Conteúdo de um PDF do armazenamento (para downloads gerados só no clique).
+
+    Leitura simples de propósito: o st.download_button guarda o arquivo inteiro
+    como bytes na memória do servidor (inclusive quando recebe um arquivo aberto
+    ou um mmap), então não há como entregá-lo em partes; o ganho está em só ler
+    no clique. A API entrega os mesmos arquivos em blocos (FileResponse).
+    """
+    with open(caminho, "rb") as f:
+        return f.read()
+
+# ============================
+# Gerador em segundo plano
+# ============================
+class GeradorPdfs:
+    """Gera e grava PDFs de orçamentos salvos fora da thread da sessão.
+
+    `estado(id)` responde a partir do índice, do disco e das tarefas em andamento:
+    "pronto" (com o caminho), "gerando", "erro" (com a mensagem) ou "ausente".
+    Tarefas concluídas com sucesso saem da memória; o índice passa a ser a fonte.
+    `renovar_pool(quebrado)`, se dado, troca o pool de processos quando um worker
+    morre (BrokenProcessPool); sem ele, o PDF fica em "erro".
+    """
+
+    def __init__(self, diretorio, pool_processos, threads=PDF_GERADORES, renovar_pool=None):
+        self.diretorio = diretorio
+        self.pool_processos = pool_processos
+        self._renovar_pool = renovar_pool
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gerador-pdfs")
+        self._tarefas = {}  # id -> Future (em andamento ou com erro)
+        self._lock = threading.Lock()
+
+    def localizar(self, orcamento_id, chave=None):
+        """Caminho do PDF armazenado do orçamento, ou None se faltar ou estiver desatualizado.
+
+        Com `chave` (orçamento já carregado), confere o conteúdo; sem ela, só a
+        versão do modelo, já que orçamentos salvos não são alterados pelo app.
+        """
+        return self._caminho_registrado(buscar_pdf_orcamento(orcamento_id), chave)
+
+    def _caminho_registrado(self, registro, chave):
+        if registro is None:
+            return None
+        chave_salva, versao_modelo = registro
+        desatualizado = chave_salva != chave if chave else versao_modelo != VERSAO_MODELO_PDF
+        if desatualizado:
+            return None
+        caminho = caminho_no_armazenamento(self.diretorio, chave_salva)
+        return caminho if os.path.exists(caminho) else None
+
+    def enviar(self, orcamento_id):
+        """Enfileira a geração do PDF (uma vez por id); retorna o Future com o caminho."""
+        with self._lock:
+            futuro = self._tarefas.get(orcamento_id)
+            # Cancelado (encerramento) ou com erro: enfileira de novo
+            if futuro is not None and (not futuro.done() or (not futuro.cancelled() and futuro.exception() is None)):
+                return futuro
+            futuro = self._tarefas[orcamento_id] = self._executor.submit(self._gerar, orcamento_id)
+        futuro.add_done_callback(lambda f: self._concluir(orcamento_id, f))
+        return futuro
+
+    def _concluir(self, orcamento_id, futuro):
+        # Só o erro fica em memória (para estado()); exception() levantaria em um Future cancelado
+        if futuro.cancelled() or futuro.exception() is None:
+            with self._lock:
+                if self._tarefas.get(orcamento_id) is futuro:
+                    del self._tarefas[orcamento_id]
+
+    def _gerar(self, orcamento_id):
+        orc, confecc, bob = carregar_orcamento_por_id(orcamento_id)
+        if orc is None:
+            raise LookupError(f"Orçamento {orcamento_id} não encontrado")
+        chave = chave_pdf(orc, confecc, bob)
+        caminho = caminho_no_armazenamento(self.diretorio, chave)
+        if not os.path.exists(caminho):  # mesmo conteúdo já armazenado: só atualiza o índice
+            gravar_atomico(caminho, self._renderizar(argumentos_pdf_orcamento(orc, confecc, bob)))
+        registrar_pdf_orcamento(orcamento_id, chave, VERSAO_MODELO_PDF)
+        return caminho
+
+    def _renderizar(self, argumentos):
+        pool = self.pool_processos
+        try:
+            return pool.submit(gerar_pdf_de_argumentos, argumentos).result()[1]
+        except BrokenProcessPool:
+            if self._renovar_pool is None:
+                raise
+            with self._lock:
+                if self.pool_processos is pool:  # outra thread pode já ter trocado
+                    self.pool_processos = self._renovar_pool(pool)
+            return self.pool_processos.submit(gerar_pdf_de_argumentos, argumentos).result()[1]
+
+    def estado(self, orcamento_id, chave=None):
+        """(estado, detalhe) do PDF de `orcamento_id`; `chave` como em localizar()."""
+        return self._estado(orcamento_id, lambda: self.localizar(orcamento_id, chave))
+
+    def estados(self, chaves):
+        """{id: (estado, detalhe)} para {id: chave} (uma página do histórico), com uma consulta ao índice."""
+        registros = buscar_pdfs_orcamentos(chaves)
+        return {
+            orcamento_id: self._estado(
+                orcamento_id, lambda: self._caminho_registrado(registros.get(orcamento_id), chave)
+            )
+            for orcamento_id, chave in chaves.items()
+        }
+
+    def _estado(self, orcamento_id, localizar):
+        with self._lock:
+            futuro = self._tarefas.get(orcamento_id)
+        if futuro is not None and not futuro.done():
+            return "gerando", None
+        if futuro is not None and not futuro.cancelled() and futuro.exception() is not None:
+            return "erro", str(futuro.exception())
+        caminho = localizar()
+        if caminho is not None:
+            return "pronto", caminho
+        return "ausente", None
+
+    def encerrar(self):
+        """Espera os PDFs enfileirados serem gravados e libera as threads."""
+        self._executor.shutdown(wait=True)
+
+@st.cache_resource(show_spinner=False)
+def get_gerador_pdfs(diretorio=PDF_DIR):
+    """Gerador de PDFs do processo (st.cache_resource), gravando em `diretorio`."""
+    return GeradorPdfs(os.path.abspath(diretorio), get_pool_pdf(), renovar_pool=renovar_pool_pdf)
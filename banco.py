@@ -0,0 +1,912 @@
+"""Acesso ao banco SQLite de orçamentos: schema, migrações, pool, escrita e consultas."""
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytz
+import streamlit as st
+import streamlit.logger
+
+from calculos import calcular_valores_bobinas, calcular_valores_confeccionados, totais_em_lote
+from perfil import rastrear_sql
+
+# ============================
+# Banco SQLite
+# ============================
+DB_NAME = "orcamentos.db" 
+FUSO_BRASILIA = pytz.timezone("America/Sao_Paulo")
+# data_hora_utc: ISO-8601 em UTC, ordenável como texto (ex.: "2025-01-31T13:45:00Z")
+FORMATO_DATA_HORA_UTC = "%Y-%m-%dT%H:%M:%SZ"
+BACKFILL_CHUNK = 1000
+# Buscas textuais com mais resultados que isso são ordenadas por data, não por relevância
+BUSCA_MAX_RANQUEADOS = 2000
+SUGESTOES_CLIENTES_LIMITE = 8
+
+# Totais calculados no momento do salvamento (na ordem dos resumos de calcular_valores_*)
+TOTAIS_CONF_COLUNAS = ['conf_m2_total', 'conf_valor_bruto', 'conf_valor_ipi', 'conf_valor_final', 'conf_valor_st', 'conf_aliquota_st']
+TOTAIS_BOB_COLUNAS = ['bob_metros_total', 'bob_valor_bruto', 'bob_valor_ipi', 'bob_valor_final', 'bob_aliquota_ipi']
+TOTAIS_COLUNAS = TOTAIS_CONF_COLUNAS + TOTAIS_BOB_COLUNAS + ['valor_final_total']
+# Colunas de orcamentos na ordem em que os carregadores as retornam (orc[0], orc[1], ...)
+ORC_COLUNAS = [
+    'id','data_hora','cliente_nome','cliente_cnpj','tipo_cliente','estado','frete','tipo_pedido',
+    'vendedor_nome','vendedor_tel','vendedor_email','observacao','preco_m2_base','data_hora_utc'
+] + TOTAIS_COLUNAS
+ORC_COLUNAS_SQL = ", ".join(ORC_COLUNAS)
+
+def _para_utc_iso(dt):
+    """Converte um datetime com fuso para o texto de data_hora_utc."""
+    return dt.astimezone(pytz.utc).strftime(FORMATO_DATA_HORA_UTC)
+
+def _inicio_do_dia_utc(dia):
+    """Início (00:00 em Brasília) de uma data, no formato de data_hora_utc."""
+    return _para_utc_iso(FUSO_BRASILIA.localize(datetime.combine(dia, datetime.min.time())))
+
+def _data_local_de_utc_iso(texto):
+    """Data (em Brasília) de um valor de data_hora_utc."""
+    return pytz.utc.localize(datetime.strptime(texto, FORMATO_DATA_HORA_UTC)).astimezone(FUSO_BRASILIA).date()
+
+def _criar_schema_base(conn):
+    """Schema anterior às migrações versionadas (user_version 0).
+
+    Idempotente: cria as tabelas e adiciona as colunas legadas que faltarem.
+    """
+    cur = conn.cursor()
+    
+    # 1. Cria ou verifica a tabela orcamentos (com a nova coluna preco_m2_base)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS orcamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_hora TEXT,
+            cliente_nome TEXT,
+            cliente_cnpj TEXT,
+            tipo_cliente TEXT,
+            estado TEXT,
+            frete TEXT,
+            tipo_pedido TEXT,
+            vendedor_nome TEXT,
+            vendedor_tel TEXT,
+            vendedor_email TEXT,
+            observacao TEXT,
+            preco_m2_base REAL
+        )
+    """)
+    
+    # 2. Migração de Schema: Adiciona a coluna preco_m2_base se ela não existir
+    try:
+        cur.execute("SELECT preco_m2_base FROM orcamentos LIMIT 1")
+    except sqlite3.OperationalError:
+        cur.execute("ALTER TABLE orcamentos ADD COLUMN preco_m2_base REAL")
+        print("Migração de DB: Coluna 'preco_m2_base' adicionada à tabela 'orcamentos'.")
+
+    # 2.1 Migração de Schema: data_hora_utc (ISO-8601 UTC) indexada, para filtro e ordenação por data
+    try:
+        cur.execute("SELECT data_hora_utc FROM orcamentos LIMIT 1")
+    except sqlite3.OperationalError:
+        cur.execute("ALTER TABLE orcamentos ADD COLUMN data_hora_utc TEXT")
+        print("Migração de DB: Coluna 'data_hora_utc' adicionada à tabela 'orcamentos'.")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orcamentos_data_hora_utc ON orcamentos(data_hora_utc)")
+    conn.commit()
+    backfill_data_hora_utc(conn)
+
+    # 3. Criação de tabelas secundárias
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS itens_confeccionados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orcamento_id INTEGER,
+            produto TEXT,
+            comprimento REAL,
+            largura REAL,
+            quantidade INTEGER,
+            cor TEXT,
+            FOREIGN KEY (orcamento_id) REFERENCES orcamentos(id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS itens_bobinas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orcamento_id INTEGER,
+            produto TEXT,
+            comprimento REAL,
+            largura REAL,
+            quantidade INTEGER,
+            cor TEXT,
+            espessura REAL,
+            preco_unitario REAL,
+            FOREIGN KEY (orcamento_id) REFERENCES orcamentos(id)
+        )
+    """)
+    conn.commit()
+
+# ============================
+# Migrações versionadas (PRAGMA user_version)
+# ============================
+def _migracao_001_indices(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_itens_confeccionados_orcamento_id ON itens_confeccionados(orcamento_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_itens_bobinas_orcamento_id ON itens_bobinas(orcamento_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente_nome ON orcamentos(cliente_nome)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente_cnpj ON orcamentos(cliente_cnpj)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orcamentos_vendedor_nome ON orcamentos(vendedor_nome)")
+
+def _migracao_002_totais(cur):
+    for coluna in TOTAIS_COLUNAS:
+        cur.execute(f"ALTER TABLE orcamentos ADD COLUMN {coluna} REAL")
+    # Orçamentos antigos: calcula os totais com as regras atuais, em blocos
+    ultimo_id = 0
+    while True:
+        cur.execute("SELECT id FROM orcamentos WHERE id > ? ORDER BY id LIMIT ?", (ultimo_id, BACKFILL_CHUNK))
+        ids = [row[0] for row in cur.fetchall()]
+        if not ids:
+            break
+        carregados = _carregar_orcamentos_em_lote(cur, ids)
+        totais = totais_em_lote(carregados)
+        cur.executemany(
+            f"UPDATE orcamentos SET {', '.join(f'{c} = ?' for c in TOTAIS_COLUNAS)} WHERE id = ?",
+            [tuple(totais[orc_id]) + (orc_id,) for orc_id in ids]
+        )
+        ultimo_id = ids[-1]
+
+# Busca textual: CNPJ também indexado só com dígitos, para achar "12345678" em "12.345.678/0001-90"
+def _sql_digitos(coluna):
+    return f"replace(replace(replace(replace({coluna}, '.', ''), '/', ''), '-', ''), ' ', '')"
+
+def _migracao_003_busca_textual(cur):
+    # Tabela FTS5 própria (rowid = orcamentos.id); colunas com nomes distintos dos de orcamentos
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS orcamentos_fts USING fts5(
+            cliente, cnpj, cnpj_digitos, obs,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+    # Relevância: nome e CNPJ pesam mais que a observação
+    cur.execute("INSERT INTO orcamentos_fts(orcamentos_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 5.0, 1.0)')")
+    valores_novos = f"new.id, new.cliente_nome, new.cliente_cnpj, {_sql_digitos('new.cliente_cnpj')}, new.observacao"
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orcamentos_fts_ai AFTER INSERT ON orcamentos BEGIN
+            INSERT INTO orcamentos_fts(rowid, cliente, cnpj, cnpj_digitos, obs) VALUES ({valores_novos});
+        END
+    """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS orcamentos_fts_ad AFTER DELETE ON orcamentos BEGIN
+            DELETE FROM orcamentos_fts WHERE rowid = old.id;
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS orcamentos_fts_au AFTER UPDATE OF cliente_nome, cliente_cnpj, observacao ON orcamentos BEGIN
+            DELETE FROM orcamentos_fts WHERE rowid = old.id;
+            INSERT INTO orcamentos_fts(rowid, cliente, cnpj, cnpj_digitos, obs) VALUES ({valores_novos});
+        END
+    """)
+    cur.execute(f"""
+        INSERT INTO orcamentos_fts(rowid, cliente, cnpj, cnpj_digitos, obs)
+        SELECT id, cliente_nome, cliente_cnpj, {_sql_digitos('cliente_cnpj')}, observacao FROM orcamentos
+    """)
+
+def _migracao_004_prefixo_cliente(cur):
+    # Sugestões de cliente: LIKE 'prefixo%' sem diferenciar maiúsculas vira busca por faixa neste índice
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente_nome_nocase ON orcamentos(cliente_nome COLLATE NOCASE)")
+
+def _migracao_005_pdfs(cur):
+    # Armazenamento de PDFs por conteúdo: cada orçamento aponta para o arquivo (chave = hash) do seu PDF
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pdfs_orcamentos (
+            orcamento_id INTEGER PRIMARY KEY,
+            chave TEXT NOT NULL,
+            versao_modelo INTEGER NOT NULL,
+            gerado_em_utc TEXT NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_pdfs_orcamentos_chave ON pdfs_orcamentos(chave)")
+
+# Análises: totais por vendedor, estado, mês e produto, mantidos por triggers a cada gravação
+DIMENSOES_VENDAS = ["vendedor", "estado", "mes", "produto"]
+_VENDAS_COLUNAS = "orcamentos, quantidade, m2_total, metros_total, valor_bruto_total, valor_final_total"
+# Dimensões do cabeçalho do orçamento: expressão SQL do valor sobre a linha `{r}` (new/old)
+_DIMENSOES_ORCAMENTO = {
+    "vendedor": "coalesce({r}.vendedor_nome, '')",
+    "estado": "coalesce({r}.estado, '')",
+    # data_hora "dd/mm/aaaa HH:MM" (Brasília) -> "aaaa-mm"
+    "mes": "substr({r}.data_hora, 7, 4) || '-' || substr({r}.data_hora, 4, 2)",
+}
+
+def _sql_somar_vendas(dimensao, valor, sinal, orcamentos, quantidade, m2, metros, bruto, final):
+    """UPSERT em vendas_agregadas somando (sinal "+") ou subtraindo ("-") as medidas dadas."""
+    medidas = ", ".join(f"{sinal}({m})" for m in (orcamentos, quantidade, m2, metros, bruto, final))
+    atualizacoes = ", ".join(f"{c} = {c} + excluded.{c}" for c in _VENDAS_COLUNAS.split(", "))
+    return f"""
+        INSERT INTO vendas_agregadas (dimensao, valor, {_VENDAS_COLUNAS}) VALUES ('{dimensao}', {valor}, {medidas})
+        ON CONFLICT(dimensao, valor) DO UPDATE SET {atualizacoes};
+    """
+
+def _sql_vendas_orcamento(r, sinal):
+    return "".join(
+        _sql_somar_vendas(
+            dimensao, expressao.format(r=r), sinal, "1", "0",
+            f"coalesce({r}.conf_m2_total, 0)", f"coalesce({r}.bob_metros_total, 0)",
+            f"coalesce({r}.conf_valor_bruto, 0) + coalesce({r}.bob_valor_bruto, 0)",
+            f"coalesce({r}.valor_final_total, 0)",
+        )
+        for dimensao, expressao in _DIMENSOES_ORCAMENTO.items()
+    )
+
+def _sql_produto_unico(r, tabela, depois_de_inserir):
+    """1 se `{r}.produto` não aparece em outro item do mesmo orçamento, senão 0."""
+    outros = {"itens_confeccionados": "", "itens_bobinas": ""}
+    if depois_de_inserir:
+        outros[tabela] = f" AND id <> {r}.id"
+    return " AND ".join(
+        f"NOT EXISTS (SELECT 1 FROM {t} WHERE orcamento_id = {r}.orcamento_id AND produto = {r}.produto{extra})"
+        for t, extra in outros.items()
+    )
+
+def _sql_vendas_item(r, tabela, sinal):
+    preco_base = f"coalesce((SELECT preco_m2_base FROM orcamentos WHERE id = {r}.orcamento_id), 0)"
+    if tabela == "itens_confeccionados":
+        m2, metros = f"{r}.comprimento * {r}.largura * {r}.quantidade", "0"
+        bruto = f"{m2} * {preco_base}"
+    else:
+        m2, metros = "0", f"{r}.comprimento * {r}.quantidade"
+        bruto = f"{metros} * coalesce({r}.preco_unitario, {preco_base})"
+    unico = _sql_produto_unico(r, tabela, depois_de_inserir=(sinal == "+"))
+    # IPI e ST são calculados por orçamento, não por item: a coluna do valor final fica em 0
+    # para produtos e buscar_vendas_agregadas não a devolve
+    return _sql_somar_vendas("produto", f"coalesce({r}.produto, '')", sinal, unico, f"{r}.quantidade", m2, metros, bruto, "0")
+
+def _migracao_006_vendas_agregadas(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS vendas_agregadas (
+            dimensao TEXT NOT NULL,
+            valor TEXT NOT NULL,
+            orcamentos INTEGER NOT NULL,
+            quantidade REAL NOT NULL,
+            m2_total REAL NOT NULL,
+            metros_total REAL NOT NULL,
+            valor_bruto_total REAL NOT NULL,
+            valor_final_total REAL NOT NULL,
+            PRIMARY KEY (dimensao, valor)
+        ) WITHOUT ROWID
+    """)
+    colunas_orcamento = "vendedor_nome, estado, data_hora, conf_m2_total, bob_metros_total, conf_valor_bruto, bob_valor_bruto, valor_final_total"
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS vendas_orcamentos_ai AFTER INSERT ON orcamentos BEGIN {_sql_vendas_orcamento('new', '+')} END")
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS vendas_orcamentos_ad AFTER DELETE ON orcamentos BEGIN {_sql_vendas_orcamento('old', '-')} END")
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS vendas_orcamentos_au AFTER UPDATE OF {colunas_orcamento} ON orcamentos BEGIN
+            {_sql_vendas_orcamento('old', '-')} {_sql_vendas_orcamento('new', '+')}
+        END
+    """)
+    for tabela in ("itens_confeccionados", "itens_bobinas"):
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS vendas_{tabela}_ai AFTER INSERT ON {tabela} BEGIN {_sql_vendas_item('new', tabela, '+')} END")
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS vendas_{tabela}_ad AFTER DELETE ON {tabela} BEGIN {_sql_vendas_item('old', tabela, '-')} END")
+    # Histórico já gravado: uma agregação por dimensão
+    for dimensao, expressao in _DIMENSOES_ORCAMENTO.items():
+        cur.execute(f"""
+            INSERT INTO vendas_agregadas (dimensao, valor, {_VENDAS_COLUNAS})
+            SELECT '{dimensao}', {expressao.format(r="o")}, COUNT(*), 0, TOTAL(o.conf_m2_total), TOTAL(o.bob_metros_total),
+                   TOTAL(o.conf_valor_bruto) + TOTAL(o.bob_valor_bruto), TOTAL(o.valor_final_total)
+            FROM orcamentos o GROUP BY 2
+        """)
+    cur.execute(f"""
+        INSERT INTO vendas_agregadas (dimensao, valor, {_VENDAS_COLUNAS})
+        SELECT 'produto', coalesce(i.produto, ''), COUNT(DISTINCT i.orcamento_id), TOTAL(i.quantidade), TOTAL(i.m2), TOTAL(i.metros), TOTAL(i.bruto), 0
+        FROM (
+            SELECT c.orcamento_id, c.produto, c.quantidade, c.comprimento * c.largura * c.quantidade AS m2, 0 AS metros,
+                   c.comprimento * c.largura * c.quantidade * coalesce(o.preco_m2_base, 0) AS bruto
+            FROM itens_confeccionados c JOIN orcamentos o ON o.id = c.orcamento_id
+            UNION ALL
+            SELECT b.orcamento_id, b.produto, b.quantidade, 0, b.comprimento * b.quantidade,
+                   b.comprimento * b.quantidade * coalesce(b.preco_unitario, o.preco_m2_base, 0)
+            FROM itens_bobinas b JOIN orcamentos o ON o.id = b.orcamento_id
+        ) AS i GROUP BY 2
+    """)
+
+# (versão, descrição, função). Novas migrações entram no fim, com a próxima versão.
+MIGRACOES = [
+    (1, "índices de orcamento_id, cliente_nome, cliente_cnpj e vendedor_nome", _migracao_001_indices),
+    (2, "totais calculados (m², valores, IPI e ST) salvos em orcamentos", _migracao_002_totais),
+    (3, "busca textual (FTS5) em cliente, CNPJ e observação", _migracao_003_busca_textual),
+    (4, "índice de prefixo (sem maiúsculas) em cliente_nome", _migracao_004_prefixo_cliente),
+    (5, "índice de PDFs armazenados por conteúdo (pdfs_orcamentos)", _migracao_005_pdfs),
+    (6, "totais de vendas por vendedor, estado, mês e produto (vendas_agregadas)", _migracao_006_vendas_agregadas),
+]
+
+def _versao_schema(cur):
+    return cur.execute("PRAGMA user_version").fetchone()[0]
+
+def aplicar_migracoes(conn):
+    """Aplica, em ordem, as migrações com versão maior que o PRAGMA user_version.
+
+    Cada migração roda numa transação própria (BEGIN IMMEDIATE) junto com a
+    atualização do user_version; a versão é relida dentro da transação para que
+    dois processos não apliquem a mesma migração.
+    """
+    cur = conn.cursor()
+    if _versao_schema(cur) == 0:
+        _criar_schema_base(conn)
+    for versao, descricao, migrar in MIGRACOES:
+        if _versao_schema(cur) >= versao:
+            continue
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            if _versao_schema(cur) < versao:
+                migrar(cur)
+                cur.execute(f"PRAGMA user_version = {int(versao)}")
+                print(f"Migração de DB {versao}: {descricao}.")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# ============================
+# Pool de conexões
+# ============================
+POOL_TAMANHO = 8
+POOL_TIMEOUT = 30  # segundos aguardando uma conexão livre
+SQLITE_BUSY_TIMEOUT_MS = 5000
+SQLITE_CACHE_SIZE_KIB = 20000
+
+class PoolConexoes:
+    """Pool de conexões SQLite compartilhado entre as sessões do processo.
+
+    As conexões são abertas sob demanda (até `tamanho`) em modo WAL, para que
+    leituras não bloqueiem durante uma gravação, com busy_timeout para esperar o
+    lock em vez de falhar com "database is locked".
+    """
+
+    def __init__(self, db_path, tamanho=POOL_TAMANHO):
+        self.db_path = db_path
+        self.tamanho = tamanho
+        self._livres = queue.LifoQueue()
+        self._abertas = 0
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}")
+        return conn
+
+    def _obter(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._abertas < self.tamanho:
+                self._abertas += 1
+                try:
+                    return self._abrir()
+                except Exception:
+                    self._abertas -= 1
+                    raise
+        return self._livres.get(timeout=POOL_TIMEOUT)
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão; transações não confirmadas são desfeitas na devolução."""
+        conn = self._obter()
+        try:
+            with rastrear_sql(conn):
+                yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._livres.put(conn)
+
+@st.cache_resource(show_spinner=False)
+def get_pool(db_path):
+    """Pool do banco em `db_path`, criado uma vez por processo (st.cache_resource)."""
+    return PoolConexoes(db_path)
+
+def conexao_db():
+    """Conexão emprestada do pool do DB_NAME atual (usar com `with`)."""
+    return get_pool(os.path.abspath(DB_NAME)).conexao()
+
+@st.cache_resource(show_spinner=False)
+def init_db(db_path):
+    """Prepara o banco em `db_path`. Roda uma vez por processo (st.cache_resource)."""
+    with get_pool(db_path).conexao() as conn:
+        aplicar_migracoes(conn)
+
+def backfill_data_hora_utc(conn, chunk=BACKFILL_CHUNK):
+    """Preenche data_hora_utc a partir de data_hora ("dd/mm/aaaa HH:MM", Brasília).
+
+    Percorre as linhas sem data_hora_utc em blocos de `chunk` (por id), com um commit
+    por bloco. Linhas com data_hora ilegível ficam com data_hora_utc NULL.
+    """
+    cur = conn.cursor()
+    ultimo_id = 0
+    total = 0
+    while True:
+        cur.execute(
+            "SELECT id, data_hora FROM orcamentos WHERE data_hora_utc IS NULL AND id > ? ORDER BY id LIMIT ?",
+            (ultimo_id, chunk)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+        atualizacoes = []
+        for orc_id, data_hora in rows:
+            try:
+                local = FUSO_BRASILIA.localize(datetime.strptime(data_hora, "%d/%m/%Y %H:%M"))
+            except (TypeError, ValueError):
+                continue
+            atualizacoes.append((_para_utc_iso(local), orc_id))
+        cur.executemany("UPDATE orcamentos SET data_hora_utc = ? WHERE id = ?", atualizacoes)
+        conn.commit()
+        total += len(atualizacoes)
+        ultimo_id = rows[-1][0]
+    if total:
+        print(f"Migração de DB: data_hora_utc preenchida em {total} orçamento(s).")
+
+def _inserir_orcamento(cur, pedido):
+    """Insere um orçamento (cabeçalho + itens) com o cursor dado; retorna o id."""
+    cliente, vendedor, agora = pedido["cliente"], pedido["vendedor"], pedido["agora"]
+    cur.execute(f"""
+        INSERT INTO orcamentos (data_hora, data_hora_utc, cliente_nome, cliente_cnpj, tipo_cliente, estado, frete, tipo_pedido, vendedor_nome, vendedor_tel, vendedor_email, observacao, preco_m2_base, {", ".join(TOTAIS_COLUNAS)})
+        VALUES ({", ".join("?" * (13 + len(TOTAIS_COLUNAS)))})
+    """, (
+        agora.strftime("%d/%m/%Y %H:%M"),
+        _para_utc_iso(agora),
+        cliente.get("nome",""),
+        cliente.get("cnpj",""),
+        cliente.get("tipo_cliente",""),
+        cliente.get("estado",""),
+        cliente.get("frete",""),
+        cliente.get("tipo_pedido",""),
+        vendedor.get("nome",""),
+        vendedor.get("tel",""),
+        vendedor.get("email",""),
+        pedido["observacao"],
+        pedido["preco_m2_base"],
+        *pedido["totais"]
+    ))
+    orcamento_id = cur.lastrowid
+
+    cur.executemany("""
+        INSERT INTO itens_confeccionados (orcamento_id, produto, comprimento, largura, quantidade, cor)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [
+        (orcamento_id, item['produto'], item['comprimento'], item['largura'], item['quantidade'], item.get('cor',''))
+        for item in pedido["itens_confeccionados"]
+    ])
+
+    cur.executemany("""
+        INSERT INTO itens_bobinas (orcamento_id, produto, comprimento, largura, quantidade, cor, espessura, preco_unitario)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (orcamento_id, item['produto'], item['comprimento'], item['largura'], item['quantidade'], item.get('cor',''), item.get('espessura'), item.get('preco_unitario'))
+        for item in pedido["itens_bobinas"]
+    ])
+    return orcamento_id
+
+# ============================
+# Escritor único (group commit)
+# ============================
+ESCRITOR_LOTE_MAX = 64
+ESCRITOR_TIMEOUT = 60  # segundos aguardando o id de um orçamento salvo
+
+class EscritorOrcamentos:
+    """Thread única que grava orçamentos em lote (group commit).
+
+    As sessões enfileiram pedidos e aguardam o id num Future. A thread junta os
+    pedidos pendentes (até ESCRITOR_LOTE_MAX) numa única transação; cada pedido
+    fica num SAVEPOINT próprio, de modo que um pedido inválido falha sozinho sem
+    desfazer os demais. Os Futures só são resolvidos depois do COMMIT.
+    """
+
+    def __init__(self, pool, lote_max=ESCRITOR_LOTE_MAX):
+        self.pool = pool
+        self.lote_max = lote_max
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._executar, name="escritor-orcamentos", daemon=True)
+        self._thread.start()
+
+    def enviar(self, pedido):
+        """Enfileira um pedido de gravação; retorna um Future com o id do orçamento."""
+        futuro = Future()
+        self._fila.put((pedido, futuro))
+        return futuro
+
+    def _executar(self):
+        while True:
+            lote = [self._fila.get()]
+            while len(lote) < self.lote_max:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            # Pedidos cujo Future já foi cancelado (quem enviou desistiu) não são gravados
+            lote = [(pedido, futuro) for pedido, futuro in lote if futuro.set_running_or_notify_cancel()]
+            if not lote:
+                continue
+            try:
+                self._gravar_lote(lote)
+            except Exception as e:
+                # A thread é a única que grava: um erro inesperado falha só este lote
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
+
+    def _gravar_lote(self, lote):
+        resultados = []
+        try:
+            with self.pool.conexao() as conn:
+                cur = conn.cursor()
+                cur.execute("BEGIN IMMEDIATE")
+                for pedido, futuro in lote:
+                    cur.execute("SAVEPOINT pedido")
+                    try:
+                        resultados.append((futuro, _inserir_orcamento(cur, pedido), None))
+                        cur.execute("RELEASE SAVEPOINT pedido")
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT pedido")
+                        cur.execute("RELEASE SAVEPOINT pedido")
+                        resultados.append((futuro, None, e))
+                conn.commit()
+        except Exception as e:
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        for futuro, orcamento_id, erro in resultados:
+            if erro is not None:
+                futuro.set_exception(erro)
+            else:
+                futuro.set_result(orcamento_id)
+
+@st.cache_resource(show_spinner=False)
+def get_escritor(db_path):
+    """Escritor do banco em `db_path`, criado uma vez por processo (st.cache_resource)."""
+    return EscritorOrcamentos(get_pool(db_path))
+
+def silenciar_avisos_sem_servidor():
+    """Para processos sem servidor Streamlit (API, orcamento_lote, benchmarks).
+
+    Pool, escritor e gerador de PDFs continuam em st.cache_resource, que fora do
+    servidor avisa de "bare mode" a cada uso; só os erros do Streamlit aparecem.
+    """
+    streamlit.logger.set_log_level("error")
+
+def enviar_orcamento(cliente, vendedor, itens_confeccionados, itens_bobinas, observacao, preco_m2_base):
+    """Enfileira o orçamento no escritor sem esperar; retorna um Future com o id.
+
+    Vários envios seguidos são gravados juntos (até ESCRITOR_LOTE_MAX por transação).
+    """
+    # Totais e alíquotas ficam gravados com o orçamento, com as regras vigentes agora
+    preco = preco_m2_base if preco_m2_base is not None else 0.0
+    resumo_conf = calcular_valores_confeccionados(
+        itens_confeccionados, preco, cliente.get("tipo_cliente",""), cliente.get("estado",""), cliente.get("tipo_pedido","Direta")
+    )
+    resumo_bob = calcular_valores_bobinas(itens_bobinas, preco, cliente.get("tipo_pedido","Direta"))
+    pedido = {
+        "agora": datetime.now(FUSO_BRASILIA),
+        "cliente": cliente,
+        "vendedor": vendedor,
+        "itens_confeccionados": [dict(item) for item in itens_confeccionados],
+        "itens_bobinas": [dict(item) for item in itens_bobinas],
+        "observacao": observacao,
+        "preco_m2_base": preco_m2_base,
+        "totais": tuple(resumo_conf) + tuple(resumo_bob) + (resumo_conf[3] + resumo_bob[3],),
+    }
+    return get_escritor(os.path.abspath(DB_NAME)).enviar(pedido)
+
+def salvar_orcamento(cliente, vendedor, itens_confeccionados, itens_bobinas, observacao, preco_m2_base):
+    return enviar_orcamento(
+        cliente, vendedor, itens_confeccionados, itens_bobinas, observacao, preco_m2_base
+    ).result(timeout=ESCRITOR_TIMEOUT)
+
+def consulta_fts(texto):
+    """Consulta FTS5 para o texto digitado: todos os termos, cada um como prefixo.
+
+    Só palavras (letras/dígitos) passam, então aspas ou operadores digitados
+    pelo usuário não quebram a sintaxe do MATCH. None se não sobrar termo.
+    """
+    termos = re.findall(r"\w+", texto or "")
+    return " ".join(f'"{termo}"*' for termo in termos) or None
+
+def _contar_fts(consulta):
+    with conexao_db() as conn:
+        return conn.execute("SELECT COUNT(*) FROM orcamentos_fts WHERE orcamentos_fts MATCH ?", (consulta,)).fetchone()[0]
+
+def _padrao_prefixo_like(prefixo):
+    """Padrão LIKE (com ESCAPE '\\') para textos que começam com `prefixo`."""
+    return prefixo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def _filtros_orcamentos_sql(id_prefixo="", cliente=None, cnpj=None, vendedor=None, data_inicio=None, data_fim=None, id_menor_que=None, busca=None):
+    """Monta a cláusula WHERE (parametrizada) dos filtros do histórico."""
+    condicoes = []
+    params = []
+    consulta = consulta_fts(busca)
+    if consulta:
+        condicoes.append("id IN (SELECT rowid FROM orcamentos_fts WHERE orcamentos_fts MATCH ?)")
+        params.append(consulta)
+    if id_menor_que is not None:
+        condicoes.append("id < ?")
+        params.append(int(id_menor_que))
+    if id_prefixo:
+        condicoes.append("CAST(id AS TEXT) LIKE ? ESCAPE '\\'")
+        params.append(_padrao_prefixo_like(id_prefixo))
+    if cliente:
+        condicoes.append("cliente_nome = ?")
+        params.append(cliente)
+    if cnpj:
+        condicoes.append("cliente_cnpj = ?")
+        params.append(cnpj)
+    if vendedor:
+        condicoes.append("vendedor_nome = ?")
+        params.append(vendedor)
+    # Datas (em Brasília) convertidas para o intervalo [início, fim+1 dia) em UTC
+    if data_inicio:
+        condicoes.append("data_hora_utc >= ?")
+        params.append(_inicio_do_dia_utc(data_inicio))
+    if data_fim:
+        condicoes.append("data_hora_utc < ?")
+        params.append(_inicio_do_dia_utc(data_fim + timedelta(days=1)))
+    where = ("WHERE " + " AND ".join(condicoes)) if condicoes else ""
+    return where, params
+
+def buscar_orcamentos(limite=None, offset=0, por_relevancia=True, **filtros):
+    """Lista (id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome), mais recentes primeiro.
+
+    Os filtros (id_prefixo, cliente, cnpj, vendedor, data_inicio, data_fim, busca)
+    são aplicados no SQL; `limite`/`offset` paginam o resultado. Com `busca`
+    (texto livre em cliente, CNPJ e observação) e `por_relevancia`, os mais
+    relevantes (bm25) vêm primeiro, se a busca casar com até BUSCA_MAX_RANQUEADOS
+    orçamentos.
+    """
+    consulta = consulta_fts(filtros.get("busca")) if por_relevancia else None
+    if consulta and _contar_fts(consulta) > BUSCA_MAX_RANQUEADOS:
+        consulta = None  # busca ampla: ranquear todos custaria caro, ficam os mais recentes primeiro
+    if consulta:
+        where, params = _filtros_orcamentos_sql(**{**filtros, "busca": None})
+        sql = f"""
+            SELECT id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome FROM orcamentos
+            JOIN (SELECT rowid AS fts_id, rank AS fts_rank FROM orcamentos_fts WHERE orcamentos_fts MATCH ?) ON fts_id = id
+            {where} ORDER BY fts_rank, id DESC
+        """
+        params = [consulta] + params
+    else:
+        where, params = _filtros_orcamentos_sql(**filtros)
+        sql = f"SELECT id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome FROM orcamentos {where} ORDER BY id DESC"
+    if limite is not None:
+        sql += " LIMIT ? OFFSET ?"
+        params += [int(limite), int(offset)]
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+    return rows
+
+def iterar_orcamentos(lote, **filtros):
+    """Percorre buscar_orcamentos(**filtros) em blocos de até `lote` linhas.
+
+    Usa paginação por id (keyset) em vez de OFFSET, e cada bloco usa a conexão do
+    pool só durante a sua consulta.
+    """
+    id_menor_que = None
+    while True:
+        bloco = buscar_orcamentos(limite=lote, id_menor_que=id_menor_que, por_relevancia=False, **filtros)
+        if not bloco:
+            return
+        yield bloco
+        id_menor_que = bloco[-1][0]
+
+def contar_orcamentos(**filtros):
+    """Quantidade de orçamentos que atendem aos filtros de buscar_orcamentos."""
+    consulta = consulta_fts(filtros.get("busca"))
+    if consulta and not any(v for k, v in filtros.items() if k != "busca"):
+        # Só a busca textual: conta direto no índice FTS, sem ler orcamentos
+        return _contar_fts(consulta)
+    where, params = _filtros_orcamentos_sql(**filtros)
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM orcamentos {where}", params)
+        total = cur.fetchone()[0]
+    return total
+
+def buscar_valores_distintos(coluna):
+    """Valores distintos (não vazios) de cliente_nome, cliente_cnpj ou vendedor_nome."""
+    if coluna not in ("cliente_nome", "cliente_cnpj", "vendedor_nome"):
+        raise ValueError(f"Coluna não suportada: {coluna}")
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT DISTINCT {coluna} FROM orcamentos WHERE {coluna} IS NOT NULL AND {coluna} <> '' ORDER BY {coluna}")
+        valores = [row[0] for row in cur.fetchall()]
+    return valores
+
+def sugerir_clientes(prefixo, limite=SUGESTOES_CLIENTES_LIMITE):
+    """Clientes já orçados cujo nome começa com `prefixo` (sem diferenciar maiúsculas).
+
+    Retorna até `limite` tuplas (cliente_nome, cliente_cnpj, tipo_cliente, estado),
+    em ordem alfabética, com os dados do orçamento mais recente de cada cliente.
+    Percorre só a faixa do prefixo no índice; a lista completa nunca é carregada.
+    """
+    prefixo = (prefixo or "").strip()
+    if not prefixo:
+        return []
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT o.cliente_nome, o.cliente_cnpj, o.tipo_cliente, o.estado FROM (
+                SELECT DISTINCT cliente_nome FROM orcamentos
+                WHERE cliente_nome LIKE ? ESCAPE '\\'
+                ORDER BY cliente_nome COLLATE NOCASE LIMIT ?
+            ) AS c
+            JOIN orcamentos o ON o.id = (SELECT MAX(id) FROM orcamentos WHERE cliente_nome = c.cliente_nome)
+            ORDER BY o.cliente_nome COLLATE NOCASE
+        """, (_padrao_prefixo_like(prefixo), int(limite)))
+        rows = cur.fetchall()
+    return rows
+
+def buscar_limites_datas():
+    """(data mínima, data máxima) dos orçamentos salvos, ou (None, None) se vazio."""
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        # MIN/MAX separados para que cada um seja resolvido pelo índice de data_hora_utc
+        cur.execute("SELECT MIN(data_hora_utc) FROM orcamentos")
+        min_iso = cur.fetchone()[0]
+        cur.execute("SELECT MAX(data_hora_utc) FROM orcamentos")
+        max_iso = cur.fetchone()[0]
+    if min_iso is None:
+        return None, None
+    return _data_local_de_utc_iso(min_iso), _data_local_de_utc_iso(max_iso)
+
+def carregar_orcamento_por_id(orcamento_id):
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {ORC_COLUNAS_SQL} FROM orcamentos WHERE id=?", (orcamento_id,))
+        orc = cur.fetchone()
+        cur.execute("SELECT produto, comprimento, largura, quantidade, cor FROM itens_confeccionados WHERE orcamento_id=?", (orcamento_id,))
+        confecc = cur.fetchall()
+        cur.execute("SELECT produto, comprimento, largura, quantidade, cor, espessura, preco_unitario FROM itens_bobinas WHERE orcamento_id=?", (orcamento_id,))
+        bob = cur.fetchall()
+    return orc, confecc, bob
+
+def carregar_orcamentos_em_lote(ids):
+    """Carrega vários orçamentos de uma vez: {id: (orc, confecc, bob)}.
+
+    Usa sempre 3 consultas (cabeçalhos, confeccionados e bobinas), qualquer que seja
+    a quantidade de IDs. Os IDs são passados como um único array JSON (json_each),
+    evitando o limite de parâmetros do SQLite. A ordem de `ids` é preservada.
+    """
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    with conexao_db() as conn:
+        return _carregar_orcamentos_em_lote(conn.cursor(), ids)
+
+def _carregar_orcamentos_em_lote(cur, ids):
+    ids_json = json.dumps(ids)
+    cur.execute(f"SELECT {ORC_COLUNAS_SQL} FROM orcamentos WHERE id IN (SELECT value FROM json_each(?))", (ids_json,))
+    orcs = {row[0]: row for row in cur.fetchall()}
+    cur.execute("""
+        SELECT orcamento_id, produto, comprimento, largura, quantidade, cor FROM itens_confeccionados
+        WHERE orcamento_id IN (SELECT value FROM json_each(?)) ORDER BY orcamento_id, id
+    """, (ids_json,))
+    confecc_por_orc = {}
+    for row in cur.fetchall():
+        confecc_por_orc.setdefault(row[0], []).append(row[1:])
+    cur.execute("""
+        SELECT orcamento_id, produto, comprimento, largura, quantidade, cor, espessura, preco_unitario FROM itens_bobinas
+        WHERE orcamento_id IN (SELECT value FROM json_each(?)) ORDER BY orcamento_id, id
+    """, (ids_json,))
+    bob_por_orc = {}
+    for row in cur.fetchall():
+        bob_por_orc.setdefault(row[0], []).append(row[1:])
+    return {
+        orc_id: (orcs[orc_id], confecc_por_orc.get(orc_id, []), bob_por_orc.get(orc_id, []))
+        for orc_id in ids if orc_id in orcs
+    }
+
+def carregar_cabecalhos_em_lote(ids):
+    """{id: orc} (colunas de ORC_COLUNAS, com os totais gravados) em uma consulta, na ordem de `ids`."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {ORC_COLUNAS_SQL} FROM orcamentos WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(ids),))
+        orcs = {row[0]: row for row in cur.fetchall()}
+    return {orc_id: orcs[orc_id] for orc_id in ids if orc_id in orcs}
+
+def quantidades_por_produto_em_lote(ids):
+    """{id: [(bobina, produto, quantidade), ...]} somando a quantidade por produto, em uma consulta.
+
+    Confeccionados vêm antes das bobinas e, em cada tipo, os produtos na ordem do
+    primeiro item: a mesma ordem em que aparecem nos itens de carregar_orcamentos_em_lote.
+    """
+    ids_json = json.dumps([int(i) for i in ids])
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT orcamento_id, 0, produto, SUM(quantidade), MIN(id) FROM itens_confeccionados
+            WHERE orcamento_id IN (SELECT value FROM json_each(?)) GROUP BY orcamento_id, produto
+            UNION ALL
+            SELECT orcamento_id, 1, produto, SUM(quantidade), MIN(id) FROM itens_bobinas
+            WHERE orcamento_id IN (SELECT value FROM json_each(?)) GROUP BY orcamento_id, produto
+            ORDER BY 1, 2, 5
+        """, (ids_json, ids_json))
+        rows = cur.fetchall()
+    por_orc = {}
+    for orc_id, bobina, produto, quantidade, _ in rows:
+        por_orc.setdefault(orc_id, []).append((bool(bobina), produto, quantidade))
+    return por_orc
+
+def buscar_vendas_agregadas(dimensao):
+    """Totais de `dimensao` (uma de DIMENSOES_VENDAS), do maior valor final/bruto para o menor.
+
+    Lê só vendas_agregadas (uma linha por vendedor, estado, mês ou produto), então
+    o custo não depende da quantidade de orçamentos. Retorna tuplas
+    (valor, orcamentos, quantidade, m2_total, metros_total, valor_bruto_total, valor_final_total).
+    Produtos não têm valor final (IPI e ST são do orçamento): valor_final_total
+    vem None e a ordem é pelo valor bruto.
+    """
+    if dimensao not in DIMENSOES_VENDAS:
+        raise ValueError(f"Dimensão desconhecida: {dimensao}")
+    colunas = _VENDAS_COLUNAS
+    if dimensao == "mes":
+        ordem = "valor"
+    elif dimensao == "produto":
+        colunas = colunas.replace("valor_final_total", "NULL")
+        ordem = "valor_bruto_total DESC, valor"
+    else:
+        ordem = "valor_final_total DESC, valor_bruto_total DESC, valor"
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT valor, {colunas} FROM vendas_agregadas
+            WHERE dimensao = ? AND orcamentos > 0 ORDER BY {ordem}
+        """, (dimensao,))
+        return cur.fetchall()
+
+def buscar_pdf_orcamento(orcamento_id):
+    """(chave, versao_modelo) do PDF armazenado para o orçamento, ou None."""
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT chave, versao_modelo FROM pdfs_orcamentos WHERE orcamento_id=?", (orcamento_id,))
+        return cur.fetchone()
+
+def buscar_pdfs_orcamentos(ids):
+    """{id: (chave, versao_modelo)} dos PDFs armazenados para os orçamentos em `ids`, numa consulta."""
+    ids = [int(i) for i in ids]
+    if not ids:
+        return {}
+    with conexao_db() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT orcamento_id, chave, versao_modelo FROM pdfs_orcamentos "
+            "WHERE orcamento_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(ids),)
+        )
+        return {row[0]: row[1:] for row in cur.fetchall()}
+
+def registrar_pdf_orcamento(orcamento_id, chave, versao_modelo):
+    """Aponta o orçamento para o PDF `chave` do armazenamento (substitui o anterior)."""
+    with conexao_db() as conn:
+        conn.execute("""
+            INSERT INTO pdfs_orcamentos (orcamento_id, chave, versao_modelo, gerado_em_utc) VALUES (?, ?, ?, ?)
+            ON CONFLICT(orcamento_id) DO UPDATE SET
+                chave=excluded.chave, versao_modelo=excluded.versao_modelo, gerado_em_utc=excluded.gerado_em_utc
+        """, (orcamento_id, chave, versao_modelo, _para_utc_iso(datetime.now(pytz.utc))))
+        conn.commit()
+
+def resumos_salvos(orc):
+    """(resumo_conf, resumo_bob, valor_final_total) gravados com o orçamento.
+
+    resumo_conf/resumo_bob têm o mesmo formato do retorno de calcular_valores_*.
+    """
+    dados = dict(zip(ORC_COLUNAS, orc))
+    resumo_conf = tuple(dados[c] or 0 for c in TOTAIS_CONF_COLUNAS)
+    aliquota_st = resumo_conf[5]
+    if float(aliquota_st).is_integer():
+        # alíquotas de ST são percentuais inteiros; REAL no banco viraria "14.0%"
+        resumo_conf = resumo_conf[:5] + (int(aliquota_st),)
+    resumo_bob = tuple(dados[c] or 0 for c in TOTAIS_BOB_COLUNAS)
+    return resumo_conf, resumo_bob, dados['valor_final_total'] or 0.0
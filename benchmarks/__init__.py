@@ -0,0 +1,10 @@
+"""Benchmarks dos caminhos críticos do app (banco, cálculos, PDF e Excel).
+
+Rodar sempre da raiz do repositório, como módulos:
+    python -m benchmarks.gerar_base --tamanho 100000
+    python -m benchmarks.executar --tamanhos 1000 100000 --saida resultados.json
+    python -m benchmarks.comparar base.json resultados.json
+    python -m benchmarks.paridade_calculos
+    python -m benchmarks.carga --vendedores 8 --ciclos 5
+    python -m benchmarks.carga_api --conexoes 50 --requisicoes 100
+"""
@@ -0,0 +1,42 @@
+"""Tempo de gerar_pdf para orçamentos com 10, 100 e 1.000 linhas de item.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.bench_pdf [--repeticoes N]
+"""
+import argparse
+import statistics
+import time
+
+from pdf_orcamento import gerar_pdf
+
+TAMANHOS = (10, 100, 1000)
+
+def itens_exemplo(n):
+    """`n` itens confeccionados de exemplo para o PDF."""
+    return [
+        {"produto": "Encerado", "comprimento": 1.0 + i % 7, "largura": 2.5, "quantidade": 1 + i % 4, "cor": "Azul"}
+        for i in range(n)
+    ]
+
+def medir(n_itens, repeticoes=5):
+    """Mediana (s) de `repeticoes` chamadas de gerar_pdf com `n_itens` confeccionados."""
+    itens = itens_exemplo(n_itens)
+    cliente = {"nome": "Cliente Benchmark", "cnpj": "00.000.000/0001-00", "estado": "SP", "tipo_pedido": "Direta"}
+    vendedor = {"nome": "Vendedor", "tel": "11 0000-0000", "email": "vendedor@example.com"}
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        gerar_pdf(1, cliente, vendedor, itens, [], (0, 0, 0, 0, 0, 0), None, "Observação", 10.0)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    for n in TAMANHOS:
+        segundos = medir(n, args.repeticoes)
+        print(f"{n:>5} linhas: {segundos * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""Teste de carga do app: N vendedores simulados usando o streamlit_app.py real ao mesmo tempo.
+
+Cada vendedor é uma sessão AppTest que, em ciclos, adiciona itens, salva com
+"📄 Gerar PDF e Salvar Orçamento", abre o histórico, filtra por vendedor e
+ID e usa a busca textual. O banco é temporário e pode partir de uma base sintética
+(benchmarks.gerar_base). Ao final, mostra p50/p95/p99 da latência de rerun
+(geral e por ação) e a vazão de salvamentos.
+
+AppTest não suporta sessões simultâneas no mesmo processo (o Runtime simulado é
+global), então cada vendedor roda num processo próprio e todos largam juntos.
+Todos usam o mesmo arquivo de banco, então a disputa de leitura e escrita no
+SQLite é real. A disputa pelo GIL de um servidor único não é reproduzida, e cada
+processo tem o seu escritor. Os PDFs salvos vão para o armazenamento em disco
+(armazenamento_pdf, ORC_PDF_DIR relativo ao diretório temporário), o mesmo para
+todos os vendedores; cada processo tem o seu GeradorPdfs e pool de renderização,
+então o salvamento mede só o enfileiramento e o histórico lê o índice e o disco.
+Cada clique reexecuta o script inteiro, inclusive dentro de st.fragment: a
+medição de adicionar_item não mostra o ganho dos fragmentos da seção de itens.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.carga --vendedores 8 --ciclos 5 [--base 100000] [--saida carga.json]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+from armazenamento_pdf import get_gerador_pdfs
+from banco import aplicar_migracoes, silenciar_avisos_sem_servidor
+from exportacao import get_pool_pdf
+from benchmarks.gerar_base import DIRETORIO_PADRAO, TAMANHOS, garantir_base
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit_app.py")
+TIMEOUT_RERUN = 120
+PRODUTOS_CARGA = ["Lonil de PVC", "Encerado", "Lonil KP", "Sider Truck Lateral", "Duramax"]
+# Termos da busca do histórico (clientes da carga e da base sintética, observações)
+BUSCAS_CARGA = ["carga", "cliente carga 01", "agro", "silva", "transp", "entrega"]
+
+class Vendedor:
+    """Uma sessão do app dirigida por um vendedor simulado."""
+
+    def __init__(self, indice, ciclos, semente):
+        self.indice = indice
+        self.ciclos = ciclos
+        self.rng = random.Random(semente + indice)
+        self.medicoes = []  # (ação, segundos)
+        self.salvos = 0
+        self.erros = []
+        self.at = None
+
+    def _rerun(self, acao, elemento=None):
+        """Executa um rerun (do elemento alterado ou do app) e mede o tempo."""
+        inicio = time.perf_counter()
+        if elemento is None:
+            self.at.run(timeout=TIMEOUT_RERUN)
+        else:
+            elemento.run(timeout=TIMEOUT_RERUN)
+        self.medicoes.append((acao, time.perf_counter() - inicio))
+        if self.at.exception:
+            raise RuntimeError(f"{acao}: {self.at.exception[0].message}")
+
+    def _menu(self, pagina):
+        self._rerun("menu", self.at.sidebar.selectbox(key="main_menu_select").select(pagina))
+
+    def _novo_orcamento(self, ciclo):
+        at = self.at
+        self._rerun("preencher", at.text_input(key="Cliente_nome").input(f"Cliente Carga {self.indice:02d}-{ciclo:03d}"))
+        self._rerun("preencher", at.selectbox(key="tipo_cliente").select(self.rng.choice(["Consumidor Final", "Revenda"])))
+        self._rerun("preencher", at.selectbox(key="produto_sel").select(self.rng.choice(PRODUTOS_CARGA)))
+        self._rerun("preencher", at.number_input(key="preco_m2").set_value(round(self.rng.uniform(8, 60), 2)))
+        for _ in range(self.rng.randint(1, 4)):
+            self._rerun("adicionar_item", at.number_input(key="comp_conf").set_value(round(self.rng.uniform(1, 12), 2)))
+            self._rerun("adicionar_item", at.button(key="add_conf").click())
+        # options[0] é "Selecione um Vendedor"
+        vendedores = at.selectbox(key="vendedor_select").options[1:]
+        self._rerun("preencher", at.selectbox(key="vendedor_select").select(vendedores[self.indice % len(vendedores)]))
+        self._rerun("salvar", at.button(key="gerar_e_salvar").click())
+        if not any("Orçamento salvo" in s.value for s in at.success):
+            raise RuntimeError("salvar: orçamento não foi salvo")
+        self.salvos += 1
+        self._rerun("limpar", at.button(key="clear_novo_orc_form").click())
+
+    def _historico(self):
+        at = self.at
+        self._menu("Histórico de Orçamentos")
+        vendedores = at.selectbox(key="filtro_vendedor").options[1:]
+        if vendedores:
+            self._rerun("filtrar_historico", at.selectbox(key="filtro_vendedor").select(self.rng.choice(vendedores)))
+        self._rerun("filtrar_historico", at.selectbox(key="historico_tamanho_pagina").select(self.rng.choice([10, 20, 50])))
+        self._rerun("filtrar_historico", at.text_input(key="filtro_busca").input(self.rng.choice(BUSCAS_CARGA)))
+        self._rerun("filtrar_historico", at.button(key="clear_historico_filters").click())
+        self._rerun("filtrar_historico", at.text_input(key="filtro_id").input(str(self.rng.randint(1, 9))))
+        self._rerun("filtrar_historico", at.text_input(key="filtro_id").input(""))
+        self._menu("Novo Orçamento")
+
+    def abrir(self):
+        """Primeira execução da sessão (importações e migrações), fora da medição."""
+        self.at = AppTest.from_file(APP, default_timeout=TIMEOUT_RERUN).run()
+
+    def executar(self):
+        try:
+            for ciclo in range(self.ciclos):
+                self._novo_orcamento(ciclo)
+                self._historico()
+        except Exception as e:  # o relatório mostra a falha; os outros vendedores seguem
+            self.erros.append(f"vendedor {self.indice}: {e}")
+
+def _processo_vendedor(indice, ciclos, semente, diretorio, prontos, largada, resultados):
+    """Corpo de cada processo: abre a sessão, espera a largada e envia as medições."""
+    silenciar_avisos_sem_servidor()
+    # O app usa caminhos relativos (orcamentos.db, PDFs salvos)
+    os.chdir(diretorio)
+    vendedor = Vendedor(indice, ciclos, semente)
+    try:
+        vendedor.abrir()
+    except Exception as e:
+        vendedor.erros.append(f"vendedor {indice}: abrir: {e}")
+    prontos.put(indice)
+    largada.wait()
+    if not vendedor.erros:
+        vendedor.executar()
+        # PDFs dos salvamentos ainda em segundo plano terminam antes do processo sair;
+        # o pool de processos é encerrado aqui porque, num processo filho, a saída
+        # espera os processos filhos antes dos atexit que o encerrariam
+        get_gerador_pdfs().encerrar()
+        get_pool_pdf().shutdown()
+    resultados.put((vendedor.medicoes, vendedor.salvos, vendedor.erros))
+
+def percentis(segundos):
+    """{"n", "p50_ms", "p95_ms", "p99_ms", "max_ms"} de uma lista de durações em segundos."""
+    ms = sorted(s * 1000 for s in segundos)
+    if len(ms) == 1:
+        cortes = ms * 99
+    else:
+        cortes = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "n": len(ms),
+        "p50_ms": round(cortes[49], 2),
+        "p95_ms": round(cortes[94], 2),
+        "p99_ms": round(cortes[98], 2),
+        "max_ms": round(ms[-1], 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vendedores", type=int, default=8)
+    parser.add_argument("--ciclos", type=int, default=3, help="orçamentos salvos (e consultas ao histórico) por vendedor")
+    parser.add_argument("--base", type=int, choices=TAMANHOS, help="parte de uma base sintética com este tamanho")
+    parser.add_argument("--dados", default=DIRETORIO_PADRAO, help="diretório das bases geradas")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava o relatório também em JSON")
+    args = parser.parse_args()
+    silenciar_avisos_sem_servidor()
+
+    diretorio = tempfile.mkdtemp(prefix="orc-carga-")
+    caminho_db = os.path.join(diretorio, "orcamentos.db")
+    if args.base:
+        shutil.copyfile(garantir_base(args.base, args.dados), caminho_db)
+    # Migrações antes da largada, para não entrarem na medição
+    conn = sqlite3.connect(caminho_db)
+    try:
+        aplicar_migracoes(conn)
+    finally:
+        conn.close()
+
+    contexto = multiprocessing.get_context("spawn")
+    prontos, resultados, largada = contexto.Queue(), contexto.Queue(), contexto.Event()
+    processos = [
+        contexto.Process(target=_processo_vendedor, args=(i, args.ciclos, args.semente, diretorio, prontos, largada, resultados))
+        for i in range(args.vendedores)
+    ]
+    try:
+        for processo in processos:
+            processo.start()
+        for _ in processos:
+            prontos.get()
+        inicio = time.perf_counter()
+        largada.set()
+        coletados = [resultados.get() for _ in processos]
+        duracao = time.perf_counter() - inicio
+        for processo in processos:
+            processo.join()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    medicoes = [m for medidas, _, _ in coletados for m in medidas]
+    salvos = sum(n for _, n, _ in coletados)
+    erros = [e for _, _, falhas in coletados for e in falhas]
+    por_acao = {}
+    for acao, segundos in medicoes:
+        por_acao.setdefault(acao, []).append(segundos)
+    relatorio = {
+        "vendedores": args.vendedores,
+        "ciclos": args.ciclos,
+        "base": args.base or 0,
+        "duracao_s": round(duracao, 2),
+        "salvamentos": salvos,
+        "salvamentos_por_s": round(salvos / duracao, 3) if duracao else 0.0,
+        "reruns": percentis([s for _, s in medicoes]) if medicoes else None,
+        "por_acao": {acao: percentis(s) for acao, s in sorted(por_acao.items())},
+        "erros": erros,
+    }
+
+    print(f"{args.vendedores} vendedores x {args.ciclos} ciclos em {duracao:.1f}s (base inicial: {args.base or 0} orçamentos)")
+    print(f"salvamentos: {salvos} ({relatorio['salvamentos_por_s']:.2f}/s)")
+    print(f"{'ação':<20} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'máx ms':>10}")
+    linhas = list(relatorio["por_acao"].items()) + ([("TODOS OS RERUNS", relatorio["reruns"])] if medicoes else [])
+    for acao, p in linhas:
+        print(f"{acao:<20} {p['n']:>6} {p['p50_ms']:>10.1f} {p['p95_ms']:>10.1f} {p['p99_ms']:>10.1f} {p['max_ms']:>10.1f}")
+    for erro in erros:
+        print(f"ERRO {erro}", file=sys.stderr)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if erros else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Teste de carga da API (api_orcamentos): muitas conexões simultâneas em POST /precos e /orcamentos.
+
+Sobe a API num processo próprio (banco temporário), abre `--conexoes` conexões
+HTTP/1.1 persistentes e dispara `--requisicoes` requisições por conexão, só com
+asyncio da biblioteca padrão. Mostra vazão e p50/p95/p99 por endpoint.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.carga_api [--conexoes 50] [--requisicoes 100] [--saida carga_api.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+
+from benchmarks.carga import percentis
+
+CORPO_PRECOS = {
+    "cliente": {"tipo_cliente": "Revenda", "estado": "RJ"},
+    "preco_m2": 12.5,
+    "itens_confeccionados": [{"produto": "Encerado", "comprimento": 5, "largura": 3, "quantidade": 2}] * 5,
+    "itens_bobinas": [{"produto": "Vitro 0,40", "comprimento": 50, "largura": 1.4, "quantidade": 1, "espessura": 0.4}],
+}
+CORPO_ORCAMENTO = {**CORPO_PRECOS, "cliente": {"nome": "Cliente Carga API", **CORPO_PRECOS["cliente"]}}
+# (endpoint, corpo, fração das requisições)
+MISTURA = (("/precos", CORPO_PRECOS, 0.9), ("/orcamentos", CORPO_ORCAMENTO, 0.1))
+
+def _servidor(db_path, porta):
+    import uvicorn
+
+    from api_orcamentos import criar_app
+    from banco import silenciar_avisos_sem_servidor
+    silenciar_avisos_sem_servidor()
+    app = criar_app(db_path, workers_pdf=1, diretorio_pdfs=os.path.join(os.path.dirname(db_path), "pdfs"))
+    uvicorn.run(app, host="127.0.0.1", port=porta, log_level="warning", access_log=False)
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _requisicao(leitor, escritor, caminho, corpo):
+    escritor.write(
+        f"POST {caminho} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(corpo)}\r\n\r\n".encode() + corpo
+    )
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while (linha := await leitor.readline()) not in (b"\r\n", b""):
+        nome, _, valor = linha.decode().partition(":")
+        if nome.lower() == "content-length":
+            tamanho = int(valor)
+    await leitor.readexactly(tamanho)
+    return status
+
+async def _conexao(porta, plano, medicoes, erros):
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    try:
+        for caminho, corpo in plano:
+            inicio = time.perf_counter()
+            status = await _requisicao(leitor, escritor, caminho, corpo)
+            medicoes.setdefault(caminho, []).append(time.perf_counter() - inicio)
+            if status >= 400:
+                erros.append(f"{caminho}: HTTP {status}")
+    finally:
+        escritor.close()
+
+async def _carga(porta, conexoes, requisicoes):
+    corpos = [(caminho, json.dumps(corpo).encode(), fracao) for caminho, corpo, fracao in MISTURA]
+    planos = []
+    for c in range(conexoes):
+        plano = []
+        for r in range(requisicoes):
+            # distribuição determinística conforme as frações de MISTURA
+            posicao, acumulado = ((c * requisicoes + r) * 0.618034) % 1.0, 0.0
+            for caminho, corpo, fracao in corpos:
+                acumulado += fracao
+                if posicao < acumulado:
+                    plano.append((caminho, corpo))
+                    break
+            else:
+                plano.append(corpos[-1][:2])
+        planos.append(plano)
+    medicoes, erros = {}, []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_conexao(porta, plano, medicoes, erros) for plano in planos))
+    return medicoes, erros, time.perf_counter() - inicio
+
+async def _esperar_servidor(porta, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            _, escritor = await asyncio.open_connection("127.0.0.1", porta)
+            escritor.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("a API não subiu a tempo")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--conexoes", type=int, default=50)
+    parser.add_argument("--requisicoes", type=int, default=100, help="requisições por conexão")
+    parser.add_argument("--saida", help="grava o relatório também em JSON")
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix="orc-carga-api-")
+    porta = _porta_livre()
+    servidor = multiprocessing.get_context("spawn").Process(
+        target=_servidor, args=(os.path.join(diretorio, "orcamentos.db"), porta), daemon=True
+    )
+    servidor.start()
+    try:
+        asyncio.run(_esperar_servidor(porta))
+        medicoes, erros, duracao = asyncio.run(_carga(porta, args.conexoes, args.requisicoes))
+    finally:
+        servidor.terminate()
+        servidor.join()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    total = sum(len(m) for m in medicoes.values())
+    relatorio = {
+        "conexoes": args.conexoes,
+        "requisicoes": total,
+        "duracao_s": round(duracao, 2),
+        "requisicoes_por_s": round(total / duracao, 1) if duracao else 0.0,
+        "por_endpoint": {caminho: percentis(m) for caminho, m in sorted(medicoes.items())},
+        "erros": erros[:20],
+    }
+    print(f"{total} requisições em {duracao:.2f}s ({relatorio['requisicoes_por_s']:.0f}/s) com {args.conexoes} conexões")
+    print(f"{'endpoint':<14} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'máx ms':>10}")
+    for caminho, p in relatorio["por_endpoint"].items():
+        print(f"{caminho:<14} {p['n']:>6} {p['p50_ms']:>10.1f} {p['p95_ms']:>10.1f} {p['p99_ms']:>10.1f} {p['max_ms']:>10.1f}")
+    for erro in relatorio["erros"]:
+        print(f"ERRO {erro}", file=sys.stderr)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if erros else 0)
+
+if __name__ == "__main__":
+    main()
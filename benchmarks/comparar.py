@@ -0,0 +1,51 @@
+"""Compara dois arquivos de resultados de benchmarks.executar e aponta regressões.
+
+Uma medição regride quando a mediana nova passa de `--limite` vezes a antiga e a
+diferença absoluta passa de `--minimo-ms` (evita ruído em operações de microssegundos).
+Sai com código 1 se houver regressão, para uso em CI.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.comparar base.json novo.json [--limite 1.2] [--minimo-ms 0.5]
+"""
+import argparse
+import json
+import sys
+
+def _carregar(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+def comparar(base, novo, limite=1.2, minimo_ms=0.5):
+    """Linhas (grupo, nome, mediana_base, mediana_nova, razão, regrediu) das medições presentes nos dois."""
+    linhas = []
+    for grupo, medicoes in novo["resultados"].items():
+        anteriores = base["resultados"].get(grupo, {})
+        for nome, atual in medicoes.items():
+            if nome not in anteriores:
+                continue
+            antes, depois = anteriores[nome]["mediana_ms"], atual["mediana_ms"]
+            razao = depois / antes if antes else float("inf")
+            regrediu = razao > limite and depois - antes > minimo_ms
+            linhas.append((grupo, nome, antes, depois, razao, regrediu))
+    return linhas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("novo")
+    parser.add_argument("--limite", type=float, default=1.2, help="razão nova/base acima da qual há regressão")
+    parser.add_argument("--minimo-ms", type=float, default=0.5, help="diferença mínima (ms) para contar como regressão")
+    args = parser.parse_args()
+
+    base, novo = _carregar(args.base), _carregar(args.novo)
+    print(f"base: {base.get('commit') or '?'} ({base['gerado_em']})  novo: {novo.get('commit') or '?'} ({novo['gerado_em']})")
+    linhas = comparar(base, novo, args.limite, args.minimo_ms)
+    for grupo, nome, antes, depois, razao, regrediu in linhas:
+        marca = "  <-- REGRESSÃO" if regrediu else ""
+        print(f"{grupo:<14} {nome:<42} {antes:>11.2f} -> {depois:>11.2f} ms  x{razao:5.2f}{marca}")
+    regressoes = sum(1 for linha in linhas if linha[5])
+    print(f"{len(linhas)} medições comparadas, {regressoes} regressão(ões)")
+    sys.exit(1 if regressoes else 0)
+
+if __name__ == "__main__":
+    main()
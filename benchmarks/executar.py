@@ -0,0 +1,211 @@
+"""Mede os caminhos críticos do app sobre bases sintéticas e grava os resultados em JSON.
+
+Para cada tamanho de base (gerada por benchmarks.gerar_base, reaproveitada se já
+existir) mede buscar_orcamentos (filtros e busca textual), contar_orcamentos, sugerir_clientes, buscar_vendas_agregadas, carregar_orcamento_por_id,
+carregar_orcamentos_em_lote, os cálculos (por orçamento e em lote), gerar_pdf e
+a exportação Excel do histórico. Também confere que o cálculo em lote bate com
+calcular_valores_* nos orçamentos da base (para todas as combinações de regras,
+veja benchmarks.paridade_calculos). Compare dois arquivos de resultado
+com benchmarks.comparar.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.executar [--tamanhos 1000 100000] [--repeticoes 30] [--saida resultados.json]
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import banco
+from banco import (
+    DIMENSOES_VENDAS, buscar_limites_datas, buscar_orcamentos, buscar_vendas_agregadas, carregar_orcamento_por_id,
+    carregar_orcamentos_em_lote, contar_orcamentos, init_db, silenciar_avisos_sem_servidor, sugerir_clientes
+)
+from benchmarks.bench_pdf import TAMANHOS as LINHAS_PDF, itens_exemplo
+from benchmarks.gerar_base import DIRETORIO_PADRAO, SEMENTE_PADRAO, TAMANHOS, garantir_base
+from benchmarks.paridade_calculos import orcamentos_divergentes
+from calculos import (
+    calcular_valores_bobinas, calcular_valores_confeccionados, calcular_valores_em_lote,
+    frames_de_orcamentos_carregados
+)
+from exportacao import argumentos_pdf_orcamento, gerar_excel_historico
+from pdf_orcamento import gerar_pdf
+
+FORMATO_RESULTADOS = 1
+AMOSTRA_CALCULOS = 1000  # orçamentos por medição dos cálculos
+AMOSTRA_PDF = 50
+PAGINA = 20
+BUSCA_FREQUENTE = "silva"  # sobrenome de ~1/10 dos clientes da base sintética
+
+def cronometrar(funcao, repeticoes, aquecimento=1):
+    """Estatísticas (ms) de `repeticoes` chamadas de `funcao()`, após `aquecimento` chamadas descartadas."""
+    for _ in range(aquecimento):
+        funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "mediana_ms": round(statistics.median(tempos), 4),
+        "p95_ms": round(tempos[min(len(tempos) - 1, math.ceil(0.95 * len(tempos)) - 1)], 4),
+        "min_ms": round(tempos[0], 4),
+        "repeticoes": repeticoes,
+    }
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _itens_de(confecc, bob):
+    """Itens carregados do banco no formato de dicionário usado pelo app."""
+    return (
+        [dict(zip(['produto', 'comprimento', 'largura', 'quantidade', 'cor'], c)) for c in confecc],
+        [dict(zip(['produto', 'comprimento', 'largura', 'quantidade', 'cor', 'espessura', 'preco_unitario'], b)) for b in bob],
+    )
+
+def _calcular_por_orcamento(amostra):
+    for orc, conf, bob in amostra:
+        preco = orc[12] if orc[12] is not None else 0.0
+        calcular_valores_confeccionados(conf, preco, orc[4], orc[5], orc[7])
+        calcular_valores_bobinas(bob, preco, orc[7])
+
+def divergencias_calculo_em_lote(carregados):
+    """Quantos orçamentos têm algum valor diferente entre calcular_valores_em_lote e calcular_valores_*."""
+    return len(orcamentos_divergentes(carregados))
+
+def medir_base(caminho, repeticoes, repeticoes_pesadas, excel=True):
+    """Resultados de todos os benchmarks que dependem do banco em `caminho`."""
+    banco.DB_NAME = caminho
+    init_db(os.path.abspath(caminho))
+    total = contar_orcamentos()
+    resultados = {}
+
+    resultados["buscar_orcamentos_primeira_pagina"] = cronometrar(lambda: buscar_orcamentos(limite=PAGINA), repeticoes)
+    resultados["buscar_orcamentos_pagina_do_meio"] = cronometrar(
+        lambda: buscar_orcamentos(limite=PAGINA, offset=total // 2), repeticoes)
+    cliente = buscar_orcamentos(limite=1, offset=total // 3)[0][2]
+    resultados["buscar_orcamentos_por_cliente"] = cronometrar(
+        lambda: buscar_orcamentos(limite=PAGINA, cliente=cliente), repeticoes)
+    # Busca textual: nome completo de um cliente (seletiva) e um sobrenome frequente (muitos resultados)
+    resultados["buscar_orcamentos_texto_seletivo"] = cronometrar(
+        lambda: buscar_orcamentos(limite=PAGINA, busca=cliente), repeticoes)
+    resultados["buscar_orcamentos_texto_frequente"] = cronometrar(
+        lambda: buscar_orcamentos(limite=PAGINA, busca=BUSCA_FREQUENTE), repeticoes)
+    resultados["contar_orcamentos_texto_frequente"] = cronometrar(
+        lambda: contar_orcamentos(busca=BUSCA_FREQUENTE), repeticoes)
+    # Autocompletar de cliente: prefixo curto (faixa grande no índice) e nome quase completo
+    resultados["sugerir_clientes_prefixo_curto"] = cronometrar(lambda: sugerir_clientes("tr"), repeticoes)
+    resultados["sugerir_clientes_prefixo_longo"] = cronometrar(lambda: sugerir_clientes(cliente[:-2]), repeticoes)
+    # Página de Análises: só as tabelas de totais, qualquer que seja o tamanho da base
+    resultados["vendas_agregadas_todas_dimensoes"] = cronometrar(
+        lambda: [buscar_vendas_agregadas(d) for d in DIMENSOES_VENDAS], repeticoes)
+    _, fim = buscar_limites_datas()
+    periodo = {"data_inicio": fim - timedelta(days=30), "data_fim": fim}
+    resultados["buscar_orcamentos_ultimos_30_dias"] = cronometrar(
+        lambda: buscar_orcamentos(limite=PAGINA, **periodo), repeticoes)
+    resultados["contar_orcamentos"] = cronometrar(contar_orcamentos, repeticoes)
+
+    ids = [o[0] for o in buscar_orcamentos(limite=AMOSTRA_CALCULOS, offset=total // 4)]
+    proximo_id = itertools.cycle(ids).__next__
+    resultados["carregar_orcamento_por_id"] = cronometrar(lambda: carregar_orcamento_por_id(proximo_id()), repeticoes)
+    paginas = itertools.cycle([ids[i:i + PAGINA] for i in range(0, len(ids), PAGINA)])
+    resultados[f"carregar_orcamentos_em_lote_{PAGINA}"] = cronometrar(
+        lambda: carregar_orcamentos_em_lote(next(paginas)), repeticoes)
+
+    carregados = carregar_orcamentos_em_lote(ids)
+    amostra = [(orc, *_itens_de(confecc, bob)) for orc, confecc, bob in carregados.values()]
+    frames = frames_de_orcamentos_carregados(carregados)
+    resultados[f"calcular_valores_por_orcamento_{len(ids)}"] = cronometrar(
+        lambda: _calcular_por_orcamento(amostra), repeticoes_pesadas)
+    resultados[f"calcular_valores_em_lote_{len(ids)}"] = cronometrar(
+        lambda: calcular_valores_em_lote(*frames), repeticoes_pesadas)
+
+    argumentos = itertools.cycle([argumentos_pdf_orcamento(*carregados[i]) for i in ids[:AMOSTRA_PDF]])
+    resultados["gerar_pdf_orcamento"] = cronometrar(lambda: gerar_pdf(**next(argumentos)), repeticoes)
+
+    if excel:
+        resultados["gerar_excel_historico_completo"] = cronometrar(
+            lambda: gerar_excel_historico({}).close(), repeticoes_pesadas, aquecimento=0)
+
+    verificacoes = {"divergencias_calculo_em_lote": divergencias_calculo_em_lote(carregados)}
+    return total, resultados, verificacoes
+
+def medir_pdf_por_linhas(repeticoes):
+    """gerar_pdf com 10, 100 e 1.000 linhas de item (não depende da base)."""
+    cliente = {"nome": "Cliente Benchmark", "cnpj": "00.000.000/0001-00", "estado": "SP", "tipo_pedido": "Direta"}
+    vendedor = {"nome": "Vendedor", "tel": "11 0000-0000", "email": "vendedor@example.com"}
+    resultados = {}
+    for n in LINHAS_PDF:
+        itens = itens_exemplo(n)
+        resultados[f"gerar_pdf_{n}_linhas"] = cronometrar(
+            lambda: gerar_pdf(1, cliente, vendedor, itens, [], (0, 0, 0, 0, 0, 0), None, "Observação", 10.0),
+            repeticoes)
+    return resultados
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanhos", type=int, nargs="+", choices=TAMANHOS, default=list(TAMANHOS[:2]))
+    parser.add_argument("--repeticoes", type=int, default=30, help="repetições das operações rápidas")
+    parser.add_argument("--repeticoes-pesadas", type=int, default=3, help="repetições de cálculos em massa e Excel")
+    parser.add_argument("--sem-excel", action="store_true", help="não mede a exportação Excel completa")
+    parser.add_argument("--dados", default=DIRETORIO_PADRAO, help="diretório das bases geradas")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    parser.add_argument("--saida", default="resultados_benchmarks.json")
+    args = parser.parse_args()
+    silenciar_avisos_sem_servidor()
+
+    saida = {
+        "formato": FORMATO_RESULTADOS,
+        "gerado_em": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "commit": _commit_atual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "semente": args.semente,
+        "bases": {},
+        "verificacoes": {},
+        "resultados": {},
+    }
+    divergencias = 0
+    for tamanho in args.tamanhos:
+        print(f"base com {tamanho} orçamentos...", flush=True)
+        inicio = time.perf_counter()
+        caminho = garantir_base(tamanho, args.dados, args.semente)
+        preparo = time.perf_counter() - inicio
+        total, resultados, verificacoes = medir_base(caminho, args.repeticoes, args.repeticoes_pesadas, not args.sem_excel)
+        grupo = f"base_{tamanho}"
+        saida["bases"][grupo] = {
+            "orcamentos": total,
+            "arquivo_mib": round(os.path.getsize(caminho) / 2**20, 1),
+            "preparo_s": round(preparo, 2),
+        }
+        saida["resultados"][grupo] = resultados
+        saida["verificacoes"][grupo] = verificacoes
+        divergencias += verificacoes["divergencias_calculo_em_lote"]
+        for nome, r in resultados.items():
+            print(f"  {nome:<42} {r['mediana_ms']:>11.2f} ms (p95 {r['p95_ms']:.2f})")
+    saida["resultados"]["pdf"] = medir_pdf_por_linhas(args.repeticoes_pesadas * 3)
+    for nome, r in saida["resultados"]["pdf"].items():
+        print(f"  {nome:<42} {r['mediana_ms']:>11.2f} ms (p95 {r['p95_ms']:.2f})")
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(saida, f, ensure_ascii=False, indent=2)
+    print(f"resultados em {args.saida}")
+    if divergencias:
+        print(f"ERRO: {divergencias} orçamento(s) com cálculo em lote diferente de calcular_valores_*", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Gera um banco no formato de orcamentos.db com orçamentos sintéticos realistas.
+
+Usa o catálogo real (produtos_lista, estados, regras de espessura) e uma mistura
+de itens parecida com a do uso: maioria só confeccionados, parte só bobinas e
+alguns pedidos mistos. Os totais gravados vêm de calcular_valores_em_lote, como
+se cada orçamento tivesse sido salvo pelo app. Mesma semente => mesmo banco.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.gerar_base --tamanho 100000 [--destino arquivo.db] [--semente 42]
+"""
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from banco import FUSO_BRASILIA, TOTAIS_COLUNAS, _para_utc_iso, aplicar_migracoes
+from calculos import COLUNAS_LOTE_TOTAIS, calcular_valores_em_lote, prefixos_espessura, produtos_lista, regras_vigentes
+
+TAMANHOS = (1_000, 100_000, 1_000_000)
+LOTE = 10_000  # orçamentos gerados e gravados por transação
+DIRETORIO_PADRAO = os.path.join(tempfile.gettempdir(), "orc-app-bench")
+SEMENTE_PADRAO = 42
+DIAS_HISTORICO = 730
+
+# Produtos mais vendidos pesam mais no sorteio
+PRODUTOS_FREQUENTES = {
+    "Lonil de PVC": 12, "Encerado": 10, "Lonil KP": 8, "Sider Truck Lateral": 6, "Sider Truck Teto": 5,
+    "Duramax": 5, "Lonaleve": 4, "Capota Marítima": 4, "Lona Galpão Teto": 3, "Lona Galpão Lateral": 3,
+}
+PRODUTOS = [p for p in produtos_lista if p.strip()]
+PRODUTOS_BOBINA = [p for p in PRODUTOS if p.startswith(prefixos_espessura)] + ["Capota Marítima", "Lonil de PVC", "Encerado"]
+ICMS_POR_ESTADO = regras_vigentes().icms_por_estado
+ESTADOS = list(ICMS_POR_ESTADO)
+PESOS_ESTADOS = [40 if uf == "SP" else (6 if ICMS_POR_ESTADO[uf] == 12 else 1.5) for uf in ESTADOS]
+# (tipo de pedido, peso): só confeccionados, só bobinas ou misto
+MIX_ITENS = (("conf", 70), ("bob", 18), ("misto", 12))
+CORES = ["", "", "Azul", "Branco", "Preto", "Verde", "Cinza", "Amarelo", "Laranja"]
+OBSERVACOES = ["", "", "", "", "Entrega em 15 dias", "Cliente retira", "Ilhoses a cada 50cm", "Solda reforçada"]
+VENDEDORES = [
+    {"nome": f"Vendedor {i:02d}", "tel": f"11 9{i:04d}-{i:04d}", "email": f"vendedor{i:02d}@example.com"}
+    for i in range(1, 9)
+]
+NOMES_CLIENTES = ["Transportes", "Agro", "Comércio de Lonas", "Toldos", "Construtora", "Logística", "Eventos", "Piscinas"]
+SOBRENOMES_CLIENTES = ["Silva", "Souza", "Oliveira", "Pereira", "Costa", "Almeida", "Ribeiro", "Carvalho", "Gomes", "Martins"]
+
+def _clientes(rng, n_orcamentos):
+    """Carteira de clientes (nome, cnpj, tipo_cliente, estado) e pesos de recorrência."""
+    quantidade = max(20, n_orcamentos // 8)
+    clientes = []
+    for i in range(quantidade):
+        nome = f"{rng.choice(NOMES_CLIENTES)} {rng.choice(SOBRENOMES_CLIENTES)} {i:06d}"
+        if rng.random() < 0.1:
+            cnpj = ""
+        else:
+            d = f"{rng.randrange(10**12):012d}"
+            cnpj = f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{rng.randrange(100):02d}"
+        tipo = rng.choices([" ", "Consumidor Final", "Revenda"], weights=[10, 45, 45])[0]
+        estado = rng.choices(ESTADOS, weights=PESOS_ESTADOS)[0]
+        clientes.append((nome, cnpj, tipo, estado))
+    # Poucos clientes concentram a maior parte dos pedidos
+    pesos = [1.0 / (i + 1) ** 0.8 for i in range(quantidade)]
+    return clientes, pesos
+
+def _item_confeccionado(rng, produto):
+    return (
+        produto,
+        round(rng.uniform(1.0, 15.0), 2),
+        round(rng.uniform(1.0, 8.0), 2),
+        rng.choice((1, 1, 1, 2, 2, 3, 4, 5, 10)),
+        rng.choice(CORES),
+    )
+
+def _item_bobina(rng, produto, preco_m2):
+    espessura = preco_unitario = None
+    if produto.startswith(prefixos_espessura):
+        # Como no app: produtos com espessura guardam o preço da bobina no item
+        espessura = rng.choice((0.08, 0.10, 0.42, 0.80, 1.00))
+        preco_unitario = preco_m2
+    return (
+        produto,
+        rng.choice((25.0, 50.0, 50.0, 100.0)),
+        rng.choice((1.4, 1.5, 2.0, 3.0)),
+        rng.randint(1, 5),
+        rng.choice(CORES),
+        espessura,
+        preco_unitario,
+    )
+
+def _gerar_lote(rng, primeiro_id, quantidade, total, clientes, pesos_clientes, inicio):
+    """Linhas (orcamentos, confeccionados, bobinas) de `quantidade` orçamentos a partir de `primeiro_id`."""
+    pesos_produtos = [PRODUTOS_FREQUENTES.get(p, 1) for p in PRODUTOS]
+    escolhidos = rng.choices(clientes, cum_weights=pesos_clientes, k=quantidade)
+    orcamentos, confeccionados, bobinas = [], [], []
+    passo = DIAS_HISTORICO * 86400 / max(total, 1)
+    for deslocamento, (nome, cnpj, tipo_cliente, estado) in enumerate(escolhidos):
+        orc_id = primeiro_id + deslocamento
+        # ids crescem com o tempo, como no autoincremento do app
+        agora = inicio + timedelta(seconds=int((orc_id - 1) * passo))
+        agora = FUSO_BRASILIA.normalize(agora.replace(hour=rng.randint(8, 18), minute=rng.randrange(60), second=0))
+        preco_m2 = round(rng.uniform(8.0, 60.0), 2)
+        tipo_pedido = "Industrialização" if rng.random() < 0.1 else "Direta"
+        vendedor = rng.choice(VENDEDORES)
+        mix = rng.choices([m for m, _ in MIX_ITENS], weights=[p for _, p in MIX_ITENS])[0]
+        if mix in ("conf", "misto"):
+            # em geral um produto por pedido, em várias medidas
+            produto = rng.choices(PRODUTOS, weights=pesos_produtos)[0]
+            n = rng.choices((1, 2, 3, 4, 5, 6, 10), weights=(35, 25, 15, 10, 6, 5, 4))[0]
+            confeccionados.extend((orc_id,) + _item_confeccionado(rng, produto) for _ in range(n))
+        if mix in ("bob", "misto"):
+            for _ in range(rng.randint(1, 3)):
+                bobinas.append((orc_id,) + _item_bobina(rng, rng.choice(PRODUTOS_BOBINA), preco_m2))
+        orcamentos.append([
+            orc_id, agora.strftime("%d/%m/%Y %H:%M"), _para_utc_iso(agora), nome, cnpj, tipo_cliente, estado,
+            "CIF" if rng.random() < 0.7 else "FOB", tipo_pedido, vendedor["nome"], vendedor["tel"],
+            vendedor["email"], rng.choice(OBSERVACOES), preco_m2,
+        ])
+    return orcamentos, confeccionados, bobinas
+
+def gerar_base(destino, tamanho, semente=SEMENTE_PADRAO, progresso=None):
+    """Cria `destino` com `tamanho` orçamentos (substitui o arquivo ao final)."""
+    rng = random.Random(semente)
+    clientes, pesos = _clientes(rng, tamanho)
+    cum_pesos = list(itertools.accumulate(pesos))
+    inicio = FUSO_BRASILIA.localize(datetime(2024, 1, 1, 8, 0))
+
+    temporario = destino + ".tmp"
+    if os.path.exists(temporario):
+        os.remove(temporario)
+    conn = sqlite3.connect(temporario)
+    try:
+        aplicar_migracoes(conn)
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        colunas = ("id, data_hora, data_hora_utc, cliente_nome, cliente_cnpj, tipo_cliente, estado, frete, tipo_pedido, "
+                   "vendedor_nome, vendedor_tel, vendedor_email, observacao, preco_m2_base, " + ", ".join(TOTAIS_COLUNAS))
+        sql_orc = f"INSERT INTO orcamentos ({colunas}) VALUES ({', '.join('?' * (14 + len(TOTAIS_COLUNAS)))})"
+        for primeiro in range(1, tamanho + 1, LOTE):
+            quantidade = min(LOTE, tamanho - primeiro + 1)
+            orcamentos, confeccionados, bobinas = _gerar_lote(rng, primeiro, quantidade, tamanho, clientes, cum_pesos, inicio)
+            valores = calcular_valores_em_lote(
+                [(o[0], o[13], o[5], o[6], o[8]) for o in orcamentos],
+                [c[:5] for c in confeccionados],
+                [(b[0], b[1], b[2], b[4], b[7]) for b in bobinas],
+            )[COLUNAS_LOTE_TOTAIS]
+            linhas = [o + [float(v) for v in totais] for o, totais in zip(orcamentos, valores.itertuples(index=False))]
+            with conn:
+                conn.executemany(sql_orc, linhas)
+                conn.executemany(
+                    "INSERT INTO itens_confeccionados (orcamento_id, produto, comprimento, largura, quantidade, cor) VALUES (?, ?, ?, ?, ?, ?)",
+                    confeccionados,
+                )
+                conn.executemany(
+                    "INSERT INTO itens_bobinas (orcamento_id, produto, comprimento, largura, quantidade, cor, espessura, preco_unitario) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    bobinas,
+                )
+            if progresso:
+                progresso(primeiro + quantidade - 1, tamanho)
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+    os.replace(temporario, destino)
+    return destino
+
+def caminho_base(tamanho, diretorio=DIRETORIO_PADRAO, semente=SEMENTE_PADRAO):
+    return os.path.join(diretorio, f"orcamentos_{tamanho}_s{semente}.db")
+
+def garantir_base(tamanho, diretorio=DIRETORIO_PADRAO, semente=SEMENTE_PADRAO, progresso=None):
+    """Caminho de uma base com `tamanho` orçamentos, gerando-a só se ainda não existir."""
+    destino = caminho_base(tamanho, diretorio, semente)
+    if os.path.exists(destino):
+        conn = sqlite3.connect(destino)
+        try:
+            if conn.execute("SELECT COUNT(*) FROM orcamentos").fetchone()[0] == tamanho:
+                return destino
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+    os.makedirs(diretorio, exist_ok=True)
+    return gerar_base(destino, tamanho, semente, progresso)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tamanho", type=int, choices=TAMANHOS, default=TAMANHOS[0])
+    parser.add_argument("--destino", help="arquivo .db (padrão: diretório temporário de benchmarks)")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    args = parser.parse_args()
+
+    destino = args.destino or caminho_base(args.tamanho, semente=args.semente)
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    inicio = time.perf_counter()
+    gerar_base(destino, args.tamanho, args.semente,
+               progresso=lambda feitos, total: print(f"\r{feitos}/{total} orçamentos", end="", flush=True))
+    print(f"\n{destino} ({os.path.getsize(destino) / 2**20:.1f} MiB) em {time.perf_counter() - inicio:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Confere que calcular_valores_em_lote dá os mesmos valores que calcular_valores_* por orçamento.
+
+Monta orçamentos com todas as combinações que mudam o cálculo: tipo de cliente
+(Revenda, Consumidor Final, em branco), tipo de pedido, cada estado (ST por
+estado e alíquota zero), preço base ausente, confeccionados isentos de IPI (por
+prefixo e por produto) e com ST (Encerado), bobinas com e sem espessura (preço
+próprio ou preço base) e com alíquota própria (Capota Marítima). Depois
+acrescenta orçamentos sorteados desses produtos (mesma semente => mesmos
+orçamentos). Não usa banco; sai com código 1 e lista os casos se algum valor
+divergir.
+
+Uso (na raiz do repositório):
+    python -m benchmarks.paridade_calculos [--aleatorios 5000] [--semente 42]
+"""
+import argparse
+import itertools
+import math
+import random
+import sys
+import time
+
+from calculos import (
+    calcular_valores_bobinas, calcular_valores_confeccionados, calcular_valores_em_lote,
+    frames_de_orcamentos_carregados
+)
+
+SEMENTE_PADRAO = 42
+ESTADOS = (
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO"
+)
+TIPOS_CLIENTE = (" ", "Consumidor Final", "Revenda")
+TIPOS_PEDIDO = ("Direta", "Industrialização")
+PRECOS_M2 = (23.9, None)  # None: orçamentos antigos sem preço base gravado
+# Produtos de cada caso (um item por produto)
+CASOS_CONFECCIONADOS = {
+    "sem confeccionados": (),
+    "IPI padrão": ("Lonil de PVC", "Sider Truck Lateral"),
+    "isento por prefixo (Tela de Sombreamento)": ("Tela de Sombreamento 30%", "Tela de Sombreamento 80%"),
+    "isento por produto (Acrylic/Agora)": ("Acrylic", "Agora"),
+    "com ST (Encerado)": ("Encerado",),
+    "ST com isento e padrão": ("Encerado", "Tela de Sombreamento 50%", "Acrylic", "Lonil KP"),
+}
+# (produto, espessura); como no formulário, bobinas com espessura levam preco_unitario
+CASOS_BOBINAS = {
+    "sem bobinas": (),
+    "sem espessura": (("Lonaleve", None), ("Encerado", None)),
+    "com espessura": (("Geomembrana RV 0,80", 0.80), ("Vitro 0,50", 0.50), ("Adesivo Branco Brilho 0,08", 0.08)),
+    "alíquota própria (Capota Marítima)": (("Capota Marítima", None), ("Lonil de PVC", None)),
+    "com e sem espessura": (("Cristal com Pó", 0.10), ("Lonaleve", None), ("Capota Marítima", None)),
+}
+CAMPOS = (
+    "conf_m2", "conf_bruto", "conf_ipi", "conf_final", "conf_st", "conf_aliquota_st",
+    "bob_m", "bob_bruto", "bob_ipi", "bob_final", "bob_aliquota_ipi", "valor_final_total",
+)
+
+def _orcamento(orc_id, tipo_cliente, estado, tipo_pedido, preco_m2):
+    """Cabeçalho no formato de carregar_orcamentos_em_lote (só os campos usados no cálculo)."""
+    return (orc_id, "", f"Cliente {orc_id}", "", tipo_cliente, estado, "CIF", tipo_pedido, "", "", "", "", preco_m2)
+
+def _item_confeccionado(rng, produto):
+    return (produto, rng.choice((1.0, 2.5, 3.0, 6.0)), rng.choice((1.4, 2.0, 2.6)), rng.randint(1, 4), "Azul")
+
+def _item_bobina(rng, produto, espessura, preco_m2):
+    # Preço próprio (editado) ou o preço base fixado quando a bobina entrou no orçamento
+    preco_unitario = None if espessura is None else rng.choice((preco_m2, round(rng.uniform(5.0, 60.0), 2)))
+    return (produto, rng.choice((25.0, 50.0, 100.0)), rng.choice((1.4, 2.0)), rng.randint(1, 5), "Azul", espessura, preco_unitario)
+
+def orcamentos_combinados(rng):
+    """{id: (orc, confecc, bob)} com cada combinação de cliente, pedido, estado, preço e itens; e {id: caso}."""
+    carregados, casos = {}, {}
+    combinacoes = itertools.product(
+        TIPOS_CLIENTE, TIPOS_PEDIDO, ESTADOS, PRECOS_M2, CASOS_CONFECCIONADOS.items(), CASOS_BOBINAS.items()
+    )
+    for orc_id, (tipo_cliente, tipo_pedido, estado, preco_m2, (caso_conf, conf), (caso_bob, bob)) in enumerate(combinacoes, 1):
+        if not conf and not bob:
+            continue
+        carregados[orc_id] = (
+            _orcamento(orc_id, tipo_cliente, estado, tipo_pedido, preco_m2),
+            [_item_confeccionado(rng, produto) for produto in conf],
+            [_item_bobina(rng, produto, espessura, preco_m2) for produto, espessura in bob],
+        )
+        casos[orc_id] = f"{tipo_cliente.strip() or 'sem tipo'}, {tipo_pedido}, {estado}, preço {preco_m2}: {caso_conf}; {caso_bob}"
+    return carregados, casos
+
+def orcamentos_aleatorios(rng, quantidade, primeiro_id):
+    """{id: (orc, confecc, bob)} com `quantidade` orçamentos sorteados dos produtos dos casos."""
+    confeccionados = sorted(set(itertools.chain(*CASOS_CONFECCIONADOS.values())))
+    bobinas = sorted(set(itertools.chain(*CASOS_BOBINAS.values())), key=lambda b: b[0])
+    carregados = {}
+    for orc_id in range(primeiro_id, primeiro_id + quantidade):
+        preco_m2 = round(rng.uniform(8.0, 60.0), 2)
+        conf = [_item_confeccionado(rng, rng.choice(confeccionados)) for _ in range(rng.randint(0, 4))]
+        bob = [_item_bobina(rng, *rng.choice(bobinas), preco_m2) for _ in range(rng.randint(0 if conf else 1, 3))]
+        orc = _orcamento(orc_id, rng.choice(TIPOS_CLIENTE), rng.choice(ESTADOS), rng.choice(TIPOS_PEDIDO), preco_m2)
+        carregados[orc_id] = (orc, conf, bob)
+    return carregados
+
+def valores_por_orcamento(orc, confecc, bob):
+    """Valores de calcular_valores_* na ordem de CAMPOS, com os itens no formato do app."""
+    conf = [dict(zip(['produto', 'comprimento', 'largura', 'quantidade', 'cor'], c)) for c in confecc]
+    bobs = [dict(zip(['produto', 'comprimento', 'largura', 'quantidade', 'cor', 'espessura', 'preco_unitario'], b)) for b in bob]
+    preco = orc[12] if orc[12] is not None else 0.0
+    valores_conf = calcular_valores_confeccionados(conf, preco, orc[4], orc[5], orc[7])
+    valores_bob = calcular_valores_bobinas(bobs, preco, orc[7])
+    return valores_conf + valores_bob + (valores_conf[3] + valores_bob[3],)
+
+def divergencias(carregados):
+    """{id: [(campo, lote, esperado), ...]} dos orçamentos em que o lote difere de calcular_valores_*."""
+    lote = calcular_valores_em_lote(*frames_de_orcamentos_carregados(carregados))
+    por_id = dict(zip(lote.index, lote[list(CAMPOS)].itertuples(index=False)))
+    encontradas = {}
+    for orc_id, (orc, confecc, bob) in carregados.items():
+        diferentes = [
+            (campo, float(valor_lote), esperado)
+            for campo, valor_lote, esperado in zip(CAMPOS, por_id[orc_id], valores_por_orcamento(orc, confecc, bob))
+            if not math.isclose(valor_lote, esperado, rel_tol=1e-9, abs_tol=1e-9)
+        ]
+        if diferentes:
+            encontradas[orc_id] = diferentes
+    return encontradas
+
+def orcamentos_divergentes(carregados):
+    """Ids dos orçamentos com algum valor diferente entre calcular_valores_em_lote e calcular_valores_*."""
+    return list(divergencias(carregados))
+
+def conferir(carregados, casos):
+    """AssertionError com os primeiros casos divergentes se o lote diferir de calcular_valores_*."""
+    encontradas = divergencias(carregados)
+    if encontradas:
+        linhas = [
+            f"  #{orc_id} ({casos.get(orc_id, 'sorteado')}): "
+            + ", ".join(f"{campo} lote={lote:.6f} esperado={esperado:.6f}" for campo, lote, esperado in diferentes)
+            for orc_id, diferentes in list(encontradas.items())[:20]
+        ]
+        raise AssertionError(
+            f"{len(encontradas)} orçamento(s) com cálculo em lote diferente de calcular_valores_*:\n" + "\n".join(linhas)
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--aleatorios", type=int, default=5000, help="orçamentos sorteados além das combinações")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semente)
+    inicio = time.perf_counter()
+    carregados, casos = orcamentos_combinados(rng)
+    carregados.update(orcamentos_aleatorios(rng, args.aleatorios, max(carregados) + 1))
+    try:
+        conferir(carregados, casos)
+    except AssertionError as erro:
+        print(f"ERRO: {erro}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{len(casos)} combinações + {args.aleatorios} sorteados em {time.perf_counter() - inicio:.1f}s: "
+          "cálculo em lote igual a calcular_valores_* em todos os orçamentos")
+
+if __name__ == "__main__":
+    main()
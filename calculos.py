@@ -0,0 +1,320 @@
+"""Cálculo de valores de orçamentos (IPI/ST), individual e em lote."""
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+# ============================
+# Catálogo de produtos e estados
+# ============================
+produtos_lista = [
+    " ","Lonil de PVC","Lonil KP","Lonil Inflável KP","Encerado","Duramax",
+    "Lonaleve","Sider Truck Teto","Sider Truck Lateral","Capota Marítima",
+    "Night&Day Plus 1,40","Night&Day Plus 2,00","Night&Day Listrado","Vitro 0,40",
+    "Vitro 0,50","Vitro 0,60","Vitro 0,80","Vitro 1,00","Durasol","Poli Light",
+    "Sunset","Tenda","Tenda 2,3x2,3","Acrylic","Agora","Lona Galpão Teto",
+    "Lona Galpão Lateral","Tela de Sombreamento 30%","Tela de Sombreamento 50%",
+    "Tela de Sombreamento 80%","Geomembrana RV 0,42","Geomembrana RV 0,80",
+    "Geomembrana RV 1,00","Geomembrana ATX 0,80","Geomembrana ATX 1,00",
+    "Geomembrana ATX 1,50","Geo Bio s/ reforço 1,00","Geo Bio s/ reforço 1,20",
+    "Geo Bio s/ reforço 1,50","Geo Bio c/ reforço 1,20","Cristal com Pó",
+    "Cristal com Papel","Cristal Colorido","Filme Liso","Filme Kamurcinha",
+    "Filme Verniz","Block Lux","Filme Dimension","Filme Sarja","Filme Emborrachado",
+    "Filme Pneumático","Adesivo Branco Brilho 0,08","Adesivo Branco Brilho 0,10",
+    "Adesivo Branco Fosco 0,10","Adesivo Preto Brilho 0,08","Adesivo Preto Fosco 0,10",
+    "Adesivo Transparente Brilho 0,08","Adesivo Transparente Jateado 0,08",
+    "Adesivo Mascara Brilho 0,08","Adesivo Aço Escovado 0,08"
+]
+
+prefixos_espessura = ("Geomembrana", "Geo", "Vitro", "Cristal", "Filme", "Adesivo", "Block Lux")
+
+# ============================
+# Regras tributárias (versionadas em regras_tributarias.json)
+# ============================
+# Caminho do arquivo de regras; ORC_REGRAS_TRIBUTARIAS aponta para outro arquivo
+REGRAS_ARQUIVO = os.environ.get(
+    "ORC_REGRAS_TRIBUTARIAS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "regras_tributarias.json")
+)
+FUSO_REGRAS = pytz.timezone("America/Sao_Paulo")
+REGRAS_VERIFICACAO_S = 1.0  # intervalo mínimo entre verificações do arquivo (e da data) nas regras de hoje
+
+class RegrasTributarias:
+    """Uma versão das regras de IPI/ST/ICMS, compilada em dicionários.
+
+    As regras por prefixo são resolvidas na compilação para todo o catálogo
+    (produtos_lista); produtos fora do catálogo são resolvidos na primeira
+    consulta e memorizados. Assim cada item custa uma consulta a dicionário.
+    """
+
+    def __init__(self, versao):
+        try:
+            self.versao = int(versao["versao"])
+            self.vigencia = date.fromisoformat(versao["vigencia"])
+            self.descricao = versao.get("descricao", "")
+            # ICMS e ST em % (como no arquivo: 18 continua 18, não 18.0)
+            self.icms_por_estado = dict(versao["icms_por_estado"])
+            self.st_por_estado = dict(versao["st_por_estado"])
+            conf = versao["ipi_confeccionado"]
+            self.ipi_confeccionado_padrao = float(conf["padrao"])
+            self._ipi_conf_produtos = {p: float(v) for p, v in conf.get("por_produto", {}).items()}
+            self._ipi_conf_prefixos = tuple((p, float(v)) for p, v in conf.get("por_prefixo", {}).items())
+            bob = versao["ipi_bobina"]
+            self.ipi_bobina_padrao = float(bob["padrao"])
+            self.ipi_bobina_por_produto = {p: float(v) for p, v in bob.get("por_produto", {}).items()}
+            self.produtos_st = frozenset(versao["st"]["produtos"])
+            self.tipos_cliente_st = frozenset(versao["st"]["tipos_cliente"])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Regras tributárias inválidas (versão {versao.get('versao', '?')}): {e!r}") from e
+        self._ipi_conf = {produto: self._ipi_confeccionado_por_regra(produto) for produto in produtos_lista}
+
+    def _ipi_confeccionado_por_regra(self, produto):
+        if produto in self._ipi_conf_produtos:
+            return self._ipi_conf_produtos[produto]
+        for prefixo, taxa in self._ipi_conf_prefixos:
+            if str(produto).startswith(prefixo):
+                return taxa
+        return self.ipi_confeccionado_padrao
+
+    def ipi_confeccionado(self, produto):
+        """Alíquota de IPI (fração) de um item confeccionado."""
+        taxa = self._ipi_conf.get(produto)
+        if taxa is None:
+            taxa = self._ipi_conf[produto] = self._ipi_confeccionado_por_regra(produto)
+        return taxa
+
+    def ipi_bobina(self, produtos):
+        """Alíquota de IPI (fração) das bobinas de um orçamento.
+
+        Vale para todas as bobinas: a alíquota própria de um produto presente
+        (a menor, se houver mais de uma) ou a padrão.
+        """
+        proprias = [self.ipi_bobina_por_produto[p] for p in set(produtos) if p in self.ipi_bobina_por_produto]
+        return min(proprias) if proprias else self.ipi_bobina_padrao
+
+    def tem_st(self, produto, tipo_cliente):
+        return produto in self.produtos_st and tipo_cliente in self.tipos_cliente_st
+
+    def aliquota_st(self, estado):
+        """Alíquota de ST (%) do estado; 0 se não houver."""
+        return self.st_por_estado.get(estado, 0)
+
+_regras_lock = threading.Lock()
+_regras_cache = {"chave": None, "versoes": None, "hoje": None, "verificar_em": 0.0}
+
+def _carregar_versoes(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        dados = json.load(f)
+    versoes = sorted((RegrasTributarias(v) for v in dados["versoes"]), key=lambda r: r.vigencia)
+    if not versoes:
+        raise ValueError(f"Nenhuma versão de regras tributárias em {caminho}")
+    return versoes
+
+def versoes_regras(caminho=None):
+    """Versões compiladas de `caminho` (padrão REGRAS_ARQUIVO), em ordem de vigência.
+
+    O arquivo só é relido quando muda (mtime/tamanho). Se a nova leitura falhar
+    depois de uma leitura válida, as versões anteriores continuam valendo.
+    """
+    caminho = caminho or REGRAS_ARQUIVO
+    info = os.stat(caminho)
+    chave = (caminho, info.st_mtime_ns, info.st_size)
+    if _regras_cache["chave"] == chave:
+        return _regras_cache["versoes"]
+    with _regras_lock:
+        if _regras_cache["chave"] != chave:
+            try:
+                versoes = _carregar_versoes(caminho)
+            except (OSError, ValueError) as e:
+                if _regras_cache["chave"] is None or _regras_cache["chave"][0] != caminho:
+                    raise
+                print(f"Regras tributárias não recarregadas ({caminho}): {e}")
+                versoes = _regras_cache["versoes"]
+            _regras_cache["versoes"], _regras_cache["chave"] = versoes, chave
+    return _regras_cache["versoes"]
+
+def _vigente_em(versoes, data):
+    vigentes = [r for r in versoes if r.vigencia <= data]
+    if not vigentes:
+        raise ValueError(f"Nenhuma regra tributária vigente em {data:%d/%m/%Y}")
+    return vigentes[-1]
+
+def regras_vigentes(data=None, caminho=None):
+    """RegrasTributarias em vigor em `data` (padrão: hoje, em Brasília).
+
+    As regras de hoje do arquivo padrão ficam guardadas por REGRAS_VERIFICACAO_S,
+    então chamar esta função a cada cálculo não relê o arquivo nem o relógio.
+    """
+    if data is None and caminho is None:
+        agora = time.monotonic()
+        if _regras_cache["hoje"] is None or agora >= _regras_cache["verificar_em"]:
+            _regras_cache["hoje"] = _vigente_em(versoes_regras(), datetime.now(FUSO_REGRAS).date())
+            _regras_cache["verificar_em"] = agora + REGRAS_VERIFICACAO_S
+        return _regras_cache["hoje"]
+    return _vigente_em(versoes_regras(caminho), data or datetime.now(FUSO_REGRAS).date())
+
+# ============================
+# Cálculos
+# ============================
+def calcular_valores_confeccionados(itens, preco_m2, tipo_cliente="", estado="", tipo_pedido="Direta", regras=None):
+    if not itens:
+        return 0.0, 0.0, 0.0, 0.0, 0.0, 0
+    m2_total = sum(item['comprimento'] * item['largura'] * item['quantidade'] for item in itens)
+    valor_bruto = m2_total * preco_m2
+    # Lógica de IPI e ST... (mantida)
+    if tipo_pedido == "Industrialização":
+        valor_ipi = 0
+        valor_st = 0
+        aliquota_st = 0
+        valor_final = valor_bruto
+    else:
+        regras = regras or regras_vigentes()
+        valor_ipi_acumulado = 0.0
+        
+        for item in itens:
+            valor_item = item['comprimento'] * item['largura'] * item['quantidade'] * preco_m2
+            valor_ipi_acumulado += valor_item * regras.ipi_confeccionado(item.get('produto', ''))
+
+        valor_ipi = valor_ipi_acumulado
+        valor_final = valor_bruto + valor_ipi
+        
+        valor_st = 0
+        aliquota_st = 0
+        if any(regras.tem_st(item.get('produto'), tipo_cliente) for item in itens):
+            aliquota_st = regras.aliquota_st(estado)
+            valor_st = valor_final * aliquota_st / 100
+            valor_final += valor_st
+
+    return m2_total, valor_bruto, valor_ipi, valor_final, valor_st, aliquota_st
+
+def calcular_valores_bobinas(itens, preco_m2, tipo_pedido="Direta", regras=None):
+    regras = regras or regras_vigentes()
+    
+    if not itens:
+        # Retorna a alíquota padrão se não houver itens
+        return 0.0, 0.0, 0.0, 0.0, regras.ipi_bobina_padrao
+
+    m_total = sum(item['comprimento'] * item['quantidade'] for item in itens)
+    
+    def preco_item_of(item):
+        pu = item.get('preco_unitario') 
+        return pu if (pu is not None) else preco_m2 
+
+    valor_bruto = sum((item['comprimento'] * item['quantidade']) * preco_item_of(item) for item in itens)
+
+    if tipo_pedido == "Industrialização":
+        return m_total, valor_bruto, 0.0, valor_bruto, 0.0 # Retorna 0.0 como taxa de IPI
+    else:
+        # Uma alíquota para todas as bobinas (ex.: Capota Marítima tem alíquota própria)
+        ipi_rate_to_use = regras.ipi_bobina(item.get('produto') for item in itens)
+        
+        valor_ipi = valor_bruto * ipi_rate_to_use
+        valor_final = valor_bruto + valor_ipi
+
+        # Novo: Retorna a taxa de IPI utilizada para exibição
+        return m_total, valor_bruto, valor_ipi, valor_final, ipi_rate_to_use
+
+# ============================
+# Cálculos em lote (vetorizados)
+# ============================
+COLUNAS_LOTE_ORCAMENTOS = ["orcamento_id", "preco_m2_base", "tipo_cliente", "estado", "tipo_pedido"]
+COLUNAS_LOTE_CONFECCIONADOS = ["orcamento_id", "produto", "comprimento", "largura", "quantidade"]
+COLUNAS_LOTE_BOBINAS = ["orcamento_id", "produto", "comprimento", "quantidade", "preco_unitario"]
+# Colunas de calcular_valores_em_lote na ordem de TOTAIS_COLUNAS (banco)
+COLUNAS_LOTE_TOTAIS = [
+    "conf_m2", "conf_bruto", "conf_ipi", "conf_final", "conf_st", "conf_aliquota_st",
+    "bob_m", "bob_bruto", "bob_ipi", "bob_final", "bob_aliquota_ipi", "valor_final_total"
+]
+
+def _aliquotas_ipi_confeccionado(produtos, regras):
+    """Alíquota de IPI por item; uma consulta às regras por produto distinto, não por item."""
+    por_produto = {produto: regras.ipi_confeccionado(produto) for produto in pd.unique(produtos)}
+    return produtos.map(por_produto).to_numpy(dtype=float)
+
+def calcular_valores_em_lote(orcamentos, confeccionados, bobinas, regras=None):
+    """Calcula os resumos de muitos orçamentos de uma vez.
+
+    Entradas (DataFrames ou dicts de colunas):
+      orcamentos:     COLUNAS_LOTE_ORCAMENTOS (uma linha por orçamento)
+      confeccionados: COLUNAS_LOTE_CONFECCIONADOS (uma linha por item)
+      bobinas:        COLUNAS_LOTE_BOBINAS (uma linha por item; preco_unitario pode ser nulo)
+
+    Retorna um DataFrame indexado por orcamento_id com as colunas conf_m2, conf_bruto,
+    conf_ipi, conf_st, conf_aliquota_st, conf_final, bob_m, bob_bruto, bob_ipi,
+    bob_aliquota_ipi, bob_final e valor_final_total. Os valores são os mesmos de
+    calcular_valores_confeccionados / calcular_valores_bobinas para cada orçamento,
+    com as mesmas `regras` (padrão: regras_vigentes()).
+    """
+    regras = regras or regras_vigentes()
+    orcs = pd.DataFrame(orcamentos, columns=COLUNAS_LOTE_ORCAMENTOS).set_index("orcamento_id")
+    conf = pd.DataFrame(confeccionados, columns=COLUNAS_LOTE_CONFECCIONADOS)
+    bob = pd.DataFrame(bobinas, columns=COLUNAS_LOTE_BOBINAS)
+
+    preco = orcs["preco_m2_base"].fillna(0.0).astype(float)
+    industrializacao = orcs["tipo_pedido"] == "Industrialização"
+    resultado = pd.DataFrame(index=orcs.index)
+
+    # Confeccionados
+    conf_area = conf["comprimento"].to_numpy(dtype=float) * conf["largura"].to_numpy(dtype=float) * conf["quantidade"].to_numpy(dtype=float)
+    conf_preco = conf["orcamento_id"].map(preco).to_numpy(dtype=float)
+    conf_ipi_item = conf_area * conf_preco * _aliquotas_ipi_confeccionado(conf["produto"], regras)
+    agrupado = pd.DataFrame({
+        "orcamento_id": conf["orcamento_id"].to_numpy(),
+        "area": conf_area,
+        "ipi": conf_ipi_item,
+        "produto_st": conf["produto"].isin(regras.produtos_st).to_numpy(),
+    }).groupby("orcamento_id").agg(area=("area", "sum"), ipi=("ipi", "sum"), produto_st=("produto_st", "any"))
+    agrupado = agrupado.reindex(orcs.index)
+    tem_conf = agrupado["area"].notna()
+
+    resultado["conf_m2"] = agrupado["area"].fillna(0.0)
+    resultado["conf_bruto"] = resultado["conf_m2"] * preco
+    resultado["conf_ipi"] = agrupado["ipi"].fillna(0.0).where(~industrializacao, 0.0)
+    com_st = tem_conf & ~industrializacao & agrupado["produto_st"].eq(True) & orcs["tipo_cliente"].isin(regras.tipos_cliente_st)
+    resultado["conf_aliquota_st"] = orcs["estado"].map(regras.st_por_estado).fillna(0).where(com_st, 0)
+    conf_final_sem_st = resultado["conf_bruto"] + resultado["conf_ipi"]
+    resultado["conf_st"] = conf_final_sem_st * resultado["conf_aliquota_st"] / 100
+    resultado["conf_final"] = conf_final_sem_st + resultado["conf_st"]
+
+    # Bobinas
+    bob_metros = bob["comprimento"].to_numpy(dtype=float) * bob["quantidade"].to_numpy(dtype=float)
+    bob_preco = pd.to_numeric(bob["preco_unitario"], errors="coerce").fillna(bob["orcamento_id"].map(preco)).to_numpy(dtype=float)
+    agrupado = pd.DataFrame({
+        "orcamento_id": bob["orcamento_id"].to_numpy(),
+        "metros": bob_metros,
+        "bruto": bob_metros * bob_preco,
+        # alíquota própria do produto (NaN se não tiver); a menor vale para o orçamento
+        "aliquota_propria": bob["produto"].map(regras.ipi_bobina_por_produto).to_numpy(dtype=float),
+    }).groupby("orcamento_id").agg(metros=("metros", "sum"), bruto=("bruto", "sum"), aliquota_propria=("aliquota_propria", "min"))
+    agrupado = agrupado.reindex(orcs.index)
+    tem_bob = agrupado["metros"].notna()
+
+    resultado["bob_m"] = agrupado["metros"].fillna(0.0)
+    resultado["bob_bruto"] = agrupado["bruto"].fillna(0.0)
+    aliquota_bob = agrupado["aliquota_propria"].fillna(regras.ipi_bobina_padrao).to_numpy(dtype=float)
+    resultado["bob_aliquota_ipi"] = np.where(tem_bob & industrializacao, 0.0, aliquota_bob)
+    resultado["bob_ipi"] = resultado["bob_bruto"] * resultado["bob_aliquota_ipi"]
+    resultado["bob_final"] = resultado["bob_bruto"] + resultado["bob_ipi"]
+
+    resultado["valor_final_total"] = resultado["conf_final"] + resultado["bob_final"]
+    return resultado
+
+def frames_de_orcamentos_carregados(carregados):
+    """Converte {id: (orc, confecc, bob)} (de carregar_orcamentos_em_lote) nas
+    entradas colunares de calcular_valores_em_lote."""
+    orcamentos, confeccionados, bobinas = [], [], []
+    for orc_id, (orc, confecc, bob) in carregados.items():
+        # orc: id, data_hora, cliente_nome, cliente_cnpj, tipo_cliente, estado, frete, tipo_pedido, ..., preco_m2_base
+        orcamentos.append((orc_id, orc[12], orc[4], orc[5], orc[7]))
+        confeccionados.extend((orc_id, c[0], c[1], c[2], c[3]) for c in confecc)
+        bobinas.extend((orc_id, b[0], b[1], b[3], b[6]) for b in bob)
+    return orcamentos, confeccionados, bobinas
+
+def totais_em_lote(carregados, regras=None):
+    """{id: valores na ordem de TOTAIS_COLUNAS} para orçamentos carregados."""
+    valores = calcular_valores_em_lote(*frames_de_orcamentos_carregados(carregados), regras=regras)
+    return {orc_id: [float(v) for v in linha] for orc_id, linha in zip(valores.index, valores[COLUNAS_LOTE_TOTAIS].itertuples(index=False))}
@@ -0,0 +1,229 @@
+"""Exportações do histórico: planilha Excel e PDFs de orçamentos salvos (ZIP)."""
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import streamlit as st
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from banco import (
+    carregar_cabecalhos_em_lote, carregar_orcamentos_em_lote, iterar_orcamentos, quantidades_por_produto_em_lote,
+    resumos_salvos
+)
+from pdf_orcamento import gerar_pdf_de_argumentos
+
+# ============================
+# Funções de Resumo para Exportação Excel (NOVO - REQ. 2)
+# ============================
+def get_order_summary_info(quantidades):
+    # quantidades: [(bobina, produto, quantidade somada), ...] de quantidades_por_produto_em_lote
+    
+    has_conf = any(not bobina for bobina, _, _ in quantidades)
+    has_bob = any(bobina for bobina, _, _ in quantidades)
+    
+    # 1. Tipo do Item
+    if has_conf and has_bob:
+        tipo_item = "Misto (Conf. e Bobina)"
+    elif has_conf:
+        tipo_item = "Confeccionado"
+    elif has_bob:
+        tipo_item = "Bobina"
+    else:
+        tipo_item = "Nenhum"
+
+    # 2. Produto Mais Selecionado (por quantidade)
+    product_counts = {}
+    for _, product, quantity in quantidades:
+        product_counts[product] = product_counts.get(product, 0) + quantity
+
+    most_selected_product = max(product_counts, key=product_counts.get) if product_counts else ""
+
+    return tipo_item, most_selected_product
+
+EXCEL_COLUNAS = [
+    "ID", "Nome do Cliente", "CNPJ/CPF", "Tipo do Cliente", "Estado", "Frete", "Tipo do Pedido",
+    "Produto Mais Selecionado", "Tipo do Item", "Preço Base Utilizado (R$)",
+    "Área Total em m² (Confeccionado)", "Final Total (R$)"
+]
+EXCEL_LOTE = 500  # orçamentos lidos do banco por vez na exportação
+# Acima disso a planilha vai para arquivo temporário. Isso limita a memória da
+# geração; o download (st.download_button) ainda lê o arquivo pronto inteiro.
+EXCEL_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+def linha_excel_orcamento(orc, quantidades):
+    """Uma linha (na ordem de EXCEL_COLUNAS) do resumo de um orçamento.
+
+    Área e valor final vêm dos totais gravados no salvamento (resumos_salvos), sem
+    recálculo; dos itens só são lidas as quantidades por produto (`quantidades`).
+    """
+    preco_m2_base = orc[12] if orc[12] is not None else 0.0
+    resumo_conf, _, valor_final_total = resumos_salvos(orc)
+    m2_total_conf = resumo_conf[0]  # conf_m2_total (Apenas Confeccionado)
+
+    # Info de resumo (Tipo de Item, Produto Mais Selecionado)
+    tipo_item, produto_mais_sel = get_order_summary_info(quantidades)
+
+    # Uma única linha por pedido com as colunas solicitadas
+    # orc: id, data_hora, cliente_nome, cliente_cnpj, tipo_cliente, estado, frete, tipo_pedido, ...
+    return [
+        orc[0], orc[2], orc[3], orc[4], orc[5], orc[6], orc[7], produto_mais_sel, tipo_item,
+        preco_m2_base, m2_total_conf, valor_final_total
+    ]
+
+def gerar_excel_historico(filtros, total=None, progresso=None, lote=EXCEL_LOTE):
+    """Gera o .xlsx do histórico filtrado em streaming; retorna o arquivo (posição 0).
+
+    Os orçamentos são lidos em blocos de `lote` (paginação por id) e gravados numa
+    planilha openpyxl write-only, então a memória não cresce com o número de linhas.
+    O resultado fica num SpooledTemporaryFile, que passa para disco se for grande.
+    `progresso(feitos, total)` é chamado após cada bloco.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    cabecalho = []
+    for coluna in EXCEL_COLUNAS:
+        celula = WriteOnlyCell(ws, value=coluna)
+        celula.font = Font(bold=True)
+        cabecalho.append(celula)
+    ws.append(cabecalho)
+
+    feitos = 0
+    for bloco in iterar_orcamentos(lote, **filtros):
+        ids = [o[0] for o in bloco]
+        cabecalhos = carregar_cabecalhos_em_lote(ids)
+        quantidades = quantidades_por_produto_em_lote(ids)
+        for orc_id in ids:
+            ws.append(linha_excel_orcamento(cabecalhos[orc_id], quantidades.get(orc_id, [])))
+        feitos += len(bloco)
+        if progresso and total:
+            progresso(feitos, total)
+
+    arquivo = tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_BYTES)
+    wb.save(arquivo)
+    arquivo.seek(0)
+    return arquivo
+
+# ============================
+# PDFs de orçamentos salvos
+# ============================
+
+def hash_conteudo_orcamento(orc, confecc, bob):
+    """Hash do conteúdo salvo de um orçamento (cabeçalho + itens)."""
+    return hashlib.sha256(repr((orc, confecc, bob)).encode("utf-8")).hexdigest()
+
+def argumentos_pdf_orcamento(orc, confecc, bob):
+    """Argumentos de gerar_pdf para um orçamento salvo (dados simples, picklável)."""
+    preco_m2_base = orc[12] if orc[12] is not None else 0.0
+    # Resumos gravados no salvamento: o PDF mantém as alíquotas da emissão
+    resumo_conf_salvo, resumo_bob_salvo, _ = resumos_salvos(orc)
+    return dict(
+        orcamento_id=orc[0],
+        cliente={
+            "nome": orc[2],
+            "cnpj": orc[3],
+            "tipo_cliente": orc[4],
+            "estado": orc[5],
+            "frete": orc[6],
+            "tipo_pedido": orc[7]
+        },
+        vendedor={
+            "nome": orc[8],
+            "tel": orc[9],
+            "email": orc[10]
+        },
+        itens_confeccionados=[dict(zip(['produto','comprimento','largura','quantidade','cor'],c)) for c in confecc],
+        itens_bobinas=[dict(zip(['produto','comprimento','largura','quantidade','cor','espessura','preco_unitario'], b)) for b in bob],
+        resumo_conf=resumo_conf_salvo if confecc else None,
+        resumo_bob=resumo_bob_salvo, # Passa o resumo de 5 itens
+        observacao=orc[11],
+        preco_m2=preco_m2_base,
+        data_hora=orc[1]
+    )
+# ============================
+# Exportação de PDFs em ZIP (pool de processos)
+# ============================
+ZIP_LOTE = 200  # orçamentos renderizados por vez; limita os PDFs em memória
+ZIP_SPOOL_MAX_BYTES = 16 * 1024 * 1024
+ZIP_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# O st.download_button guarda o arquivo inteiro na memória do servidor (não há
+# download em streaming), então o ZIP é limitado a este número de orçamentos.
+ZIP_MAX_ORCAMENTOS = 2000
+
+_lock_pool_pdf = threading.Lock()
+
+def criar_pool_pdf(workers=ZIP_WORKERS):
+    """Pool de processos "spawn" para renderizar PDFs.
+
+    Com "spawn" os workers só importam pdf_orcamento, sem herdar as threads
+    (servidor, escritor) do processo que cria o pool.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+@st.cache_resource(show_spinner=False)
+def get_pool_pdf():
+    """Pool de processos para renderizar PDFs, criado uma vez por processo."""
+    return criar_pool_pdf()
+
+def renovar_pool_pdf(quebrado):
+    """Troca o pool de get_pool_pdf depois que um worker morreu; retorna o pool novo.
+
+    Um pool quebrado (BrokenProcessPool) recusa qualquer tarefa nova, então o
+    cache_resource é limpo e a próxima chamada cria outro. Se outra thread já
+    trocou o pool, só devolve o atual.
+    """
+    with _lock_pool_pdf:
+        quebrado.shutdown(wait=False, cancel_futures=True)
+        if get_pool_pdf() is quebrado:
+            get_pool_pdf.clear()
+        return get_pool_pdf()
+
+def gerar_pdfs_em_paralelo(executor, ids, workers=ZIP_WORKERS):
+    """(id, bytes do PDF) de cada orçamento salvo em `ids`, renderizados em `executor`.
+
+    `ids` é um bloco: os orçamentos são carregados numa consulta e os PDFs saem
+    na ordem de `ids`, à medida que os workers terminam.
+    """
+    carregados = carregar_orcamentos_em_lote(ids)
+    argumentos = [argumentos_pdf_orcamento(*carregados[orc_id]) for orc_id in ids if orc_id in carregados]
+    tamanho_chunk = max(1, len(argumentos) // (workers * 4))
+    return executor.map(gerar_pdf_de_argumentos, argumentos, chunksize=tamanho_chunk)
+
+def gerar_zip_pdfs_historico(filtros, total=None, progresso=None, lote=ZIP_LOTE):
+    """Gera um ZIP com o PDF de cada orçamento filtrado.
+
+    Os orçamentos são lidos em blocos de `lote`; cada bloco é renderizado no pool
+    de processos e os PDFs vão direto para o ZIP (SpooledTemporaryFile), então só
+    um bloco de PDFs fica em memória por vez. Se um worker morrer, o pool é
+    recriado e o bloco continua de onde parou (uma vez por bloco). Retorna
+    (arquivo na posição 0, quantidade de PDFs, segundos).
+    """
+    inicio = time.perf_counter()
+    executor = get_pool_pdf()
+    arquivo = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_BYTES)
+    feitos = 0
+    with zipfile.ZipFile(arquivo, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for bloco in iterar_orcamentos(lote, **filtros):
+            ids = [o[0] for o in bloco]
+            gravados = set()
+            try:
+                for orc_id, pdf_bytes in gerar_pdfs_em_paralelo(executor, ids):
+                    zf.writestr(f"orcamento_{orc_id}.pdf", pdf_bytes)
+                    gravados.add(orc_id)
+            except BrokenProcessPool:
+                executor = renovar_pool_pdf(executor)
+                restantes = [orc_id for orc_id in ids if orc_id not in gravados]
+                for orc_id, pdf_bytes in gerar_pdfs_em_paralelo(executor, restantes):
+                    zf.writestr(f"orcamento_{orc_id}.pdf", pdf_bytes)
+            feitos += len(bloco)
+            if progresso and total:
+                progresso(feitos, total)
+    arquivo.seek(0)
+    return arquivo, feitos, time.perf_counter() - inicio
@@ -0,0 +1,281 @@
+"""Orçamentos em lote pela linha de comando: planilha (CSV ou XLSX) -> banco e PDFs, sem navegador.
+
+Cada linha da planilha é um item. Linhas com o mesmo valor na coluna
+"orcamento" formam um orçamento; sem essa coluna, a planilha inteira é um
+orçamento. Cliente, vendedor, observação e preço base vêm da primeira linha do
+orçamento que os preencher, ou das opções da linha de comando. Os valores são
+calculados por calcular_valores_* (regras vigentes), os orçamentos são gravados
+pelo escritor do banco (vários por transação) e, com --pdfs, os PDFs são gerados
+em paralelo com o mesmo código do app.
+
+Colunas (cabeçalho na primeira linha; maiúsculas, acentos e espaços não importam):
+    orcamento, cliente, cnpj, tipo_cliente, estado, tipo_pedido, frete, vendedor,
+    vendedor_tel, vendedor_email, observacao, preco_m2,
+    tipo (Confeccionado ou Bobina; padrão Confeccionado), produto, comprimento,
+    largura, quantidade, cor, espessura, preco_unitario
+Números aceitam vírgula decimal ("1,40" ou "1.234,50").
+
+Uso (na raiz do repositório):
+    python -m orcamento_lote itens.xlsx [--db orcamentos.db] [--pdfs pasta] [--processos 4]
+        [--cliente "Nome"] [--estado SP] [--vendedor "Nome"] [--simular]
+"""
+import argparse
+import csv
+import math
+import multiprocessing
+import os
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import load_workbook
+
+import banco
+from banco import ESCRITOR_TIMEOUT, enviar_orcamento, init_db, silenciar_avisos_sem_servidor
+from calculos import calcular_valores_bobinas, calcular_valores_confeccionados, regras_vigentes
+from exportacao import ZIP_LOTE, ZIP_WORKERS, gerar_pdfs_em_paralelo
+from pdf_orcamento import format_brl
+from validacao import TIPOS_CLIENTE, TIPOS_PEDIDO, ErroValidacao, validar_item, validar_orcamento
+
+CAMPOS_ORCAMENTO = [
+    "cliente", "cnpj", "tipo_cliente", "estado", "tipo_pedido", "frete",
+    "vendedor", "vendedor_tel", "vendedor_email", "observacao", "preco_m2",
+]
+CAMPOS_ITEM = ["tipo", "produto", "comprimento", "largura", "quantidade", "cor", "espessura", "preco_unitario"]
+# Outros nomes aceitos no cabeçalho (já normalizados)
+SINONIMOS = {
+    "pedido": "orcamento", "cliente_nome": "cliente", "razao_social": "cliente", "cnpj_cpf": "cnpj", "cpf": "cnpj",
+    "uf": "estado", "obs": "observacao", "preco_m2_base": "preco_m2", "qtd": "quantidade", "tipo_produto": "tipo",
+}
+
+class ErroPlanilha(ErroValidacao):
+    """Problema numa linha da planilha (a mensagem já cita a linha)."""
+
+def _normalizar(texto):
+    """Nome de coluna sem acentos, em minúsculas e com "_" no lugar de espaços."""
+    texto = unicodedata.normalize("NFKD", str(texto or "")).encode("ascii", "ignore").decode("ascii")
+    chave = "_".join(texto.strip().lower().replace("²", "2").split())
+    return SINONIMOS.get(chave, chave)
+
+def _texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+def _numero(valor, linha, campo, inteiro=False):
+    """Número de uma célula; aceita "1,40" e "1.234,50". None se vazia."""
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return None
+    if isinstance(valor, (int, float)):
+        numero = valor
+    elif isinstance(valor, str):
+        texto = valor.strip().replace("R$", "").replace(" ", "")
+        if "," in texto:
+            texto = texto.replace(".", "").replace(",", ".")
+        try:
+            numero = float(texto)
+        except ValueError:
+            raise ErroPlanilha(f"linha {linha}: {campo} inválido: {valor!r}") from None
+    else:
+        # Data, hora ou outro tipo que o Excel guardou na célula
+        raise ErroPlanilha(f"linha {linha}: {campo} deve ser um número: {valor!r}")
+    if inteiro:
+        if not math.isfinite(numero) or float(numero) != int(numero):
+            raise ErroPlanilha(f"linha {linha}: {campo} deve ser inteiro: {valor!r}")
+        return int(numero)
+    return float(numero)
+
+def ler_planilha(caminho):
+    """Linhas da planilha como (número da linha, {coluna normalizada: valor}); ignora linhas vazias."""
+    if caminho.lower().endswith((".xlsx", ".xlsm")):
+        wb = load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            linhas = wb.worksheets[0].iter_rows(values_only=True)
+            cabecalho = [_normalizar(c) for c in next(linhas, ())]
+            for numero, valores in enumerate(linhas, start=2):
+                if any(_texto(v) for v in valores):
+                    yield numero, dict(zip(cabecalho, valores))
+        finally:
+            wb.close()
+        return
+    # CSV exportado do Excel em português costuma usar ";"
+    with open(caminho, newline="", encoding="utf-8-sig") as f:
+        amostra = f.read(64 * 1024)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(f, dialeto)
+        cabecalho = [_normalizar(c) for c in next(leitor, [])]
+        for numero, valores in enumerate(leitor, start=2):
+            if any(v.strip() for v in valores):
+                yield numero, dict(zip(cabecalho, valores))
+
+def _opcao(valor, opcoes, padrao, numero, campo):
+    """Uma das `opcoes`, comparando sem maiúsculas/acentos; `padrao` se vazio."""
+    if not _texto(valor):
+        return padrao
+    por_nome = {_normalizar(o): o for o in opcoes if o.strip()}
+    try:
+        return por_nome[_normalizar(valor)]
+    except KeyError:
+        raise ErroPlanilha(f"linha {numero}: {campo} inválido: {valor!r}") from None
+
+def _item(numero, linha):
+    """(tipo, item no formato do app) de uma linha da planilha."""
+    tipo = _normalizar(linha.get("tipo")) or "confeccionado"
+    if tipo not in ("confeccionado", "bobina"):
+        raise ErroPlanilha(f"linha {numero}: tipo deve ser Confeccionado ou Bobina: {linha.get('tipo')!r}")
+    quantidade = _numero(linha.get("quantidade"), numero, "quantidade", inteiro=True)
+    bobina = tipo == "bobina"
+    return tipo, validar_item(
+        f"linha {numero}", _texto(linha.get("produto")),
+        _numero(linha.get("comprimento"), numero, "comprimento"), _numero(linha.get("largura"), numero, "largura"),
+        1 if quantidade is None else quantidade, _texto(linha.get("cor")), bobina=bobina,
+        espessura=_numero(linha.get("espessura"), numero, "espessura") if bobina else None,
+        preco_unitario=_numero(linha.get("preco_unitario"), numero, "preco_unitario") if bobina else None,
+    )
+
+def agrupar_orcamentos(linhas, padroes):
+    """Orçamentos montados a partir das linhas, na ordem em que aparecem.
+
+    Retorna (orcamentos, erros). Cada orçamento é um dict com "linhas", "cliente",
+    "vendedor", "observacao", "preco_m2", "itens_confeccionados" e "itens_bobinas";
+    um orçamento com alguma linha inválida fica de fora e vai para `erros`.
+    """
+    grupos = {}
+    for numero, linha in linhas:
+        chave = _texto(linha.get("orcamento"))
+        grupos.setdefault(chave, []).append((numero, linha))
+
+    orcamentos, erros = [], []
+    for chave, linhas_grupo in grupos.items():
+        # Primeiro valor preenchido de cada campo do cabeçalho; senão, o da linha de comando
+        campos = dict(padroes)
+        for campo in CAMPOS_ORCAMENTO:
+            valor = next((linha[campo] for _, linha in linhas_grupo if _texto(linha.get(campo))), None)
+            if valor is not None:
+                campos[campo] = valor
+        primeira = linhas_grupo[0][0]
+        try:
+            tipo_cliente = _opcao(campos.get("tipo_cliente"), TIPOS_CLIENTE, " ", primeira, "tipo_cliente")
+            estado = _texto(campos.get("estado")).upper() or "SP"
+            tipo_pedido = _opcao(campos.get("tipo_pedido"), TIPOS_PEDIDO, "Direta", primeira, "tipo_pedido")
+            preco_m2 = _numero(campos.get("preco_m2"), primeira, "preco_m2")
+            if preco_m2 is None:
+                raise ErroPlanilha(f"linha {primeira}: preco_m2 não informado (coluna ou --preco-m2)")
+            orcamento = {
+                "chave": chave,
+                "linhas": [numero for numero, _ in linhas_grupo],
+                "cliente": {
+                    "nome": _texto(campos.get("cliente")),
+                    "cnpj": _texto(campos.get("cnpj")),
+                    "tipo_cliente": tipo_cliente,
+                    "estado": estado,
+                    "frete": _texto(campos.get("frete")) or "CIF",
+                    "tipo_pedido": tipo_pedido,
+                },
+                "vendedor": {
+                    "nome": _texto(campos.get("vendedor")),
+                    "tel": _texto(campos.get("vendedor_tel")),
+                    "email": _texto(campos.get("vendedor_email")),
+                },
+                "observacao": _texto(campos.get("observacao")),
+                "preco_m2": preco_m2,
+                "itens_confeccionados": [],
+                "itens_bobinas": [],
+            }
+            for numero, linha in linhas_grupo:
+                tipo, item = _item(numero, linha)
+                orcamento["itens_bobinas" if tipo == "bobina" else "itens_confeccionados"].append(item)
+            validar_orcamento(f"linha {primeira}", orcamento["cliente"], orcamento["itens_bobinas"], preco_m2)
+        except ErroValidacao as e:
+            erros.append(f"orçamento {chave or '(único)'}: {e}")
+            continue
+        orcamentos.append(orcamento)
+    return orcamentos, erros
+
+def valor_final(orcamento, regras):
+    """Valor final (confeccionados + bobinas) de um orçamento montado por agrupar_orcamentos."""
+    cliente = orcamento["cliente"]
+    conf = calcular_valores_confeccionados(
+        orcamento["itens_confeccionados"], orcamento["preco_m2"], cliente["tipo_cliente"], cliente["estado"],
+        cliente["tipo_pedido"], regras=regras
+    )
+    bob = calcular_valores_bobinas(orcamento["itens_bobinas"], orcamento["preco_m2"], cliente["tipo_pedido"], regras=regras)
+    return conf[3] + bob[3]
+
+def salvar_orcamentos(orcamentos):
+    """Grava os orçamentos pelo escritor do banco; retorna (ids, erros) na ordem de entrada.
+
+    Todos são enfileirados antes de esperar, então o escritor os junta em
+    transações de até ESCRITOR_LOTE_MAX orçamentos.
+    """
+    futuros = [
+        enviar_orcamento(o["cliente"], o["vendedor"], o["itens_confeccionados"], o["itens_bobinas"],
+                         o["observacao"], o["preco_m2"])
+        for o in orcamentos
+    ]
+    ids, erros = [], []
+    for orcamento, futuro in zip(orcamentos, futuros):
+        try:
+            ids.append(futuro.result(timeout=ESCRITOR_TIMEOUT))
+        except Exception as e:  # o relatório mostra a falha; os outros orçamentos seguem
+            ids.append(None)
+            erros.append(f"orçamento {orcamento['chave'] or '(único)'}: não salvo: {e}")
+    return ids, erros
+
+def gravar_pdfs(ids, pasta, processos=ZIP_WORKERS, lote=ZIP_LOTE):
+    """Gera orcamento_<id>.pdf em `pasta` para cada id, em `processos` processos; retorna a quantidade."""
+    os.makedirs(pasta, exist_ok=True)
+    feitos = 0
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for inicio in range(0, len(ids), lote):
+            for orc_id, pdf_bytes in gerar_pdfs_em_paralelo(executor, ids[inicio:inicio + lote], processos):
+                with open(os.path.join(pasta, f"orcamento_{orc_id}.pdf"), "wb") as f:
+                    f.write(pdf_bytes)
+                feitos += 1
+    return feitos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("planilha", help="arquivo .csv ou .xlsx com uma linha por item")
+    parser.add_argument("--db", default=banco.DB_NAME, help="banco SQLite (padrão: o do app)")
+    parser.add_argument("--pdfs", help="pasta onde gravar o PDF de cada orçamento salvo")
+    parser.add_argument("--processos", type=int, default=ZIP_WORKERS, help="processos para gerar os PDFs")
+    parser.add_argument("--simular", action="store_true", help="só calcula e mostra; não grava nada")
+    padroes = parser.add_argument_group("valores usados quando a planilha não tem a coluna")
+    for campo in CAMPOS_ORCAMENTO:
+        padroes.add_argument(f"--{campo.replace('_', '-')}", dest=campo)
+    args = parser.parse_args()
+    silenciar_avisos_sem_servidor()
+
+    inicio = time.perf_counter()
+    orcamentos, erros = agrupar_orcamentos(
+        ler_planilha(args.planilha), {c: getattr(args, c) for c in CAMPOS_ORCAMENTO if getattr(args, c) is not None}
+    )
+    regras = regras_vigentes()
+    ids = [None] * len(orcamentos)
+    if orcamentos and not args.simular:
+        banco.DB_NAME = args.db
+        init_db(os.path.abspath(args.db))
+        ids, erros_salvar = salvar_orcamentos(orcamentos)
+        erros += erros_salvar
+
+    for orc_id, orcamento in zip(ids, orcamentos):
+        itens = len(orcamento["itens_confeccionados"]) + len(orcamento["itens_bobinas"])
+        rotulo = f"ID {orc_id}" if orc_id is not None else ("(simulado)" if args.simular else "(não salvo)")
+        print(f"{rotulo:<12} {orcamento['cliente']['nome'][:40]:<40} {itens:>5} item(ns) {format_brl(valor_final(orcamento, regras)):>18}")
+    salvos = [i for i in ids if i is not None]
+    print(f"{len(orcamentos)} orçamento(s) calculado(s), {len(salvos)} salvo(s) em {time.perf_counter() - inicio:.2f}s")
+
+    if args.pdfs and salvos:
+        inicio_pdfs = time.perf_counter()
+        feitos = gravar_pdfs(salvos, args.pdfs, max(1, args.processos))
+        print(f"{feitos} PDF(s) em {args.pdfs} em {time.perf_counter() - inicio_pdfs:.2f}s")
+    for erro in erros:
+        print(f"ERRO {erro}", file=sys.stderr)
+    sys.exit(1 if erros else 0)
+
+if __name__ == "__main__":
+    main()
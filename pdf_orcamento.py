@@ -0,0 +1,291 @@
+"""Formatação em R$ e geração do PDF de orçamento (usado pelo app e pelos workers de exportação)."""
+from datetime import datetime
+import functools
+import textwrap
+
+import pytz
+from fpdf import FPDF
+
+# ============================
+# Formatação R$
+# ============================
+def format_brl(v):
+    try:
+        return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    except Exception:
+        return f"R$ {v}"
+
+# ============================
+# Função para gerar PDF
+# ============================
+# Versão do layout: incrementar ao mudar o PDF, para que os PDFs armazenados sejam gerados de novo
+VERSAO_MODELO_PDF = 3
+FONTE = "Helvetica"
+FUSO_BRASILIA = pytz.timezone("America/Sao_Paulo")
+TITULO = "Orçamento - Grupo Locomotiva"
+MARGEM_INFERIOR = 15  # mm; quebra automática de página
+
+# Tabelas de itens em fonte monoespaçada: todo caractere do Courier tem 0,6 do tamanho
+# da fonte, então cada linha da tabela é um texto só, com as colunas alinhadas por
+# espaços, sem medir nada. Colunas: (cabeçalho, largura em caracteres, alinhamento);
+# a soma (112) ocupa a largura útil (190 mm) em Courier 8.
+FONTE_TABELA = "Courier"
+TAMANHO_TABELA = 8
+LARGURA_CARACTERE_TABELA = 0.6 * TAMANHO_TABELA * 25.4 / 72  # mm
+COLUNAS_CONFECCIONADOS = [
+    ("Qtd", 6, "R"), ("Produto", 38, "L"), ("Compr. (m)", 12, "R"), ("Larg. (m)", 12, "R"),
+    ("Cor", 20, "L"), ("Valor Bruto", 24, "R"),
+]
+COLUNAS_BOBINAS = [
+    ("Qtd", 6, "R"), ("Produto", 28, "L"), ("Compr. (m)", 12, "R"), ("Larg. (m)", 11, "R"),
+    ("Esp. (mm)", 11, "R"), ("Cor", 14, "L"), ("Preço metro", 15, "R"), ("Valor Bruto", 15, "R"),
+]
+ALTURA_LINHA_TABELA = 5
+# Da linha de cima da célula até a base do texto, como em cell()
+BASE_TEXTO_TABELA = 0.3 * TAMANHO_TABELA * 25.4 / 72
+
+# Fontes padrão do PDF só cobrem latin-1: troca a pontuação "tipográfica" comum pelo
+# equivalente e o resto fora de latin-1 por "?", em vez de falhar na geração.
+_TRADUCAO_LATIN1 = str.maketrans({
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"', "\u2013": "-", "\u2014": "-",
+    "\u2026": "...", "\u2022": "-", "\u00a0": " ", "\u2122": "(TM)", "\u20ac": "EUR",
+})
+
+def _texto(valor):
+    texto = "" if valor is None else str(valor)
+    # Caminho comum: o texto já cabe em latin-1 (acentos do português) e não há o que trocar
+    if "\u00a0" not in texto:
+        try:
+            texto.encode("latin-1")
+            return texto
+        except UnicodeEncodeError:
+            pass
+    return texto.translate(_TRADUCAO_LATIN1).encode("latin-1", "replace").decode("latin-1")
+
+def _numero(valor):
+    return f"{valor:.2f}".replace(".", ",")
+
+def _alinhar(texto, largura, alinhamento):
+    """`texto` com um espaço de cada lado, completado com espaços até `largura` caracteres."""
+    if alinhamento == "R":
+        return f" {texto:>{largura - 2}} "
+    if alinhamento == "C":
+        return f" {texto:^{largura - 2}} "
+    return f" {texto:<{largura - 2}} "
+
+@functools.lru_cache(maxsize=None)
+def _cabecalho_tabela(colunas, x):
+    """(títulos alinhados, x das divisões das colunas, célula vazia de cada coluna) de uma tabela de itens."""
+    verticais = [x]
+    for _, n, _ in colunas:
+        verticais.append(verticais[-1] + n * LARGURA_CARACTERE_TABELA)
+    titulos = "".join(_alinhar(_texto(titulo), n, "C") for titulo, n, _ in colunas)
+    return titulos, verticais, [" " * n for _, n, _ in colunas]
+
+class _PDFOrcamento(FPDF):
+    """Cabeçalho (título + ID) e rodapé (paginação) repetidos em todas as páginas."""
+
+    def __init__(self, orcamento_id):
+        super().__init__()
+        self._titulo = _texto(TITULO)
+        self._subtitulo = _texto(f"ID do Orçamento: {orcamento_id}") if orcamento_id else ""
+        self._rodape = _texto(f"Orçamento {orcamento_id} - " if orcamento_id else "") + _texto("Página") + " {pagina}"
+        self._cabecalho_tabela = None
+        self.set_auto_page_break(auto=True, margin=MARGEM_INFERIOR)
+
+    def header(self):
+        self.set_font(FONTE, "B", 14)
+        self.cell(0, 12, self._titulo, ln=1, align="C")
+        if self._subtitulo:
+            self.set_font(FONTE, "B", 11)
+            self.cell(0, 6, self._subtitulo, ln=1, align="C")
+        self.ln(4)
+        # Tabela quebrando de página: repete o cabeçalho das colunas
+        if self._cabecalho_tabela:
+            self._desenhar_cabecalho_tabela()
+
+    def footer(self):
+        # Só o número da página: o total ({nb}) obrigaria o fpdf a percorrer todas as páginas
+        # no fim para substituí-lo. Na fonte da tabela a largura sai do número de caracteres.
+        rodape = self._rodape.format(pagina=self.page_no())
+        self.set_font(FONTE_TABELA, "", TAMANHO_TABELA)
+        self.text((self.w - len(rodape) * LARGURA_CARACTERE_TABELA) / 2, self.h - 9 + BASE_TEXTO_TABELA, rodape)
+
+    def _desenhar_cabecalho_tabela(self):
+        """Títulos das colunas sobre fundo cinza, na fonte da tabela."""
+        titulos, verticais, _ = self._cabecalho_tabela
+        altura, y = ALTURA_LINHA_TABELA + 1, self.get_y()
+        self.set_font(FONTE_TABELA, "", TAMANHO_TABELA)
+        self.set_fill_color(230, 230, 230)
+        self.rect(verticais[0], y, verticais[-1] - verticais[0], altura, "DF")
+        self.text(verticais[0], y + altura / 2 + BASE_TEXTO_TABELA, titulos)
+        self.set_y(y + altura)
+
+    def tabela(self, colunas, linhas):
+        """Tabela de itens; textos longos (produto, cor) quebram em várias linhas.
+
+        Cada linha de texto da tabela sai com um text() só (ver FONTE_TABELA);
+        as verticais das colunas e a linha de baixo são traçadas uma vez por
+        página, sem linhas entre os itens. Produtos, cores e medidas se repetem muito entre os
+        itens, então o texto alinhado de cada (coluna, valor) é montado uma vez
+        só. A altura de cada linha é a da célula com mais linhas de texto.
+        """
+        h = ALTURA_LINHA_TABELA
+        limite = self.h - MARGEM_INFERIOR
+        self._cabecalho_tabela = _cabecalho_tabela(tuple(colunas), self.l_margin)
+        _, verticais, vazias = self._cabecalho_tabela
+        x = verticais[0]
+        self._desenhar_cabecalho_tabela()
+        y = topo = self.get_y()
+        partes_por_valor = [{} for _ in colunas]
+        for linha in linhas:
+            primeiras, n_linhas = [], 1
+            for cache, coluna, valor in zip(partes_por_valor, colunas, linha):
+                partes = cache.get(valor)
+                if partes is None:
+                    partes = cache[valor] = self._partes_celula(coluna, valor)
+                primeiras.append(partes[0])
+                if len(partes) > n_linhas:
+                    n_linhas = len(partes)
+            altura = h * n_linhas
+            if y + altura > limite:
+                self._verticais_tabela(verticais, topo, y)
+                self.add_page()  # header() redesenha o cabeçalho das colunas
+                y = topo = self.get_y()
+            self.text(x, y + h / 2 + BASE_TEXTO_TABELA, "".join(primeiras))
+            for numero in range(1, n_linhas):
+                texto = "".join(
+                    partes[numero] if numero < len(partes) else vazia
+                    for partes, vazia in zip((cache[valor] for cache, valor in zip(partes_por_valor, linha)), vazias)
+                )
+                self.text(x, y + numero * h + h / 2 + BASE_TEXTO_TABELA, texto)
+            y += altura
+        self._verticais_tabela(verticais, topo, y)
+        self.set_y(y)
+        self._cabecalho_tabela = None
+
+    def _verticais_tabela(self, verticais, topo, fim):
+        """Fecha o trecho da tabela nesta página: contorno e divisões das colunas."""
+        self.rect(verticais[0], topo, verticais[-1] - verticais[0], fim - topo)
+        for x in verticais[1:-1]:
+            self.line(x, topo, x, fim)
+
+    @staticmethod
+    def _partes_celula(coluna, valor):
+        """Linhas do valor na célula, já alinhadas e com a largura da coluna."""
+        _, largura, alinhamento = coluna
+        texto = _texto(valor)
+        if len(texto) <= largura - 2:
+            return [_alinhar(texto, largura, alinhamento)]
+        return [_alinhar(parte, largura, alinhamento) for parte in textwrap.wrap(texto, largura - 2)]
+
+    def linha(self, texto, altura=6, **kwargs):
+        """Uma linha de texto na fonte atual (cada seção fixa a sua com set_font)."""
+        self.cell(0, altura, _texto(texto), ln=1, **kwargs)
+
+def gerar_pdf(orcamento_id, cliente, vendedor, itens_confeccionados, itens_bobinas, resumo_conf, resumo_bob, observacao, preco_m2, tipo_cliente="", estado="", data_hora=None):
+    pdf = _PDFOrcamento(orcamento_id)
+    pdf.add_page()
+
+    # Orçamento salvo: data do salvamento ("dd/mm/aaaa HH:MM"), não a da geração do PDF
+    if data_hora is None:
+        data_hora = datetime.now(FUSO_BRASILIA).strftime('%d/%m/%Y %H:%M')
+    pdf.set_font(FONTE, "", 9)
+    pdf.linha(f"Data e Hora: {data_hora}")
+    pdf.linha("Validade da Cotação: 7 dias corridos.")
+    pdf.ln(4)
+
+    # Dados do Cliente
+    pdf.set_font(FONTE, "B", 11)
+    pdf.linha("Cliente")
+    pdf.set_font(FONTE, "", 10)
+    for chave in ["nome", "cnpj", "tipo_cliente", "estado", "frete", "tipo_pedido"]:
+        valor = str(cliente.get(chave, "") or "")
+        if valor.strip():
+            pdf.linha(f"{chave.replace('_',' ').title()}: {valor}", altura=5)
+    pdf.ln(5)
+
+    # Itens Confeccionados
+    if itens_confeccionados:
+        pdf.set_font(FONTE, "B", 11)
+        pdf.linha("Itens Confeccionados", altura=8)
+        pdf.tabela(COLUNAS_CONFECCIONADOS, [
+            (
+                item['quantidade'], item['produto'], _numero(item['comprimento']), _numero(item['largura']),
+                item.get('cor',''), format_brl(item['comprimento'] * item['largura'] * item['quantidade'] * preco_m2)
+            )
+            for item in itens_confeccionados
+        ])
+
+    # Resumo Confeccionados
+    if resumo_conf:
+        m2_total, valor_bruto, valor_ipi, valor_final, valor_st, aliquota_st = resumo_conf
+        pdf.ln(3)
+        pdf.set_font(FONTE, "B", 11)
+        pdf.linha("Resumo - Confeccionados", altura=10)
+        pdf.set_font(FONTE, "", 10)
+        pdf.linha(f"Preço por m² utilizado: {format_brl(preco_m2)}", altura=8)
+        pdf.linha(f"Área Total: {_numero(m2_total)} m²", altura=8)
+        pdf.linha(f"Valor Bruto: {format_brl(valor_bruto)}", altura=8)
+        if valor_ipi>0:
+            pdf.linha(f"IPI: {format_brl(valor_ipi)}", altura=8)
+        if valor_st>0:
+            pdf.linha(f"ST ({aliquota_st}%): {format_brl(valor_st)}", altura=8)
+        pdf.set_font(FONTE, "B", 10)
+        pdf.linha(f"Valor Total: {format_brl(valor_final)}", altura=8)
+        pdf.ln(10)
+
+    # Itens Bobinas
+    if itens_bobinas:
+        pdf.set_font(FONTE, "B", 11)
+        pdf.linha("Itens Bobina", altura=8)
+        linhas = []
+        for item in itens_bobinas:
+            preco_item = item.get('preco_unitario') if item.get('preco_unitario') is not None else preco_m2
+            tem_espessura = item.get('espessura') is not None
+            linhas.append((
+                item['quantidade'], item['produto'], _numero(item['comprimento']), _numero(item['largura']),
+                _numero(item['espessura']) if tem_espessura else "", item.get('cor',''),
+                format_brl(preco_item) if tem_espessura else "",
+                format_brl(item['comprimento'] * item['quantidade'] * preco_item)
+            ))
+        pdf.tabela(COLUNAS_BOBINAS, linhas)
+
+        if resumo_bob:
+            # Resumo Bobinas espera 5 valores
+            m_total, valor_bruto, valor_ipi, valor_final, ipi_rate = resumo_bob 
+            pdf.ln(3)
+            pdf.set_font(FONTE, "B", 11)
+            pdf.linha("Resumo - Bobinas", altura=10)
+            pdf.set_font(FONTE, "", 10)
+            pdf.linha(f"Total de Metros Lineares: {_numero(m_total)} m", altura=8)
+            pdf.linha(f"Valor Bruto: {format_brl(valor_bruto)}", altura=8)
+            if valor_ipi>0:
+                # Exibe a alíquota correta
+                pdf.linha(f"IPI ({ipi_rate * 100:.2f}%): {format_brl(valor_ipi)}", altura=8)
+            pdf.set_font(FONTE, "B", 10)
+            pdf.linha(f"Valor Total: {format_brl(valor_final)}", altura=8)
+        pdf.ln(10)
+
+    # Observações
+    if observacao:
+        pdf.set_font(FONTE, "B", 11)
+        pdf.linha("Observações", altura=11)
+        pdf.set_font(FONTE, "", 10)
+        pdf.multi_cell(0, 6, _texto(observacao))
+        pdf.ln(10)
+
+    # Vendedor
+    if vendedor:
+        pdf.set_font(FONTE, "", 10)
+        pdf.linha(f"Vendedor: {vendedor.get('nome','')}")
+        pdf.linha(f"Telefone: {vendedor.get('tel','')}")
+        pdf.linha(f"E-mail: {vendedor.get('email','')}")
+
+    # No fpdf 1.7.2, output(dest='S') devolve str (um caractere por byte), não bytes.
+    # Os textos já passaram por _texto (latin-1), então a codificação não falha.
+    return pdf.output(dest='S').encode('latin1')
+
+def gerar_pdf_de_argumentos(argumentos):
+    """gerar_pdf(**argumentos); alvo dos workers do pool de processos (precisa ser picklável)."""
+    return argumentos["orcamento_id"], gerar_pdf(**argumentos)
@@ -0,0 +1,160 @@
+"""Modo perfil (opcional): tempo por seção de cada rerun e log das consultas SQLite.
+
+Ligado pela variável de ambiente ORC_PERFIL=1 ou pelo toggle da barra lateral.
+O script chama iniciar() no topo, marco(nome) no fim de cada seção (a seção vai
+do marco anterior até este) e finalizar() no fim. Enquanto um rerun está sendo
+medido, as conexões emprestadas pelo pool nessa thread registram cada comando
+SQL via set_trace_callback. O tempo de um comando vai do seu início até o
+próximo comando na mesma conexão, ou até a conexão voltar ao pool (inclui a
+leitura das linhas). Cada rerun medido é anexado como uma linha JSON em
+ORC_PERFIL_LOG (padrão perfil.jsonl).
+"""
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import streamlit as st
+
+PERFIL_ENV = "ORC_PERFIL"
+PERFIL_LOG = os.environ.get("ORC_PERFIL_LOG", "perfil.jsonl")
+CONSULTA_LENTA_MS = float(os.environ.get("ORC_PERFIL_LENTA_MS", "50"))
+CONSULTAS_NO_PAINEL = 10
+
+_local = threading.local()
+_lock_log = threading.Lock()
+
+def ativo_por_ambiente():
+    return os.environ.get(PERFIL_ENV, "").strip().lower() in ("1", "true", "sim", "on")
+
+def _normalizar_sql(sql):
+    """Agrupa comandos iguais com parâmetros diferentes (literais viram "?")."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    return " ".join(sql.split())
+
+class ColetorPerfil:
+    """Medições de um rerun: seções (nome, ms) e comandos SQL (sql, ms)."""
+
+    def __init__(self):
+        self.pagina = None
+        self.inicio = self._ultimo_marco = time.perf_counter()
+        self.secoes = []
+        self.consultas = []
+        self.total_ms = None
+
+    def marco(self, nome):
+        agora = time.perf_counter()
+        self.secoes.append((nome, (agora - self._ultimo_marco) * 1000))
+        self._ultimo_marco = agora
+
+    def registrar_consulta(self, sql, ms):
+        self.consultas.append((sql, ms))
+
+    def lentas(self):
+        return [(sql, ms) for sql, ms in self.consultas if ms >= CONSULTA_LENTA_MS]
+
+    def resumo_consultas(self):
+        """[(sql normalizado, quantidade, total_ms, max_ms)], do maior tempo total para o menor."""
+        grupos = {}
+        for sql, ms in self.consultas:
+            chave = _normalizar_sql(sql)
+            quantidade, total, maximo = grupos.get(chave, (0, 0.0, 0.0))
+            grupos[chave] = (quantidade + 1, total + ms, max(maximo, ms))
+        return sorted(((sql,) + v for sql, v in grupos.items()), key=lambda g: g[2], reverse=True)
+
+    def como_registro(self):
+        return {
+            "data_hora_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "pagina": self.pagina,
+            "total_ms": round(self.total_ms, 3),
+            "secoes": [{"nome": nome, "ms": round(ms, 3)} for nome, ms in self.secoes],
+            "sql": {
+                "quantidade": len(self.consultas),
+                "total_ms": round(sum(ms for _, ms in self.consultas), 3),
+                "por_comando": [
+                    {"sql": sql, "quantidade": n, "total_ms": round(total, 3), "max_ms": round(maximo, 3)}
+                    for sql, n, total, maximo in self.resumo_consultas()
+                ],
+                "lentas": [{"sql": sql, "ms": round(ms, 3)} for sql, ms in self.lentas()],
+            },
+        }
+
+def iniciar(ativo):
+    """Começa a medir o rerun desta thread (ou desliga a medição se `ativo` for falso)."""
+    _local.coletor = ColetorPerfil() if ativo else None
+    return _local.coletor
+
+def coletor_atual():
+    return getattr(_local, "coletor", None)
+
+def marco(nome):
+    """Fecha a seção `nome` (do marco anterior até agora); sem efeito se o perfil estiver desligado."""
+    coletor = coletor_atual()
+    if coletor is not None:
+        coletor.marco(nome)
+
+def finalizar(pagina=None, nome_ultima_secao="demais"):
+    """Fecha o rerun medido, anexa-o ao log JSONL e o retorna (None se desligado)."""
+    coletor = coletor_atual()
+    if coletor is None:
+        return None
+    coletor.pagina = pagina
+    coletor.marco(nome_ultima_secao)
+    coletor.total_ms = (time.perf_counter() - coletor.inicio) * 1000
+    _local.coletor = None
+    linha = json.dumps(coletor.como_registro(), ensure_ascii=False)
+    try:
+        with _lock_log, open(PERFIL_LOG, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+    except OSError:
+        pass  # o log é auxiliar; o painel continua funcionando
+    return coletor
+
+@contextmanager
+def rastrear_sql(conn):
+    """Registra os comandos de `conn` no coletor desta thread enquanto o bloco durar."""
+    coletor = coletor_atual()
+    if coletor is None:
+        yield conn
+        return
+    aberto = [None, 0.0]  # comando em execução e seu início
+
+    def fechar(agora):
+        if aberto[0] is not None:
+            coletor.registrar_consulta(aberto[0], (agora - aberto[1]) * 1000)
+            aberto[0] = None
+
+    def ao_executar(sql):
+        agora = time.perf_counter()
+        fechar(agora)
+        aberto[0], aberto[1] = sql, agora
+
+    conn.set_trace_callback(ao_executar)
+    try:
+        yield conn
+    finally:
+        conn.set_trace_callback(None)
+        fechar(time.perf_counter())
+
+def exibir_painel(coletor):
+    """Painel na barra lateral com as seções e as consultas do rerun medido."""
+    with st.sidebar.expander("⏱️ Perfil do rerun", expanded=True):
+        sql_total = sum(ms for _, ms in coletor.consultas)
+        st.caption(f"Total: {coletor.total_ms:.1f} ms · {len(coletor.consultas)} consulta(s) SQL em {sql_total:.1f} ms")
+        st.dataframe(
+            [{"Seção": nome, "ms": round(ms, 1)} for nome, ms in coletor.secoes],
+            hide_index=True
+        )
+        resumo = coletor.resumo_consultas()[:CONSULTAS_NO_PAINEL]
+        if resumo:
+            st.dataframe(
+                [{"SQL": sql, "n": n, "total ms": round(total, 2), "máx ms": round(maximo, 2)} for sql, n, total, maximo in resumo],
+                hide_index=True
+            )
+        for sql, ms in coletor.lentas():
+            st.warning(f"🐢 {ms:.1f} ms: {sql[:200]}")
+        st.caption(f"Log: {os.path.abspath(PERFIL_LOG)}")
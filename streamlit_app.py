@@ -1,354 +1,24 @@
+import math
 import os
+from contextlib import contextmanager
+from functools import partial
 import streamlit as st
-from datetime import datetime, timedelta
-import pytz
-from fpdf import FPDF
-import sqlite3
+from datetime import datetime
 import pandas as pd
-from io import BytesIO
-
-# ============================
-# Banco SQLite
-# ============================
-DB_NAME = "orcamentos.db" 
-
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    
-    # 1. Cria ou verifica a tabela orcamentos (com a nova coluna preco_m2_base)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS orcamentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            data_hora TEXT,
-            cliente_nome TEXT,
-            cliente_cnpj TEXT,
-            tipo_cliente TEXT,
-            estado TEXT,
-            frete TEXT,
-            tipo_pedido TEXT,
-            vendedor_nome TEXT,
-            vendedor_tel TEXT,
-            vendedor_email TEXT,
-            observacao TEXT,
-            preco_m2_base REAL
-        )
-    """)
-    
-    # 2. Migração de Schema: Adiciona a coluna preco_m2_base se ela não existir
-    try:
-        cur.execute("SELECT preco_m2_base FROM orcamentos LIMIT 1")
-    except sqlite3.OperationalError:
-        cur.execute("ALTER TABLE orcamentos ADD COLUMN preco_m2_base REAL")
-        print("Migração de DB: Coluna 'preco_m2_base' adicionada à tabela 'orcamentos'.")
-
-    # 3. Criação de tabelas secundárias
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS itens_confeccionados (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            orcamento_id INTEGER,
-            produto TEXT,
-            comprimento REAL,
-            largura REAL,
-            quantidade INTEGER,
-            cor TEXT,
-            FOREIGN KEY (orcamento_id) REFERENCES orcamentos(id)
-        )
-    """)
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS itens_bobinas (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            orcamento_id INTEGER,
-            produto TEXT,
-            comprimento REAL,
-            largura REAL,
-            quantidade INTEGER,
-            cor TEXT,
-            espessura REAL,
-            preco_unitario REAL,
-            FOREIGN KEY (orcamento_id) REFERENCES orcamentos(id)
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-def salvar_orcamento(cliente, vendedor, itens_confeccionados, itens_bobinas, observacao, preco_m2_base):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO orcamentos (data_hora, cliente_nome, cliente_cnpj, tipo_cliente, estado, frete, tipo_pedido, vendedor_nome, vendedor_tel, vendedor_email, observacao, preco_m2_base)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        datetime.now(pytz.timezone("America/Sao_Paulo")).strftime("%d/%m/%Y %H:%M"),
-        cliente.get("nome",""),
-        cliente.get("cnpj",""),
-        cliente.get("tipo_cliente",""),
-        cliente.get("estado",""),
-        cliente.get("frete",""),
-        cliente.get("tipo_pedido",""),
-        vendedor.get("nome",""),
-        vendedor.get("tel",""),
-        vendedor.get("email",""),
-        observacao,
-        preco_m2_base 
-    ))
-    orcamento_id = cur.lastrowid
-
-    for item in itens_confeccionados:
-        cur.execute("""
-            INSERT INTO itens_confeccionados (orcamento_id, produto, comprimento, largura, quantidade, cor)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (orcamento_id, item['produto'], item['comprimento'], item['largura'], item['quantidade'], item.get('cor','')))
-
-    for item in itens_bobinas:
-        cur.execute("""
-            INSERT INTO itens_bobinas (orcamento_id, produto, comprimento, largura, quantidade, cor, espessura, preco_unitario)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (orcamento_id, item['produto'], item['comprimento'], item['largura'], item['quantidade'], item.get('cor',''), item.get('espessura'), item.get('preco_unitario')))
-
-    conn.commit()
-    conn.close()
-    return orcamento_id
-
-def buscar_orcamentos():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    cur.execute("SELECT id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome FROM orcamentos ORDER BY id DESC") 
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def carregar_orcamento_por_id(orcamento_id):
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-    orc_cols = ['id','data_hora','cliente_nome','cliente_cnpj','tipo_cliente','estado','frete','tipo_pedido','vendedor_nome','vendedor_tel','vendedor_email','observacao', 'preco_m2_base']
-    cur.execute("SELECT * FROM orcamentos WHERE id=?", (orcamento_id,))
-    orc = cur.fetchone()
-    cur.execute("SELECT produto, comprimento, largura, quantidade, cor FROM itens_confeccionados WHERE orcamento_id=?", (orcamento_id,))
-    confecc = cur.fetchall()
-    cur.execute("SELECT produto, comprimento, largura, quantidade, cor, espessura, preco_unitario FROM itens_bobinas WHERE orcamento_id=?", (orcamento_id,))
-    bob = cur.fetchall()
-    conn.close()
-    return orc, confecc, bob
-
-# ============================
-# Formatação R$
-# ============================
-def _format_brl(v):
-    try:
-        return f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-    except Exception:
-        return f"R$ {v}"
-
-# ============================
-# Cálculos
-# ============================
-st_por_estado = {} 
-
-def calcular_valores_confeccionados(itens, preco_m2, tipo_cliente="", estado="", tipo_pedido="Direta"):
-    if not itens:
-        return 0.0, 0.0, 0.0, 0.0, 0.0, 0
-    m2_total = sum(item['comprimento'] * item['largura'] * item['quantidade'] for item in itens)
-    valor_bruto = m2_total * preco_m2
-    # Lógica de IPI e ST... (mantida)
-    if tipo_pedido == "Industrialização":
-        valor_ipi = 0
-        valor_st = 0
-        aliquota_st = 0
-        valor_final = valor_bruto
-    else:
-        IPI_CONFECCIONADO_DEFAULT = 0.0325
-        IPI_ZERO_PRODS = ["Acrylic", "Agora"]
-        IPI_ZERO_PREFIXES = ["Tela de Sombreamento"]
-        
-        valor_ipi_acumulado = 0.0
-        
-        for item in itens:
-            produto = item.get('produto', '')
-            valor_item = item['comprimento'] * item['largura'] * item['quantidade'] * preco_m2
-            ipi_rate = IPI_CONFECCIONADO_DEFAULT
-
-            if produto in IPI_ZERO_PRODS or any(produto.startswith(prefix) for prefix in IPI_ZERO_PREFIXES):
-                ipi_rate = 0.0
-            
-            valor_ipi_acumulado += valor_item * ipi_rate
-
-        valor_ipi = valor_ipi_acumulado
-        valor_final = valor_bruto + valor_ipi
-        
-        valor_st = 0
-        aliquota_st = 0
-        if any(item.get('produto') == "Encerado" for item in itens) and tipo_cliente == "Revenda":
-            aliquota_st = st_por_estado.get(estado, 0)
-            valor_st = valor_final * aliquota_st / 100
-            valor_final += valor_st
-
-    return m2_total, valor_bruto, valor_ipi, valor_final, valor_st, aliquota_st
-
-# FUNÇÃO CORRIGIDA PARA IPI DE CAPOTA MARÍTIMA
-def calcular_valores_bobinas(itens, preco_m2, tipo_pedido="Direta"):
-    IPI_RATE_DEFAULT = 0.0975 # 9.75%
-    
-    if not itens:
-        # Retorna a alíquota padrão se não houver itens
-        return 0.0, 0.0, 0.0, 0.0, IPI_RATE_DEFAULT
-
-    m_total = sum(item['comprimento'] * item['quantidade'] for item in itens)
-    
-    def preco_item_of(item):
-        pu = item.get('preco_unitario') 
-        return pu if (pu is not None) else preco_m2 
-
-    valor_bruto = sum((item['comprimento'] * item['quantidade']) * preco_item_of(item) for item in itens)
-
-    if tipo_pedido == "Industrialização":
-        return m_total, valor_bruto, 0.0, valor_bruto, 0.0 # Retorna 0.0 como taxa de IPI
-    else:
-        IPI_RATE_CAPOTA = 0.0325 # 3.25%
-        
-        # Verifica se algum item é "Capota Marítima"
-        has_capota_maritima = any(item.get('produto') == "Capota Marítima" for item in itens)
-        
-        # Define a alíquota a ser usada
-        ipi_rate_to_use = IPI_RATE_CAPOTA if has_capota_maritima else IPI_RATE_DEFAULT
-        
-        valor_ipi = valor_bruto * ipi_rate_to_use
-        valor_final = valor_bruto + valor_ipi
-
-        # Novo: Retorna a taxa de IPI utilizada para exibição
-        return m_total, valor_bruto, valor_ipi, valor_final, ipi_rate_to_use
-
-# ============================
-# Função para gerar PDF
-# ============================
-def gerar_pdf(orcamento_id, cliente, vendedor, itens_confeccionados, itens_bobinas, resumo_conf, resumo_bob, observacao, preco_m2, tipo_cliente="", estado=""):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", "B", 14)
-
-    # Cabeçalho principal
-    pdf.cell(0, 12, "Orçamento - Grupo Locomotiva", ln=True, align="C")
-    
-    # Inclusão do ID do Orçamento
-    if orcamento_id:
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 6, f"ID do Orçamento: {orcamento_id}", ln=True, align="C")
-    
-    pdf.ln(10)
-    pdf.set_font("Arial", size=9)
-    brasilia_tz = pytz.timezone("America/Sao_Paulo")
-    pdf.cell(0, 6, f"Data e Hora: {datetime.now(brasilia_tz).strftime('%d/%m/%Y %H:%M')}", ln=True)
-    pdf.cell(0, 6, "Validade da Cotação: 7 dias corridos.", ln=True, align="L")
-    pdf.ln(4)
-
-    # Dados do Cliente
-    pdf.set_font("Arial", "B", 11)
-    pdf.cell(0, 6, "Cliente", ln=True)
-    pdf.set_font("Arial", size=10)
-    largura_util = pdf.w - 2*pdf.l_margin
-
-    for chave in ["nome", "cnpj", "tipo_cliente", "estado", "frete", "tipo_pedido"]:
-        valor = str(cliente.get(chave, "") or "")
-        if valor.strip():
-            pdf.cell(0, 6, f"{chave.replace('_',' ').title()}: {valor}", align="L")
-            pdf.ln(5)
-    pdf.ln(5)
-
-    # Itens Confeccionados
-    if itens_confeccionados:
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 8, "Itens Confeccionados", ln=True)
-        pdf.set_font("Arial", size=8)
-        for item in itens_confeccionados:
-            area_item = item['comprimento'] * item['largura'] * item['quantidade']
-            valor_item = area_item * preco_m2
-            txt = (
-                f"{item['quantidade']}x {item['produto']} - {item['comprimento']}m x {item['largura']}m "
-                f"| Cor: {item.get('cor','')} | Valor Bruto: {_format_brl(valor_item)}"
-            )
-            pdf.multi_cell(largura_util, 6, txt)
-            pdf.ln(1)
-
-    # Resumo Confeccionados
-    if resumo_conf:
-        m2_total, valor_bruto, valor_ipi, valor_final, valor_st, aliquota_st = resumo_conf
-        pdf.ln(3)
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 10, "Resumo - Confeccionados", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.cell(0, 8, f"Preço por m² utilizado: {_format_brl(preco_m2)}", ln=True)
-        pdf.cell(0, 8, f"Área Total: {str(f'{m2_total:.2f}'.replace('.', ','))} m²", ln=True)
-        pdf.cell(0, 8, f"Valor Bruto: {_format_brl(valor_bruto)}", ln=True)
-        if valor_ipi>0:
-            pdf.cell(0, 8, f"IPI: {_format_brl(valor_ipi)}", ln=True)
-        if valor_st>0:
-            pdf.cell(0, 8, f"ST ({aliquota_st}%): {_format_brl(valor_st)}", ln=True)
-        pdf.set_font("Arial", "B", 10)
-        pdf.cell(0, 8, f"Valor Total: {_format_brl(valor_final)}", ln=True)
-        pdf.set_font("Arial", "", 10)
-        pdf.ln(10)
-
-    # Itens Bobinas
-    if itens_bobinas:
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 8, "Itens Bobina", ln=True)
-        pdf.set_font("Arial", size=8)
-        for item in itens_bobinas:
-            metros_item = item['comprimento'] * item['quantidade']
-            preco_item = item.get('preco_unitario') if item.get('preco_unitario') is not None else preco_m2
-            valor_item = metros_item * preco_item
-            txt = (
-                f"{item['quantidade']}x {item['produto']} - {item['comprimento']}m | Largura: {item['largura']}m "
-                f"| Cor: {item.get('cor','')} | Valor Bruto: {_format_brl(valor_item)}"
-            )
-            if "espessura" in item and item.get('espessura') is not None:
-                esp = f"{item['espessura']:.2f}".replace(".", ",")
-                txt += f" | Esp: {esp} mm"
-                txt += f" | Preço metro: {_format_brl(preco_item)}"
-            pdf.multi_cell(largura_util, 6, txt)
-            pdf.ln(1)
-
-        if resumo_bob:
-            # Resumo Bobinas espera 5 valores
-            m_total, valor_bruto, valor_ipi, valor_final, ipi_rate = resumo_bob 
-            pdf.ln(3)
-            pdf.set_font("Arial", "B", 11)
-            pdf.cell(0, 10, "Resumo - Bobinas", ln=True)
-            pdf.set_font("Arial", "", 10)
-            pdf.cell(0, 8, f"Total de Metros Lineares: {str(f'{m_total:.2f}'.replace('.', ','))} m", ln=True)
-            pdf.cell(0, 8, f"Valor Bruto: {_format_brl(valor_bruto)}", ln=True)
-            if valor_ipi>0:
-                ipi_percent = ipi_rate * 100
-                # Exibe a alíquota correta
-                pdf.cell(0, 8, f"IPI ({ipi_percent:.2f}%): {_format_brl(valor_ipi)}", ln=True)
-            pdf.set_font("Arial", "B", 10)
-            pdf.cell(0, 8, f"Valor Total: {_format_brl(valor_final)}", ln=True)
-        pdf.ln(10)
-
-    # Observações
-    if observacao:
-        pdf.set_font("Arial", "B", 11)
-        pdf.cell(0, 11, "Observações", ln=True)
-        pdf.set_font("Arial", size=10)
-        pdf.multi_cell(largura_util, 10, str(observacao))
-        pdf.ln(10)
-
-    # Vendedor
-    if vendedor:
-        pdf.set_font("Arial", "", 10)
-        vendedor_txt = (
-            f"Vendedor: {vendedor.get('nome','')}\n"
-            f"Telefone: {vendedor.get('tel','')}\n"
-            f"E-mail: {vendedor.get('email','')}"
-        )
-        pdf.multi_cell(largura_util, 8, vendedor_txt)
-        pdf.ln(5)
-
-    # Retorna bytes do PDF
-    pdf_bytes = pdf.output(dest='S').encode('latin1')
-    return pdf_bytes
+import pytz
+from banco import (
+    DB_NAME, ORC_COLUNAS, init_db, salvar_orcamento, buscar_orcamentos, contar_orcamentos,
+    buscar_valores_distintos, buscar_limites_datas, carregar_orcamentos_em_lote, resumos_salvos, sugerir_clientes,
+    buscar_vendas_agregadas
+)
+from calculos import (
+    calcular_valores_bobinas, calcular_valores_confeccionados, prefixos_espessura, produtos_lista, regras_vigentes
+)
+from exportacao import ZIP_MAX_ORCAMENTOS, gerar_excel_historico, gerar_zip_pdfs_historico
+from pdf_orcamento import format_brl
+from armazenamento_pdf import chave_pdf, get_gerador_pdfs, ler_pdf
+from validacao import ESPESSURA_PADRAO
+import perfil
 
 # ============================
 # Funções de Reset
@@ -390,13 +60,20 @@ def reset_novo_orcamento_state():
         
     st.session_state["itens_confeccionados"] = []
     st.session_state["bobinas_adicionadas"] = []
+    renovar_grades()
+    st.session_state.pop("orcamento_salvo_id", None)
     
 
 def reset_historico_filters():
     """Reseta todos os filtros do Histórico de Orçamentos."""
-    st.session_state["filtro_cliente"] = "Todos"
-    st.session_state["filtro_cnpj"] = "Todos"
+    st.session_state["filtro_busca"] = ""
     st.session_state["filtro_id"] = ""
+    st.session_state["filtro_vendedor"] = "Todos"
+    st.session_state["historico_pagina"] = 1
+
+def reset_historico_pagina():
+    """Volta para a primeira página do Histórico quando um filtro muda."""
+    st.session_state["historico_pagina"] = 1
     # O Streamlit faz o rerun automaticamente após a função on_click.
 
 # ============================
@@ -417,49 +94,334 @@ def update_vendedor_details():
     st.session_state["vend_tel"] = details["tel"]
     st.session_state["vend_email"] = details["email"]
 
+HISTORICO_TAMANHOS_PAGINA = [10, 20, 50, 100]
+# O st.download_button não faz streaming: o arquivo exportado fica inteiro na
+# memória do servidor enquanto o botão estiver na tela.
+AVISO_DOWNLOAD_MEMORIA = "Arquivo de {tamanho:.1f} MB mantido na memória do servidor até o download; para bases grandes, refine os filtros."
+
 # ============================
-# Funções de Resumo para Exportação Excel (NOVO - REQ. 2)
+# PDFs de Orçamentos Salvos (armazenamento, gerados em segundo plano)
 # ============================
-def get_order_summary_info(confecc, bob):
-    # confecc: (produto, comprimento, largura, quantidade, cor)
-    # bob: (produto, comprimento, largura, quantidade, cor, espessura, preco_unitario)
-    
-    has_conf = len(confecc) > 0
-    has_bob = len(bob) > 0
-    
-    # 1. Tipo do Item
-    if has_conf and has_bob:
-        tipo_item = "Misto (Conf. e Bobina)"
-    elif has_conf:
-        tipo_item = "Confeccionado"
-    elif has_bob:
-        tipo_item = "Bobina"
+PDF_VERIFICACAO_S = 1.0  # intervalo com que o status "gerando" é reconsultado
+
+def exibir_pdf_orcamento(orcamento_id, chave=None, chave_download="download_key", acompanhando=False, estado=None):
+    """Mostra o status do PDF armazenado do orçamento e o download quando estiver pronto.
+
+    `chave` (chave_pdf do orçamento carregado) confere se o PDF armazenado está
+    atualizado. `estado` ((estado, detalhe) já consultado) evita consultar de novo.
+    Com `acompanhando=True` roda dentro de um fragmento com run_every;
+    ao ficar pronto, reexecuta o app inteiro para que o fragmento pare de se repetir.
+    """
+    estado_pdf, detalhe = estado or get_gerador_pdfs().estado(orcamento_id, chave)
+    if estado_pdf == "pronto":
+        if acompanhando:
+            st.rerun()
+        # O arquivo só é lido do disco quando o usuário clica
+        st.download_button(
+            "⬇️ Baixar PDF",
+            data=partial(ler_pdf, detalhe),
+            file_name=f"orcamento_{orcamento_id}.pdf",
+            mime="application/pdf",
+            key=f"{chave_download}_{orcamento_id}"
+        )
+    elif estado_pdf == "erro":
+        st.warning(f"⚠️ Não foi possível gerar o PDF do orçamento {orcamento_id}: {detalhe}")
+        st.button("🔁 Gerar PDF novamente", key=f"regerar_pdf_{orcamento_id}",
+                  on_click=get_gerador_pdfs().enviar, args=(orcamento_id,))
+    elif estado_pdf == "ausente":
+        st.button("🧾 Preparar PDF", key=f"preparar_pdf_{orcamento_id}",
+                  on_click=get_gerador_pdfs().enviar, args=(orcamento_id,))
     else:
-        tipo_item = "Nenhum"
-
-    # 2. Produto Mais Selecionado (por quantidade)
-    product_counts = {}
-    for item in confecc:
-        product = item[0] # Produto
-        quantity = item[3] # Quantidade
-        product_counts[product] = product_counts.get(product, 0) + quantity
-    
-    for item in bob:
-        product = item[0] # Produto
-        quantity = item[3] # Quantidade
-        product_counts[product] = product_counts.get(product, 0) + quantity
+        st.info(f"⏳ Gerando o PDF do orçamento {orcamento_id} em segundo plano...")
+
+def mostrar_pdf_orcamento(orcamento_id, chave=None, chave_download="download_key", estado=None):
+    """exibir_pdf_orcamento; enquanto o PDF é gerado, dentro de um fragmento que se atualiza sozinho."""
+    estado = estado or get_gerador_pdfs().estado(orcamento_id, chave)
+    if estado[0] == "gerando":
+        # O fragmento consulta o estado de novo a cada execução
+        st.fragment(exibir_pdf_orcamento, run_every=PDF_VERIFICACAO_S)(
+            orcamento_id, chave, chave_download, acompanhando=True
+        )
+    else:
+        exibir_pdf_orcamento(orcamento_id, chave, chave_download, estado=estado)
+
+# ============================
+# Sugestões de Clientes (autocompletar)
+# ============================
+SUGESTOES_MIN_CARACTERES = 2
+
+@st.cache_data(ttl=60, max_entries=512, show_spinner=False)
+def sugestoes_clientes(prefixo):
+    """sugerir_clientes em cache por prefixo (compartilhado entre as sessões).
+
+    Limpo a cada orçamento salvo; o TTL cobre orçamentos salvos por outro processo.
+    """
+    return sugerir_clientes(prefixo)
+
+def preencher_cliente_sugerido():
+    """Preenche nome, CNPJ, tipo e estado com o cliente escolhido nas sugestões."""
+    escolhido = st.session_state.get("cliente_sugerido")
+    sugestoes = {s[0]: s for s in sugestoes_clientes(st.session_state.get("Cliente_nome", "").strip())}
+    if escolhido in sugestoes:
+        nome, cnpj, tipo, uf = sugestoes[escolhido]
+        st.session_state["Cliente_nome"] = nome
+        st.session_state["Cliente_CNPJ"] = cnpj or ""
+        st.session_state["tipo_cliente"] = tipo if tipo in ("Consumidor Final", "Revenda") else " "
+        if uf in regras_vigentes().icms_por_estado:
+            st.session_state["estado"] = uf
+    st.session_state["cliente_sugerido"] = None
+
+# ============================
+# Grade de Itens (st.data_editor)
+# ============================
+# (campo do item, coluna da grade) editáveis, na ordem da grade
+GRADE_CAMPOS = {
+    "itens_confeccionados": [
+        ("produto", "Produto"), ("comprimento", "Comprimento (m)"), ("largura", "Largura (m)"),
+        ("quantidade", "Quantidade"), ("cor", "Cor"),
+    ],
+    "bobinas_adicionadas": [
+        ("produto", "Produto"), ("comprimento", "Comprimento (m)"), ("largura", "Largura (m)"),
+        ("quantidade", "Quantidade"), ("espessura", "Espessura (mm)"), ("preco_unitario", "Preço Unitário (R$)"),
+        ("cor", "Cor"),
+    ],
+}
+GRADE_OBRIGATORIOS = {"produto", "comprimento", "largura", "quantidade"}
+GRADE_TIPOS = {
+    "produto": "object", "cor": "object", "quantidade": "int64",
+    "comprimento": "float64", "largura": "float64", "espessura": "float64", "preco_unitario": "float64",
+}
+
+def chave_grade(lista):
+    """Chave do data_editor de `lista`; muda a cada edição aplicada, recomeçando o editor sobre os itens novos."""
+    return f"grade_{lista}_{st.session_state.get(f'grade_{lista}_versao', 0)}"
+
+def renovar_grades(listas=tuple(GRADE_CAMPOS)):
+    """Nova chave para as grades de `listas`: chamar sempre que os itens forem trocados por fora da grade.
+
+    Sem isso, o data_editor reaplica sobre os itens novos as edições pendentes da lista anterior.
+    """
+    for lista in listas:
+        st.session_state[f"grade_{lista}_versao"] = st.session_state.get(f"grade_{lista}_versao", 0) + 1
+
+def _valor_campo(campo, valor):
+    """Valor de uma célula da grade no tipo do item (None para célula vazia)."""
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return "" if campo == "cor" else None
+    if campo in ("produto", "cor"):
+        return str(valor)
+    if campo == "quantidade":
+        return int(valor)
+    return float(valor)
+
+def _item_valido(item):
+    return bool((item["produto"] or "").strip()) and all(
+        item[c] is not None and item[c] > 0 for c in ("comprimento", "largura", "quantidade")
+    )
+
+def _fixar_preco_bobina(item, preco_m2):
+    """Como no botão "Adicionar Bobina": bobina com espessura guarda o preço base atual em preco_unitario."""
+    if item.get("espessura") is None and (item["produto"] or "").startswith(prefixos_espessura):
+        item["espessura"] = ESPESSURA_PADRAO
+    if item.get("espessura") is not None and item.get("preco_unitario") is None:
+        item["preco_unitario"] = preco_m2
+
+def aplicar_edicoes_grade(lista, preco_m2):
+    """on_change da grade: aplica de uma vez as células editadas, linhas novas e removidas em st.session_state[lista].
+
+    Células obrigatórias apagadas mantêm o valor anterior; linhas novas incompletas são ignoradas.
+    Bobinas com espessura sem preço próprio recebem `preco_m2`, como as do formulário.
+    """
+    edicoes = st.session_state.get(chave_grade(lista)) or {}
+    campos = GRADE_CAMPOS[lista]
+    campo_da_coluna = {coluna: campo for campo, coluna in campos}
+    itens = [dict(item) for item in st.session_state[lista]]
+    for posicao, mudancas in edicoes.get("edited_rows", {}).items():
+        item = itens[int(posicao)]
+        for coluna, valor in mudancas.items():
+            campo = campo_da_coluna.get(coluna)
+            if campo is None:
+                continue
+            novo = _valor_campo(campo, valor)
+            if novo is None and campo in GRADE_OBRIGATORIOS:
+                continue
+            item[campo] = novo
+    removidas = {int(posicao) for posicao in edicoes.get("deleted_rows", [])}
+    itens = [item for posicao, item in enumerate(itens) if posicao not in removidas]
+    for linha in edicoes.get("added_rows", []):
+        item = {campo: _valor_campo(campo, linha.get(coluna)) for campo, coluna in campos}
+        if _item_valido(item):
+            itens.append(item)
+    itens = [item for item in itens if _item_valido(item)]
+    if lista == "bobinas_adicionadas":
+        for item in itens:
+            _fixar_preco_bobina(item, preco_m2)
+    st.session_state[lista] = itens
+    renovar_grades([lista])
+
+def grade_itens(lista, preco_m2, produto_padrao):
+    """Todos os itens de `lista` num único st.data_editor, com colunas calculadas (somente leitura).
+
+    Permite editar células (inclusive a cor), colar linhas de uma planilha, adicionar
+    e remover várias linhas; aplicar_edicoes_grade grava o resultado nos itens.
+    """
+    itens = st.session_state[lista]
+    campos = GRADE_CAMPOS[lista]
+    df = pd.DataFrame({coluna: [item.get(campo) for item in itens] for campo, coluna in campos})
+    df = df.astype({coluna: GRADE_TIPOS[campo] for campo, coluna in campos})
+    if lista == "itens_confeccionados":
+        medida, rotulo_medida = df["Comprimento (m)"] * df["Largura (m)"] * df["Quantidade"], "Área (m²)"
+        preco = preco_m2
+    else:
+        medida, rotulo_medida = df["Comprimento (m)"] * df["Quantidade"], "Metros"
+        preco = df["Preço Unitário (R$)"].fillna(preco_m2)
+    df[rotulo_medida] = medida
+    df["Valor (R$)"] = medida * preco
+
+    padrao = produto_padrao if produto_padrao in produtos_lista and produto_padrao.strip() else None
+    configuracao = {
+        "Produto": st.column_config.SelectboxColumn(options=[p for p in produtos_lista if p.strip()], required=True, default=padrao),
+        "Comprimento (m)": st.column_config.NumberColumn(min_value=0.01, step=0.01, format="%.2f", required=True, default=1.0),
+        "Largura (m)": st.column_config.NumberColumn(min_value=0.01, step=0.01, format="%.2f", required=True, default=1.0),
+        "Quantidade": st.column_config.NumberColumn(min_value=1, step=1, required=True, default=1),
+        "Espessura (mm)": st.column_config.NumberColumn(min_value=0.01, step=0.01, format="%.2f"),
+        "Preço Unitário (R$)": st.column_config.NumberColumn(min_value=0.0, step=0.01, format="R$ %.2f"),
+        "Cor": st.column_config.TextColumn(default=""),
+        rotulo_medida: st.column_config.NumberColumn(format="%.2f", disabled=True),
+        "Valor (R$)": st.column_config.NumberColumn(format="R$ %.2f", disabled=True),
+    }
+    st.data_editor(
+        df, key=chave_grade(lista), num_rows="dynamic", hide_index=True,
+        column_config={coluna: c for coluna, c in configuracao.items() if coluna in df.columns},
+        on_change=aplicar_edicoes_grade, args=(lista, preco_m2)
+    )
+
+# ============================
+# Itens do Novo Orçamento (fragmentos)
+# ============================
+# Inclusão, grade e resumo de cada tipo de item ficam num st.fragment: botões e
+# edições aqui reexecutam só o fragmento, não o formulário de cliente, as regras
+# e o vendedor. Valores dos widgets de fora chegam como argumentos da última
+# execução completa (mudar um deles reexecuta o app inteiro).
+
+@contextmanager
+def _perfil_fragmento(pagina):
+    """Mede com o perfil também os reruns só do fragmento (o topo do script não roda neles)."""
+    parcial = perfil.coletor_atual() is None
+    if parcial:
+        perfil.iniciar(perfil.ativo_por_ambiente() or st.session_state.get("perfil_ativo", False))
+    try:
+        yield
+    finally:
+        if parcial:
+            perfil.finalizar(pagina=pagina)
+
+@st.fragment
+def secao_confeccionados(produto, preco_m2, tipo_cliente, estado, tipo_pedido):
+    with _perfil_fragmento("Novo Orçamento: confeccionados"):
+        st.subheader("➕ Adicionar Item Confeccionado")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            comprimento = st.number_input("Comprimento (m):", min_value=0.010, value=st.session_state.get("comp_conf", 1.0), step=0.10, key="comp_conf")
+        with col2:
+            largura = st.number_input("Largura (m):", min_value=0.010, value=st.session_state.get("larg_conf", 1.0), step=0.10, key="larg_conf")
+        with col3:
+            quantidade = st.number_input("Quantidade:", min_value=1, value=st.session_state.get("qtd_conf", 1), step=1, key="qtd_conf")
+
+        if st.button("➕ Adicionar Medida", key="add_conf"):
+            st.session_state['itens_confeccionados'].append({
+                'produto': produto,
+                'comprimento': float(comprimento),
+                'largura': float(largura),
+                'quantidade': int(quantidade),
+                'cor': ""
+            })
+
+        # Grade com todos os itens: também aceita linhas novas e coladas de uma planilha
+        st.subheader("📋 Itens Adicionados")
+        grade_itens('itens_confeccionados', preco_m2, produto)
+        if st.button("🧹 Limpar Itens Confeccionados", key="limpar_conf_list"):
+            st.session_state['itens_confeccionados'] = []
+            st.rerun(scope="fragment")
+
+        if st.session_state['itens_confeccionados']:
+            m2_total, valor_bruto, valor_ipi, valor_final, valor_st, aliquota_st = calcular_valores_confeccionados(
+                st.session_state['itens_confeccionados'], preco_m2, tipo_cliente, estado, tipo_pedido
+            )
+            st.markdown("---")
+            st.success("💰 **Resumo do Pedido - Confeccionado**")
+            st.write(f"📏 Área Total: **{m2_total:.2f} m²**".replace(".", ","))
+            st.write(f"💵 Valor Bruto: **{format_brl(valor_bruto)}**")
+            if tipo_pedido != "Industrialização":
+                st.write(f"🧾 IPI: **{format_brl(valor_ipi)}**") 
+                if valor_st > 0:
+                    st.write(f"⚖️ ST ({aliquota_st}%): **{format_brl(valor_st)}**")
+                st.write(f"💰 Valor Final com IPI{(' + ST' if valor_st>0 else '')}: **{format_brl(valor_final)}**")
+            else:
+                st.write(f"💰 Valor Final: **{format_brl(valor_final)}**")
+        perfil.marco("novo orçamento: confeccionados")
+
+@st.fragment
+def secao_bobinas(produto, preco_m2, tipo_pedido):
+    with _perfil_fragmento("Novo Orçamento: bobinas"):
+        st.subheader("➕ Adicionar Bobina")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            comprimento = st.number_input("Comprimento (m):", min_value=0.010, value=st.session_state.get("comp_bob", 50.0), step=0.10, key="comp_bob")
+        with col2:
+            largura_bobina = st.number_input("Largura da Bobina (m):", min_value=0.010, value=st.session_state.get("larg_bob", 1.4), step=0.010, key="larg_bob")
+        with col3:
+            quantidade = st.number_input("Quantidade:", min_value=1, value=st.session_state.get("qtd_bob", 1), step=1, key="qtd_bob")
+
+        espessura_bobina = None
+        if produto.startswith(prefixos_espessura):
+            espessura_bobina = st.number_input("Espessura da Bobina (mm):", min_value=0.010, value=st.session_state.get("esp_bob", 0.10), step=0.010, key="esp_bob")
+
+        if st.button("➕ Adicionar Bobina", key="add_bob"):
+            item_bobina = {
+                'produto': produto,
+                'comprimento': float(comprimento),
+                'largura': float(largura_bobina),
+                'quantidade': int(quantidade),
+                'cor': ""
+            }
+            if espessura_bobina is not None:
+                item_bobina['espessura'] = float(espessura_bobina)
+                item_bobina['preco_unitario'] = preco_m2
+            st.session_state['bobinas_adicionadas'].append(item_bobina)
+
+        st.subheader("📋 Bobinas Adicionadas")
+        grade_itens('bobinas_adicionadas', preco_m2, produto)
 
-    most_selected_product = max(product_counts, key=product_counts.get) if product_counts else ""
+        if st.session_state['bobinas_adicionadas']:
+            # Recebe a taxa de IPI utilizada
+            m_total, valor_bruto_bob, valor_ipi_bob, valor_final_bob, ipi_rate_bob = calcular_valores_bobinas(
+                st.session_state['bobinas_adicionadas'], preco_m2, tipo_pedido
+            )
+            ipi_percent = ipi_rate_bob * 100 # Converte para porcentagem para exibição
         
-    # 3. Área Total em m² (Apenas Confeccionado, conforme métrica do m² solicitado)
-    m2_total_conf = sum(item[1] * item[2] * item[3] for item in confecc)
+            st.markdown("---")
+            st.success("💰 **Resumo do Pedido - Bobinas**")
+            st.write(f"📏 Total de Metros Lineares: **{m_total:.2f} m**".replace(".", ","))
+            st.write(f"💵 Valor Bruto: **{format_brl(valor_bruto_bob)}**")
+            if tipo_pedido != "Industrialização":
+                # Exibe a alíquota correta
+                st.write(f"🧾 IPI ({ipi_percent:.2f}%): **{format_brl(valor_ipi_bob)}**")
+                st.write(f"💰 Valor Final com IPI ({ipi_percent:.2f}%): **{format_brl(valor_final_bob)}**")
+            else:
+                st.write(f"💰 Valor Final: **{format_brl(valor_final_bob)}**")
 
-    return tipo_item, most_selected_product, m2_total_conf
+            if st.button("🧹 Limpar Bobinas", key="limpar_bob_list"):
+                st.session_state['bobinas_adicionadas'] = []
+                st.rerun(scope="fragment")
+        perfil.marco("novo orçamento: bobinas")
 
 # ============================
 # Inicialização
 # ============================
-init_db()
+# Modo perfil: ORC_PERFIL=1 ou toggle na barra lateral
+perfil.iniciar(perfil.ativo_por_ambiente() or st.session_state.get("perfil_ativo", False))
+init_db(os.path.abspath(DB_NAME))
 
 # session state defaults
 defaults = {
@@ -469,14 +431,16 @@ defaults = {
     "bobinas_adicionadas": [], "frete_sel": "CIF", "obs": "",
     "vend_nome": "", "vend_tel": "", "vend_email": "",
     "menu_index": 0,
-    "filtro_cliente": "Todos", 
-    "filtro_cnpj": "Todos",   
+    "filtro_busca": "",
     "filtro_id": "",          
-    "vendedor_select": VENDEDORES_NOMES[0] # Novo default
+    "filtro_vendedor": "Todos",
+    "historico_pagina": 1,
+    "vendedor_select": VENDEDORES_NOMES[0], # Novo default
 }
 for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
+perfil.marco("init_db e sessão")
 
 # ============================
 # Configuração Streamlit
@@ -485,7 +449,7 @@ st.set_page_config(page_title="Calculadora Grupo Locomotiva", page_icon="📏",
 st.title("Orçamento - Grupo Locomotiva")
 
 # --- Menu ---
-menu_options = ["Novo Orçamento","Histórico de Orçamentos"]
+menu_options = ["Novo Orçamento","Histórico de Orçamentos","Análises"]
 menu = st.sidebar.selectbox(
     "Menu", 
     menu_options, 
@@ -496,28 +460,17 @@ menu = st.sidebar.selectbox(
 if menu != menu_options[st.session_state['menu_index']]:
     st.session_state['menu_index'] = menu_options.index(menu)
 
+if not perfil.ativo_por_ambiente():
+    st.sidebar.toggle("⏱️ Modo perfil", key="perfil_ativo")
+
 # ============================
-# Tabelas de ICMS e ST
+# Regras tributárias (ICMS, ST e IPI vigentes hoje)
 # ============================
-icms_por_estado = {
-    "SP": 18, "MG": 12, "PR": 12, "RJ": 12, "RS": 12, "SC": 12
-}
-todos_estados = [
-    "AC","AL","AM","AP","BA","CE","DF","ES","GO","MA","MT","MS",
-    "PA","PB","PE","PI","RN","RO","RR","SE","TO"
-]
-for uf in todos_estados:
-    if uf not in icms_por_estado:
-        icms_por_estado[uf] = 7
+regras = regras_vigentes()
+icms_por_estado = regras.icms_por_estado
 if st.session_state.get("estado") not in icms_por_estado:
      st.session_state["estado"] = "SP" 
-
-st_por_estado.update({ 
-    "SP": 14, "RJ": 27, "MG": 22, "ES": 0, "PR": 22, "RS": 20, "SC": 0,
-    "BA": 29, "PE": 29, "CE": 19, "RN": 0, "PB": 29, "SE": 0, "AL": 29,
-    "DF": 29, "GO": 0, "MS": 0, "MT": 22, "AM": 29, "PA": 26, "RO": 0,
-    "RR": 27, "AC": 27, "AP": 29, "MA": 29, "PI": 22, "TO": 0
-})
+perfil.marco("configuração e menu")
 
 # ============================
 # Interface - Novo Orçamento
@@ -536,6 +489,20 @@ if menu == "Novo Orçamento":
     col1, col2 = st.columns(2)
     with col1:
         Cliente_nome = st.text_input("Razão ou Nome Fantasia", value=st.session_state.get("Cliente_nome",""), key="Cliente_nome")
+        # Autocompletar: clientes já orçados com esse início de nome (some quando o nome bate com um deles)
+        prefixo_cliente = Cliente_nome.strip()
+        sugestoes = sugestoes_clientes(prefixo_cliente) if len(prefixo_cliente) >= SUGESTOES_MIN_CARACTERES else []
+        cnpj_sugerido = {s[0]: s[1] for s in sugestoes}
+        if cnpj_sugerido and Cliente_nome not in cnpj_sugerido:
+            st.selectbox(
+                "Clientes já orçados:",
+                list(cnpj_sugerido),
+                index=None,
+                format_func=lambda nome: f"{nome} · {cnpj_sugerido[nome]}" if cnpj_sugerido[nome] else nome,
+                placeholder=f"{len(sugestoes)} sugestão(ões): escolha para preencher",
+                key="cliente_sugerido",
+                on_change=preencher_cliente_sugerido
+            )
     with col2:
         Cliente_CNPJ = st.text_input("CNPJ ou CPF (Opcional)", value=st.session_state.get("Cliente_CNPJ",""), key="Cliente_CNPJ")
 
@@ -544,27 +511,6 @@ if menu == "Novo Orçamento":
 
     tipo_pedido = st.radio("Tipo do Pedido:", ["Direta", "Industrialização"], index=0 if st.session_state.get("tipo_pedido","Direta")=="Direta" else 1, key="tipo_pedido")
 
-    produtos_lista = [
-        " ","Lonil de PVC","Lonil KP","Lonil Inflável KP","Encerado","Duramax",
-        "Lonaleve","Sider Truck Teto","Sider Truck Lateral","Capota Marítima",
-        "Night&Day Plus 1,40","Night&Day Plus 2,00","Night&Day Listrado","Vitro 0,40",
-        "Vitro 0,50","Vitro 0,60","Vitro 0,80","Vitro 1,00","Durasol","Poli Light",
-        "Sunset","Tenda","Tenda 2,3x2,3","Acrylic","Agora","Lona Galpão Teto",
-        "Lona Galpão Lateral","Tela de Sombreamento 30%","Tela de Sombreamento 50%",
-        "Tela de Sombreamento 80%","Geomembrana RV 0,42","Geomembrana RV 0,80",
-        "Geomembrana RV 1,00","Geomembrana ATX 0,80","Geomembrana ATX 1,00",
-        "Geomembrana ATX 1,50","Geo Bio s/ reforço 1,00","Geo Bio s/ reforço 1,20",
-        "Geo Bio s/ reforço 1,50","Geo Bio c/ reforço 1,20","Cristal com Pó",
-        "Cristal com Papel","Cristal Colorido","Filme Liso","Filme Kamurcinha",
-        "Filme Verniz","Block Lux","Filme Dimension","Filme Sarja","Filme Emborrachado",
-        "Filme Pneumático","Adesivo Branco Brilho 0,08","Adesivo Branco Brilho 0,10",
-        "Adesivo Branco Fosco 0,10","Adesivo Preto Brilho 0,08","Adesivo Preto Fosco 0,10",
-        "Adesivo Transparente Brilho 0,08","Adesivo Transparente Jateado 0,08",
-        "Adesivo Mascara Brilho 0,08","Adesivo Aço Escovado 0,08"
-    ]
-
-    prefixos_espessura = ("Geomembrana", "Geo", "Vitro", "Cristal", "Filme", "Adesivo", "Block Lux")
-
     # Seleção de Produto (interface para adicionar)
     st.markdown("---")
     st.subheader("➕ Adicionar Produto")
@@ -577,144 +523,16 @@ if menu == "Novo Orçamento":
     st.info(f"🔹 Alíquota de ICMS para {estado}: **{aliquota_icms}% (já incluso no preço)**")
 
     # ST aviso
-    if produto == "Encerado" and tipo_cliente == "Revenda":
-        aliquota_st = st_por_estado.get(estado, 0)
+    if regras.tem_st(produto, tipo_cliente):
+        aliquota_st = regras.aliquota_st(estado)
         st.warning(f"⚠️ Este produto possui ST no estado {estado} aproximado a: **{aliquota_st}%**")
 
-    # Confeccionado
-    if tipo_produto == "Confeccionado":
-        st.subheader("➕ Adicionar Item Confeccionado")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            comprimento = st.number_input("Comprimento (m):", min_value=0.010, value=st.session_state.get("comp_conf", 1.0), step=0.10, key="comp_conf")
-        with col2:
-            largura = st.number_input("Largura (m):", min_value=0.010, value=st.session_state.get("larg_conf", 1.0), step=0.10, key="larg_conf")
-        with col3:
-            quantidade = st.number_input("Quantidade:", min_value=1, value=st.session_state.get("qtd_conf", 1), step=1, key="qtd_conf")
+    perfil.marco("novo orçamento: cliente e produto")
 
-        if st.button("➕ Adicionar Medida", key="add_conf"):
-            st.session_state['itens_confeccionados'].append({
-                'produto': produto,
-                'comprimento': float(comprimento),
-                'largura': float(largura),
-                'quantidade': int(quantidade),
-                'cor': ""
-            })
-
-        if st.session_state['itens_confeccionados']:
-            st.subheader("📋 Itens Adicionados")
-            for idx, item in enumerate(st.session_state['itens_confeccionados'][:] ):
-                col1, col2, col3, col4 = st.columns([3,2,2,1])
-                with col1:
-                    area_item = item['comprimento'] * item['largura'] * item['quantidade']
-                    valor_item = area_item * preco_m2
-                    st.markdown(f"**{item['produto']}**")
-                    st.markdown(
-                        f"🔹 {item['quantidade']}x {item['comprimento']:.2f}m x {item['largura']:.2f}m "
-                        f"= {area_item:.2f} m² → {_format_brl(valor_item)}"
-                    )
-                with col2:
-                    # Usando chaves únicas para inputs dinâmicos
-                    cor = st.text_input("Cor:", value=item['cor'], key=f"cor_conf_{idx}")
-                    st.session_state['itens_confeccionados'][idx]['cor'] = cor
-                with col4:
-                    remover = st.button("❌", key=f"remover_conf_{idx}")
-                    if remover:
-                        st.session_state['itens_confeccionados'].pop(idx)
-                        st.rerun()
-        if st.button("🧹 Limpar Itens Confeccionados", key="limpar_conf_list"):
-            st.session_state['itens_confeccionados'] = []
-            st.rerun()
-
-        if st.session_state['itens_confeccionados']:
-            m2_total, valor_bruto, valor_ipi, valor_final, valor_st, aliquota_st = calcular_valores_confeccionados(
-                st.session_state['itens_confeccionados'], preco_m2, tipo_cliente, estado, tipo_pedido
-            )
-            st.markdown("---")
-            st.success("💰 **Resumo do Pedido - Confeccionado**")
-            st.write(f"📏 Área Total: **{m2_total:.2f} m²**".replace(".", ","))
-            st.write(f"💵 Valor Bruto: **{_format_brl(valor_bruto)}**")
-            if tipo_pedido != "Industrialização":
-                st.write(f"🧾 IPI: **{_format_brl(valor_ipi)}**") 
-                if valor_st > 0:
-                    st.write(f"⚖️ ST ({aliquota_st}%): **{_format_brl(valor_st)}**")
-                st.write(f"💰 Valor Final com IPI{(' + ST' if valor_st>0 else '')}: **{_format_brl(valor_final)}**")
-            else:
-                st.write(f"💰 Valor Final: **{_format_brl(valor_final)}**")
-
-    # Bobina
+    if tipo_produto == "Confeccionado":
+        secao_confeccionados(produto, preco_m2, tipo_cliente, estado, tipo_pedido)
     if tipo_produto == "Bobina":
-        st.subheader("➕ Adicionar Bobina")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            comprimento = st.number_input("Comprimento (m):", min_value=0.010, value=st.session_state.get("comp_bob", 50.0), step=0.10, key="comp_bob")
-        with col2:
-            largura_bobina = st.number_input("Largura da Bobina (m):", min_value=0.010, value=st.session_state.get("larg_bob", 1.4), step=0.010, key="larg_bob")
-        with col3:
-            quantidade = st.number_input("Quantidade:", min_value=1, value=st.session_state.get("qtd_bob", 1), step=1, key="qtd_bob")
-
-        espessura_bobina = None
-        if produto.startswith(prefixos_espessura):
-            espessura_bobina = st.number_input("Espessura da Bobina (mm):", min_value=0.010, value=st.session_state.get("esp_bob", 0.10), step=0.010, key="esp_bob")
-
-        if st.button("➕ Adicionar Bobina", key="add_bob"):
-            item_bobina = {
-                'produto': produto,
-                'comprimento': float(comprimento),
-                'largura': float(largura_bobina),
-                'quantidade': int(quantidade),
-                'cor': ""
-            }
-            if espessura_bobina is not None:
-                item_bobina['espessura'] = float(espessura_bobina)
-                item_bobina['preco_unitario'] = preco_m2
-            st.session_state['bobinas_adicionadas'].append(item_bobina)
-
-        if st.session_state['bobinas_adicionadas']:
-            st.subheader("📋 Bobinas Adicionadas")
-            for idx, item in enumerate(st.session_state['bobinas_adicionadas'][:] ):
-                col1, col2, col3, col4 = st.columns([4,2,2,1])
-                with col1:
-                    metros_item = item['comprimento'] * item['quantidade']
-                    valor_item = metros_item * (item.get('preco_unitario') if item.get('preco_unitario') is not None else preco_m2)
-                    detalhes = (
-                        f"🔹 {item['quantidade']}x {item['comprimento']:.2f}m | Largura: {item['largura']:.2f}m "
-                        f"= {metros_item:.2f} m → {_format_brl(valor_item)}"
-                    )
-                    if 'espessura' in item and item.get('espessura') is not None:
-                        detalhes += f" | Esp: {item['espessura']:.2f}mm"
-                        detalhes += f" | unit: {_format_brl(item.get('preco_unitario', preco_m2))}"
-                    st.markdown(f"**{item['produto']}**")
-                    st.markdown(detalhes)
-                with col2:
-                    cor = st.text_input("Cor:", value=item['cor'], key=f"cor_bob_{idx}")
-                    st.session_state['bobinas_adicionadas'][idx]['cor'] = cor
-                with col4:
-                    remover = st.button("❌", key=f"remover_bob_{idx}")
-                    if remover:
-                        st.session_state['bobinas_adicionadas'].pop(idx)
-                        st.rerun()
-
-            # Recebe a taxa de IPI utilizada
-            m_total, valor_bruto_bob, valor_ipi_bob, valor_final_bob, ipi_rate_bob = calcular_valores_bobinas(
-                st.session_state['bobinas_adicionadas'], preco_m2, tipo_pedido
-            )
-            ipi_percent = ipi_rate_bob * 100 # Converte para porcentagem para exibição
-            
-            st.markdown("---")
-            st.success("💰 **Resumo do Pedido - Bobinas**")
-            st.write(f"📏 Total de Metros Lineares: **{m_total:.2f} m**".replace(".", ","))
-            st.write(f"💵 Valor Bruto: **{_format_brl(valor_bruto_bob)}**")
-            if tipo_pedido != "Industrialização":
-                # Exibe a alíquota correta
-                st.write(f"🧾 IPI ({ipi_percent:.2f}%): **{_format_brl(valor_ipi_bob)}**")
-                st.write(f"💰 Valor Final com IPI ({ipi_percent:.2f}%): **{_format_brl(valor_final_bob)}**")
-            else:
-                st.write(f"💰 Valor Final: **{_format_brl(valor_final_bob)}**")
-
-            if st.button("🧹 Limpar Bobinas", key="limpar_bob_list"):
-                st.session_state['bobinas_adicionadas'] = []
-                st.rerun()
+        secao_bobinas(produto, preco_m2, tipo_pedido)
 
     # Tipo de frete / observações / vendedor (com chaves para session_state)
     st.markdown("---")
@@ -760,6 +578,8 @@ if menu == "Novo Orçamento":
     # FIM NOVO
     # -----------------------------------------------------
 
+    perfil.marco("novo orçamento: frete e vendedor")
+
     # Botão gerar e salvar
     if st.button("📄 Gerar PDF e Salvar Orçamento", key="gerar_e_salvar"):
         cliente = {
@@ -787,178 +607,162 @@ if menu == "Novo Orçamento":
             st.session_state.get("preco_m2",0.0) 
         )
         st.success(f"✅ Orçamento salvo com ID {orcamento_id}")
-
-        # Resumos
-        resumo_conf = calcular_valores_confeccionados(st.session_state["itens_confeccionados"], st.session_state.get("preco_m2",0.0), st.session_state.get("tipo_cliente"," "), st.session_state.get("estado",""), st.session_state.get("tipo_pedido","Direta")) if st.session_state["itens_confeccionados"] else None
-        # Chamada retorna 5 valores
-        resumo_bob = calcular_valores_bobinas(st.session_state["bobinas_adicionadas"], st.session_state.get("preco_m2",0.0), st.session_state.get("tipo_pedido","Direta")) if st.session_state["bobinas_adicionadas"] else None
-
-        # Gerar PDF bytes (Passando orcamento_id)
-        pdf_bytes = gerar_pdf(
-            orcamento_id, 
-            cliente,
-            vendedor,
-            st.session_state["itens_confeccionados"],
-            st.session_state["bobinas_adicionadas"],
-            resumo_conf,
-            resumo_bob,
-            st.session_state.get("obs",""),
-            st.session_state.get("preco_m2",0.0),
-            tipo_cliente=st.session_state.get("tipo_cliente"," "),
-            estado=st.session_state.get("estado","")
-        )
-
-        # Salvar no disco (opcional)
-        pdf_path = f"orcamento_{orcamento_id}.pdf"
-        try:
-            with open(pdf_path, "wb") as f:
-                f.write(pdf_bytes)
-            st.success(f"✅ PDF salvo em disco: {pdf_path}")
-        except Exception as e:
-            st.warning(f"⚠️ Não foi possível salvar o PDF no disco: {e}")
-
-        # Download button 
-        st.download_button(
-            "⬇️ Baixar PDF",
-            data=pdf_bytes,
-            file_name=pdf_path,
-            mime="application/pdf",
-            key=f"download_key_{orcamento_id}"
-        ) 
+        sugestoes_clientes.clear()  # o cliente salvo já aparece nas sugestões
+        perfil.marco("salvar_orcamento")
+
+        # PDF em segundo plano: o salvamento não espera a renderização
+        get_gerador_pdfs().enviar(orcamento_id)
+        st.session_state["orcamento_salvo_id"] = orcamento_id
+        perfil.marco("PDF enfileirado")
+
+    if st.session_state.get("orcamento_salvo_id"):
+        orcamento_salvo_id = st.session_state["orcamento_salvo_id"]
+        estado_pdf = get_gerador_pdfs().estado(orcamento_salvo_id)
+        if estado_pdf[0] == "ausente":
+            # ex.: app reiniciado antes de gravar o arquivo
+            get_gerador_pdfs().enviar(orcamento_salvo_id)
+            estado_pdf = None
+        mostrar_pdf_orcamento(orcamento_salvo_id, estado=estado_pdf)
 
 # ============================
 # Menu: Histórico de Orçamentos
 # ============================
 if menu == "Histórico de Orçamentos":
     st.subheader("📋 Histórico de Orçamentos Salvos")
-    orcamentos = buscar_orcamentos()
-    if not orcamentos:
+    min_data, max_budget_date = buscar_limites_datas()
+    if min_data is None:
         st.info("Nenhum orçamento encontrado.")
     else:
-        clientes = sorted(list({o[2] for o in orcamentos if o[2]}))
-        cnpjs = sorted(list({o[3] for o in orcamentos if o[3]}))
-        
+        vendedores = buscar_valores_distintos("vendedor_nome")
+
+        # Busca textual (FTS5): partes do nome, CNPJ (com ou sem pontuação) ou observação
+        busca_filtro = st.text_input("🔎 Buscar por cliente, CNPJ ou observação:", key="filtro_busca", on_change=reset_historico_pagina)
+
         # Filtro por ID (Novo)
-        orc_id_filtro = st.text_input("Filtrar por ID do Orçamento:", value=st.session_state.get("filtro_id", ""), key="filtro_id")
+        orc_id_filtro = st.text_input("Filtrar por ID do Orçamento:", value=st.session_state.get("filtro_id", ""), key="filtro_id", on_change=reset_historico_pagina)
 
         # Filtros de Seleção (mantendo state)
-        cliente_filtro = st.selectbox("Filtrar por cliente:", ["Todos"] + clientes, key="filtro_cliente")
-        cnpj_filtro = st.selectbox("Filtrar por CNPJ:", ["Todos"] + cnpjs, key="filtro_cnpj")
+        vendedor_filtro = st.selectbox("Filtrar por vendedor:", ["Todos"] + vendedores, key="filtro_vendedor", on_change=reset_historico_pagina)
         
         # Botão Limpar Filtros
         st.button("🧹 Limpar Filtros", on_click=reset_historico_filters, key="clear_historico_filters")
 
-        datas = [datetime.strptime(o[1], "%d/%m/%Y %H:%M") for o in orcamentos]
-        min_data = min(datas) if datas else datetime.now(pytz.timezone("America/Sao_Paulo"))
-        max_budget_date = max(datas).date() if datas else datetime.now(pytz.timezone("America/Sao_Paulo")).date()
         max_possible_date = datetime.now(pytz.timezone("America/Sao_Paulo")).date()
 
         data_inicio, data_fim = st.date_input(
             "Filtrar por intervalo de datas:",
-            (min_data.date(), max_budget_date), 
-            min_value=min_data.date(),
+            (min_data, max_budget_date), 
+            min_value=min_data,
             max_value=max_possible_date, 
-            key="filtro_datas"
+            key="filtro_datas",
+            on_change=reset_historico_pagina
         )
-        
-        orcamentos_filtrados = []
-        for o in orcamentos:
-            orc_id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome = o
-            data_obj = datetime.strptime(data_hora, "%d/%m/%Y %H:%M")
-
-            # Lógica de Filtragem
-            id_ok = True
-            if orc_id_filtro:
-                # Permite pesquisa por prefixo do ID (string)
-                if not str(orc_id).startswith(orc_id_filtro):
-                    id_ok = False
-
-            cliente_ok = (cliente_filtro == "Todos" or cliente_nome == cliente_filtro)
-            cnpj_ok = (cnpj_filtro == "Todos" or cliente_cnpj == cnpj_filtro)
-            data_ok = (data_inicio <= data_obj.date() <= data_fim) 
-            
-            if cliente_ok and cnpj_ok and data_ok and id_ok:
-                orcamentos_filtrados.append(o)
-
-        if not orcamentos_filtrados:
+
+        # Filtros aplicados no SQL
+        filtros_historico = {
+            "id_prefixo": orc_id_filtro.strip(),
+            "busca": busca_filtro,
+            "vendedor": None if vendedor_filtro == "Todos" else vendedor_filtro,
+            # Limites que cobrem todo o histórico não filtram nada (a busca textual conta só no índice)
+            "data_inicio": data_inicio if data_inicio > min_data else None,
+            "data_fim": data_fim if data_fim < max_budget_date else None,
+        }
+        total_filtrados = contar_orcamentos(**filtros_historico)
+        perfil.marco("histórico: filtros e contagem")
+
+        if total_filtrados == 0:
             st.warning("Nenhum orçamento encontrado com os filtros selecionados.")
         else:
+            # Paginação
+            col_pag1, col_pag2 = st.columns([1,1])
+            with col_pag1:
+                tamanho_pagina = st.selectbox("Orçamentos por página:", HISTORICO_TAMANHOS_PAGINA, key="historico_tamanho_pagina", on_change=reset_historico_pagina)
+            total_paginas = max(1, -(-total_filtrados // tamanho_pagina))
+            if st.session_state["historico_pagina"] > total_paginas:
+                st.session_state["historico_pagina"] = total_paginas
+            with col_pag2:
+                pagina = st.number_input(f"Página (de {total_paginas}):", min_value=1, max_value=total_paginas, step=1, key="historico_pagina")
+            st.caption(f"{total_filtrados} orçamento(s) encontrado(s).")
+
+            orcamentos_filtrados = buscar_orcamentos(
+                limite=tamanho_pagina, offset=(pagina - 1) * tamanho_pagina, **filtros_historico
+            )
+
+            # Carrega cabeçalhos e itens da página em 3 consultas
+            orcamentos_carregados = carregar_orcamentos_em_lote([o[0] for o in orcamentos_filtrados])
+            # Estado dos PDFs da página: uma consulta ao índice (pdfs_orcamentos)
+            chaves_pdf = {orc_id: chave_pdf(*carregado) for orc_id, carregado in orcamentos_carregados.items()}
+            estados_pdf = get_gerador_pdfs().estados(chaves_pdf)
+            perfil.marco("histórico: busca e carga da página")
+
             # Exportar Excel (NOVA LÓGICA - REQ. 2)
             if st.button("📊 Exportar Excel do Histórico Filtrado"):
-                linhas_excel = []
-                # Colunas para carregar dados do orcamento
-                orc_cols = ['id','data_hora','cliente_nome','cliente_cnpj','tipo_cliente','estado','frete','tipo_pedido','vendedor_nome','vendedor_tel','vendedor_email','observacao', 'preco_m2_base']
-
-                for o in orcamentos_filtrados:
-                    orc_id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome = o
-                    orc, confecc, bob = carregar_orcamento_por_id(orc_id)
-                    
-                    orc_data = dict(zip(orc_cols, orc))
-                    preco_m2_base = orc_data.get('preco_m2_base') if orc_data.get('preco_m2_base') is not None else 0.0
-
-                    # 1. Obter info de resumo (Tipo de Item, Produto Mais Selecionado, Área Total Conf.)
-                    # confecc/bob são listas de tuplas (ex: (produto, comprimento, largura, quantidade, cor))
-                    tipo_item, produto_mais_sel, m2_total_conf = get_order_summary_info(confecc, bob)
-                    
-                    # 2. Calcular valores finais
-                    itens_conf_calc = [dict(zip(['produto','comprimento','largura','quantidade','cor'], c)) for c in confecc]
-                    # Bobinas carregadas têm 7 campos, incluindo espessura e preco_unitario
-                    itens_bob_calc = [dict(zip(['produto','comprimento','largura','quantidade','cor','espessura','preco_unitario'], b)) for b in bob]
-
-                    resumo_conf = calcular_valores_confeccionados(
-                        itens_conf_calc, preco_m2_base, orc_data['tipo_cliente'], orc_data['estado'], orc_data['tipo_pedido']
-                    ) if itens_conf_calc else (0, 0, 0, 0, 0, 0) 
-                    
-                    # Chamada retorna 5 valores (incluindo IPI rate)
-                    resumo_bob = calcular_valores_bobinas(
-                        itens_bob_calc, preco_m2_base, orc_data['tipo_pedido']
-                    ) if itens_bob_calc else (0, 0, 0, 0, 0.0975) 
-                    
-                    valor_final_total = resumo_conf[3] + resumo_bob[3]
-                    
-                    # 3. Criar uma única linha por pedido com as colunas solicitadas
-                    linhas_excel.append({
-                        "ID": orc_id, 
-                        "Nome do Cliente": cliente_nome, 
-                        "CNPJ/CPF": cliente_cnpj,
-                        "Tipo do Cliente": orc_data['tipo_cliente'], 
-                        "Estado": orc_data['estado'], 
-                        "Frete": orc_data['frete'], 
-                        "Tipo do Pedido": orc_data['tipo_pedido'],
-                        "Produto Mais Selecionado": produto_mais_sel, 
-                        "Tipo do Item": tipo_item,
-                        "Preço Base Utilizado (R$)": preco_m2_base, 
-                        "Área Total em m² (Confeccionado)": m2_total_conf, # Coluna solicitada
-                        "Final Total (R$)": valor_final_total 
-                    })
-                # Fim da nova lógica de exportação
-
-                df_excel = pd.DataFrame(linhas_excel)
-                excel_bytes = BytesIO()
-                df_excel.to_excel(excel_bytes, index=False)
+                barra_exportacao = st.progress(0.0, text="Exportando orçamentos...")
+                excel_arquivo = gerar_excel_historico(
+                    filtros_historico,
+                    total_filtrados,
+                    progresso=lambda feitos, total: barra_exportacao.progress(
+                        min(feitos / total, 1.0), text=f"Exportando orçamentos... {feitos}/{total}"
+                    )
+                )
+                barra_exportacao.empty()
+                # st.download_button só aceita bytes (ou arquivos comuns, que ele lê inteiros)
+                with excel_arquivo:
+                    dados_excel = excel_arquivo.read()
                 st.download_button(
                     "⬇️ Baixar Excel",
-                    data=excel_bytes.getvalue(),
+                    data=dados_excel,
                     file_name="resumo_orcamentos.xlsx", 
                     mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
                 )
+                st.caption(AVISO_DOWNLOAD_MEMORIA.format(tamanho=len(dados_excel) / 1024 / 1024))
+                perfil.marco("histórico: exportar Excel")
+
+            zip_grande = total_filtrados > ZIP_MAX_ORCAMENTOS
+            if zip_grande:
+                st.caption(
+                    f"O ZIP de PDFs é limitado a {ZIP_MAX_ORCAMENTOS} orçamentos; "
+                    "refine os filtros para exportar."
+                )
+            if st.button("🗜️ Baixar Todos os PDFs (ZIP)", key="exportar_zip_pdfs", disabled=zip_grande):
+                barra_zip = st.progress(0.0, text="Gerando PDFs...")
+                zip_arquivo, qtd_pdfs, segundos = gerar_zip_pdfs_historico(
+                    filtros_historico,
+                    total_filtrados,
+                    progresso=lambda feitos, total: barra_zip.progress(
+                        min(feitos / total, 1.0), text=f"Gerando PDFs... {feitos}/{total}"
+                    )
+                )
+                barra_zip.empty()
+                st.success(f"✅ {qtd_pdfs} PDF(s) em {segundos:.1f}s ({qtd_pdfs / max(segundos, 1e-9):.1f} PDFs/s)")
+                with zip_arquivo:
+                    dados_zip = zip_arquivo.read()
+                st.download_button(
+                    "⬇️ Baixar ZIP",
+                    data=dados_zip,
+                    file_name="orcamentos_pdfs.zip",
+                    mime="application/zip"
+                )
+                st.caption(AVISO_DOWNLOAD_MEMORIA.format(tamanho=len(dados_zip) / 1024 / 1024))
+                perfil.marco("histórico: exportar ZIP")
 
             # Exibir orçamentos
             for o in orcamentos_filtrados:
                 orc_id, data_hora, cliente_nome, cliente_cnpj, vendedor_nome = o
-                orc, confecc, bob = carregar_orcamento_por_id(orc_id)
+                orc, confecc, bob = orcamentos_carregados[orc_id]
                 
-                orc_cols = ['id','data_hora','cliente_nome','cliente_cnpj','tipo_cliente','estado','frete','tipo_pedido','vendedor_nome','vendedor_tel','vendedor_email','observacao', 'preco_m2_base']
-                orc_data = dict(zip(orc_cols, orc))
+                orc_data = dict(zip(ORC_COLUNAS, orc))
                 
                 # CORREÇÃO 2: Definição da variável preco_m2_base para uso nas colunas
                 preco_m2_base = orc_data.get('preco_m2_base') if orc_data.get('preco_m2_base') is not None else 0.0
+                _, _, valor_final_salvo = resumos_salvos(orc)
 
                 with st.expander(f"📝 ID {orc_id} - {cliente_nome} ({data_hora})"):
                     st.markdown(f"**Cliente:** {cliente_nome}")
                     st.markdown(f"**CNPJ:** {cliente_cnpj}")
                     st.markdown(f"**Vendedor:** {vendedor_nome}")
-                    st.markdown(f"**Preço Base Utilizado (💵):** {_format_brl(preco_m2_base)}") 
+                    st.markdown(f"**Preço Base Utilizado (💵):** {format_brl(preco_m2_base)}") 
+                    st.markdown(f"**Valor Total (💰):** {format_brl(valor_final_salvo)}")
 
                     if confecc:
                         st.markdown("### ⬛ Itens Confeccionados")
@@ -1006,43 +810,68 @@ if menu == "Histórico de Orçamentos":
                                 "bobinas_adicionadas": [dict(zip(['produto','comprimento','largura','quantidade','cor','espessura','preco_unitario'],b)) for b in bob],
                                 "menu_index": 0 
                             })
+                            renovar_grades()
                             st.success(f"Orçamento ID {orc_id} carregado no formulário.")
                             st.rerun()
 
                     with col2:
-                        # Baixar PDF 
-                        itens_bob_calc = [dict(zip(['produto','comprimento','largura','quantidade','cor','espessura','preco_unitario'], b)) for b in bob]
-                        # Chamada retorna 5 valores
-                        resumo_bob_calc = calcular_valores_bobinas(
-                            itens_bob_calc, preco_m2_base, orc_data['tipo_pedido']
-                        ) if itens_bob_calc else (0, 0, 0, 0, 0.0975)
-                        
-                        pdf_bytes = gerar_pdf(
-                            orc_id, 
-                            cliente={
-                                "nome": orc[2],
-                                "cnpj": orc[3],
-                                "tipo_cliente": orc[4],
-                                "estado": orc[5],
-                                "frete": orc[6],
-                                "tipo_pedido": orc[7]
-                            },
-                            vendedor={
-                                "nome": orc[8],
-                                "tel": orc[9],
-                                "email": orc[10]
-                            },
-                            itens_confeccionados=[dict(zip(['produto','comprimento','largura','quantidade','cor'],c)) for c in confecc],
-                            itens_bobinas=itens_bob_calc,
-                            resumo_conf=None, 
-                            resumo_bob=resumo_bob_calc, # Passa o resumo de 5 itens
-                            observacao=orc[11],
-                            preco_m2=preco_m2_base
-                        ) 
-                        st.download_button(
-                            "📄 Baixar PDF",
-                            data=pdf_bytes,
-                            file_name=f"orcamento_{orc_id}.pdf",
-                            mime="application/pdf",
-                            key=f"download_historico_{orc_id}"
-                        )
+                        # PDF do armazenamento; gerado de novo só se o orçamento ou o modelo mudou
+                        mostrar_pdf_orcamento(orc_id, chaves_pdf[orc_id], "download_historico", estados_pdf[orc_id])
+            perfil.marco("histórico: lista de orçamentos")
+
+# ============================
+# Menu: Análises
+# ============================
+# (dimensão em vendas_agregadas, rótulo)
+ANALISES_DIMENSOES = [("vendedor", "Vendedor"), ("estado", "Estado"), ("mes", "Mês"), ("produto", "Produto")]
+ANALISES_MAX_BARRAS = 20
+
+if menu == "Análises":
+    st.subheader("📈 Análises de Vendas")
+    st.caption("Totais atualizados a cada orçamento salvo; a página lê só as tabelas de totais.")
+
+    por_estado = buscar_vendas_agregadas("estado")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Orçamentos", f"{sum(r[1] for r in por_estado):,}".replace(",", "."))
+    col2.metric("Valor final total", format_brl(sum(r[6] for r in por_estado)))
+    col3.metric("Área confeccionada", format_brl(sum(r[3] for r in por_estado)).replace("R$ ", "") + " m²")
+    perfil.marco("análises: totais gerais")
+
+    abas = st.tabs([rotulo for _, rotulo in ANALISES_DIMENSOES])
+    for aba, (dimensao, rotulo) in zip(abas, ANALISES_DIMENSOES):
+        with aba:
+            linhas = buscar_vendas_agregadas(dimensao)
+            if not linhas:
+                st.info("Nenhum orçamento salvo ainda.")
+                continue
+            df = pd.DataFrame(linhas, columns=[
+                rotulo, "Orçamentos", "Quantidade", "m² (confeccionado)", "Metros (bobina)", "Valor Bruto (R$)", "Valor Final (R$)"
+            ])
+            if dimensao == "produto":
+                # IPI e ST são calculados por orçamento, não por item: produtos não têm valor final
+                # (buscar_vendas_agregadas o devolve vazio) e mostram o valor bruto
+                st.caption("Por produto: valor bruto (sem IPI/ST); \"Orçamentos\" conta os orçamentos com o produto.")
+                df = df.drop(columns=["Valor Final (R$)"])
+                metrica = "Valor Bruto (R$)"
+            else:
+                df = df.drop(columns=["Quantidade"])
+                metrica = "Valor Final (R$)"
+            grafico = df if dimensao == "mes" else df.head(ANALISES_MAX_BARRAS)
+            st.bar_chart(grafico, x=rotulo, y=metrica, sort=False if dimensao == "mes" else f"-{metrica}")
+            st.dataframe(
+                df, hide_index=True,
+                column_config={
+                    "Valor Bruto (R$)": st.column_config.NumberColumn(format="R$ %.2f"),
+                    "Valor Final (R$)": st.column_config.NumberColumn(format="R$ %.2f"),
+                    "m² (confeccionado)": st.column_config.NumberColumn(format="%.2f"),
+                    "Metros (bobina)": st.column_config.NumberColumn(format="%.2f"),
+                }
+            )
+    perfil.marco("análises: tabelas por dimensão")
+
+# ============================
+# Modo perfil
+# ============================
+coletor_perfil = perfil.finalizar(pagina=menu)
+if coletor_perfil is not None:
+    perfil.exibir_painel(coletor_perfil)
@@ -0,0 +1,61 @@
+"""Validação de orçamentos que chegam por fora do formulário (API JSON e planilhas do orcamento_lote).
+
+Cada entrada lê os campos do seu jeito (JSON tipado, células de planilha) e
+passa os valores por aqui, para valerem as mesmas regras do formulário:
+catálogo de produtos, opções de cliente e pedido, estados com regra tributária,
+medidas positivas e finitas (NaN e infinito passam por float) e bobinas com espessura.
+"""
+import math
+
+from calculos import prefixos_espessura, produtos_lista, regras_vigentes
+
+TIPOS_CLIENTE = (" ", "Consumidor Final", "Revenda")
+TIPOS_PEDIDO = ("Direta", "Industrialização")
+PRODUTOS = frozenset(p for p in produtos_lista if p.strip())
+ESPESSURA_PADRAO = 0.10  # mm, como no formulário
+
+class ErroValidacao(ValueError):
+    """Orçamento ou item inválido; a mensagem começa pelo contexto (campo do JSON, linha da planilha)."""
+
+def _finito(valor):
+    return valor is not None and math.isfinite(valor)
+
+def validar_item(contexto, produto, comprimento, largura, quantidade=1, cor="", bobina=False, espessura=None, preco_unitario=None):
+    """Item no formato do app (mesmas chaves de st.session_state).
+
+    Bobinas de produtos com espessura (prefixos_espessura) levam espessura
+    (padrão ESPESSURA_PADRAO) e preco_unitario, que validar_orcamento completa
+    com o preço base quando vier vazio.
+    """
+    if produto not in PRODUTOS:
+        raise ErroValidacao(f"{contexto}: produto fora do catálogo: {produto!r}")
+    if not _finito(comprimento) or comprimento <= 0 or not _finito(largura) or largura <= 0:
+        raise ErroValidacao(f"{contexto}: comprimento e largura devem ser positivos")
+    if not _finito(quantidade) or quantidade < 1:
+        raise ErroValidacao(f"{contexto}: quantidade deve ser pelo menos 1")
+    item = {"produto": produto, "comprimento": comprimento, "largura": largura, "quantidade": quantidade, "cor": cor}
+    if bobina and produto.startswith(prefixos_espessura):
+        espessura = ESPESSURA_PADRAO if espessura is None else espessura
+        preco_invalido = preco_unitario is not None and (not _finito(preco_unitario) or preco_unitario < 0)
+        if not _finito(espessura) or espessura <= 0 or preco_invalido:
+            raise ErroValidacao(f"{contexto}: espessura deve ser positiva e preco_unitario não pode ser negativo")
+        item["espessura"] = espessura
+        item["preco_unitario"] = preco_unitario
+    return item
+
+def validar_orcamento(contexto, cliente, itens_bobinas, preco_m2):
+    """Confere tipo de cliente, estado e tipo de pedido de `cliente` e o preço base.
+
+    Bobinas com espessura sem preço próprio recebem `preco_m2`, como no formulário.
+    """
+    if cliente["tipo_cliente"] not in TIPOS_CLIENTE:
+        raise ErroValidacao(f"{contexto}: tipo_cliente deve ser um de {list(TIPOS_CLIENTE)}")
+    if cliente["estado"] not in regras_vigentes().icms_por_estado:
+        raise ErroValidacao(f"{contexto}: estado inválido: {cliente['estado']!r}")
+    if cliente["tipo_pedido"] not in TIPOS_PEDIDO:
+        raise ErroValidacao(f"{contexto}: tipo_pedido deve ser um de {list(TIPOS_PEDIDO)}")
+    if not _finito(preco_m2) or preco_m2 < 0:
+        raise ErroValidacao(f"{contexto}: preco_m2 deve ser informado e não pode ser negativo")
+    for item in itens_bobinas:
+        if "espessura" in item and item["preco_unitario"] is None:
+            item["preco_unitario"] = preco_m2